@@ -1,89 +1,235 @@
 #!/usr/bin/env python3
-import time
 import sys
+import time
 import helper
 import os
-import attach_lldb
 import json
+from app_log_filter import AppLogFilter
+
+
+class AppLogIndex:
+    """
+    Small offset index stored next to the app log ("<log>.index"), per debug session:
+        start - size of the log when the session was created (session start marker)
+        offset, ino - position of the last printed line, to resume without replaying the log
+    """
+
+    # how often the read position is saved
+    CHECKPOINT_INTERVAL = 1.0
+
+    def __init__(self, log_path: str):
+        self.path = f"{log_path}.index"
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def session(self, session_id) -> dict:
+        return self._read().get(session_id, {})
+
+    def update(self, session_id, **values):
+        with helper.fileLock.FileLock(f"{self.path}.lock"):
+            index = self._read()
+            now = time.time()
+            index = {
+                key: value
+                for key, value in index.items()
+                if now - value.get("updated", 0) < helper.SESSION_TTL
+            }
+            index.setdefault(session_id, {}).update(values, updated=now)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            os.replace(tmp_path, self.path)
 
 
 class AppLogger:
+    # max size of text sent to the debug console by one debugger command
+    MAX_BATCH_SIZE = 16 * 1024
+    # max time in seconds a line waits in the batch
+    MAX_BATCH_DELAY = 0.05
+    # max number of debugger commands per second, lines over the limit are suppressed
+    MAX_EVENTS_PER_SECOND = 20
+
     def __init__(self, file_path, printer=print) -> None:
         self.file_path = file_path
         self.enabled = True
         self.printer = printer
+        self.filter = AppLogFilter()
+        self.session_id = None
+        self.checkpoint_position = None
+        self.checkpoint_time = 0.0
+        self._debugger = None
+        self.batch = []
+        self.batch_size = 0
+        self.batch_started = 0.0
+        self.suppressed = 0
+        self.events_window_start = 0.0
+        self.events_in_window = 0
 
     def _is_code_lldb(self):
+        import attach_lldb
+
         return not attach_lldb.is_lldb_dap()
 
+    def _send(self, text: str) -> bool:
+        if not self._debugger:
+            self.printer(text, end="")
+            return True
+        # imported here as it needs lldb module, the logger without a debugger runs without lldb
+        import attach_lldb
+
+        if self._is_code_lldb():
+            # script command takes the rest of line as python code, repr gives a valid single line literal
+            return attach_lldb.perform_debugger_command(
+                self._debugger, f"script print({text!r}, end='')"
+            )
+        # single quoted argument can not contain a single quote, json decodes the escaped one back
+        body = json.dumps({"output": text}).replace("'", "\\u0027")
+        return attach_lldb.perform_debugger_command(
+            self._debugger, f"lldb-dap send-event output '{body}'"
+        )
+
     def _print_line(self, line):
-        if self.enabled:
-            if self._is_code_lldb():
-                line = line.replace("'", "\\'")
-                if self._debugger:
-                    attach_lldb.perform_debugger_command(
-                        self._debugger,
-                        f"script print('{line[:-2]}', end='')",
-                    )
-                    attach_lldb.perform_debugger_command(
-                        self._debugger, 'script print("")'
-                    )
-                else:
-                    self.printer(line, end="")
-            else:
-                if self._debugger:
-                    line = line.split("'")
-                    for i, split_line in enumerate(line):
-                        if split_line != b"":
-                            body = {"output": split_line}
-                            body = json.dumps(body)
-                            attach_lldb.perform_debugger_command(
-                                self._debugger,
-                                f"lldb-dap send-event output '{body}'",
-                            )
-                        if i < len(line) - 1:
-                            attach_lldb.perform_debugger_command(
-                                self._debugger,
-                                'lldb-dap send-event output "{\\"output\\": \\"\'\\"}"',
-                            )
-                else:
-                    self.printer(line, end="")
-
-    def print_new_lines(self, file):
+        if not self.enabled:
+            return
+        if not self.batch:
+            self.batch_started = time.monotonic()
+        line = line.rstrip("\r\n") + "\n"
+        self.batch.append(line)
+        self.batch_size += len(line)
+        if self.batch_size >= self.MAX_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends the batched lines to the debug console as one command.
+        """
+        lines = self.batch
+        self.batch = []
+        self.batch_size = 0
+
+        now = time.monotonic()
+        if now - self.events_window_start >= 1.0:
+            self.events_window_start = now
+            self.events_in_window = 0
+        if self.events_in_window >= self.MAX_EVENTS_PER_SECOND:
+            self.suppressed += len(lines)
+            return
+        if not lines and not self.suppressed:
+            return
+
+        self.events_in_window += 1
+        text = "".join(lines)
+        if self.suppressed:
+            text = f"... {self.suppressed} lines suppressed ...\n{text}"
+            self.suppressed = 0
+        if not self._send(text):
+            # cut utf-8 characters as code lldb console can not print such characters and generates an error
+            self._send("".join(c if ord(c) < 128 else "?" for c in text))
+
+    def _flush_timeout(self):
+        """
+        Time till the batch (or the notice of suppressed lines) should be flushed, None if nothing is pending.
+        """
+        if self.batch:
+            deadline = self.batch_started + self.MAX_BATCH_DELAY
+        elif self.suppressed:
+            deadline = self.events_window_start + 1.0
+        else:
+            return None
+        return max(0.0, deadline - time.monotonic())
+
+    def _print_bytes(self, line: bytes):
+        if not self.enabled:
+            return
+        line = line.decode(encoding="utf-8", errors="replace")
+        # drop filtered lines before they reach debugger commands
+        if self.filter.accept(line):
+            self._print_line(line)
+
+    def print_new_lines(self, tail: helper.FileTail):
         try:
-            while True:
-                try:
-                    if not "LLDB_PROVIDER" in os.environ:
-                        break
-                    line = helper.binary_readline(file, b"\n")
-                    if not line or line == b"":
-                        break
-                    if not line.endswith(b"\n"):
-                        break
-
-                    line = line.decode(encoding="utf-8", errors="replace")
-                    self._print_line(line)
-                except:
-                    # cut utf-8 characters as code lldb console can not print such characters and generates an error
-                    to_print = ""
-                    for i in line:
-                        if ord(i) < 128:
-                            to_print += i
-                        else:
-                            to_print += "?"
-                    self._print_line(to_print)
+            lines = tail.read_lines()
         except:  # no such file
+            return
+        if not "LLDB_PROVIDER" in os.environ:
+            return
+        for line in lines:
+            self._print_bytes(line)
+
+    def mark_session_start(self, file_path: str, session_id):
+        """
+        Remembers where the log of the session starts, the log is not replayed from the beginning then.
+
+        :param file_path: app log path
+        :param session_id: debug session identifier
+        """
+        key = helper.file_stat_key(file_path)
+        AppLogIndex(file_path).update(
+            session_id,
+            start=key[1] if key else 0,
+            start_ino=key[2] if key else None,
+        )
+
+    def _start_position(self):
+        """
+        (offset, inode) to start reading from, depends on APP_LOG_START environment variable
+        (vscode-ios.debug.appLogStart setting):
+            resume (default) - last checkpoint of the session, its start marker otherwise
+            end - only new lines
+            beginning - the whole log
+        """
+        mode = os.environ.get("APP_LOG_START", "resume")
+        if mode == "beginning":
+            return 0, None
+        if mode == "end":
+            key = helper.file_stat_key(self.file_path)
+            return (key[1], key[2]) if key else (0, None)
+        session = AppLogIndex(self.file_path).session(self.session_id)
+        if "offset" in session:
+            return session["offset"], session.get("ino")
+        return session.get("start", 0), session.get("start_ino")
+
+    def _checkpoint(self, tail: helper.FileTail):
+        if self.session_id is None:
+            return
+        now = time.monotonic()
+        position = tail.position
+        if (
+            position == self.checkpoint_position
+            or now - self.checkpoint_time < AppLogIndex.CHECKPOINT_INTERVAL
+        ):
+            return
+        self.checkpoint_position = position
+        self.checkpoint_time = now
+        try:
+            AppLogIndex(self.file_path).update(
+                self.session_id, offset=position[0], ino=position[1]
+            )
+        except Exception:
             pass
 
-    def _watch_file(self, file):
+    def _watch_file(self, tail: helper.FileTail):
         while True:
-            self.print_new_lines(file)
-            time.sleep(1)
+            self.print_new_lines(tail)
+            self._checkpoint(tail)
+            timeout = self._flush_timeout()
+            if timeout == 0.0:
+                self.flush()
+                continue
+            tail.wait(1.0 if timeout is None else timeout)
 
     def watch_app_log(self, debugger):
-        with open(self.file_path, "rb") as file:
+        offset, ino = self._start_position()
+        self.checkpoint_position = (offset, ino)
+        self.checkpoint_time = 0.0
+        with helper.FileTail(self.file_path, offset=offset, ino=ino) as tail:
             self._debugger = debugger
-            self._watch_file(file)
+            self._watch_file(tail)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# Filter rules of app log lines, applied before lines are sent to the debug console
+import re
+import time
+import shlex
+
+LEVELS = ["debug", "info", "default", "warning", "error", "fault"]
+LEVEL_ALIASES = {"notice": "default", "warn": "warning", "err": "error"}
+
+# [com.company.app:category] or [Category] at the beginning of os_log/Logger formatted line
+# (not process[pid:tid] part of the line)
+SUBSYSTEM_REGEX = re.compile(r"(?:^|\s)\[(?P<subsystem>[A-Za-z][\w.\-]*)(?::[^\]]*)?\]")
+LEVEL_REGEX = re.compile(
+    r"(?:<|\[|\b)(?P<level>debug|info|notice|default|warning|warn|error|fault)(?:>|\]|:|\b)",
+    re.IGNORECASE,
+)
+# only the head of a line is checked for the level and subsystem
+HEAD_SIZE = 200
+
+
+def normalize_level(level: str) -> str:
+    level = level.lower()
+    return LEVEL_ALIASES.get(level, level)
+
+
+def extract_level(line: str) -> str:
+    """
+    Level of the line, lines without level (like print statements) are "default".
+
+    :param line: log line
+    """
+    match = LEVEL_REGEX.search(line, 0, HEAD_SIZE)
+    if match is None:
+        return "default"
+    return normalize_level(match.group("level"))
+
+
+def extract_subsystem(line: str):
+    """
+    Subsystem of the line or None.
+
+    :param line: log line
+    """
+    match = SUBSYSTEM_REGEX.search(line, 0, HEAD_SIZE)
+    if match is None:
+        return None
+    return match.group("subsystem")
+
+
+# (?i) like flags at the beginning of a pattern, they are global and not allowed inside of the alternation
+GLOBAL_FLAGS_REGEX = re.compile(r"\(\?([aiLmsux]+)\)")
+# \1 like references, group numbers are shifted once patterns are joined
+NUMBERED_BACKREFERENCE_REGEX = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+
+
+def scope_global_flags(pattern: str) -> str:
+    """
+    Rewrites leading global flags to a scoped group: (?i)error -> (?i:error)
+    """
+    flags = ""
+    match = GLOBAL_FLAGS_REGEX.match(pattern)
+    while match is not None:
+        flags += match.group(1)
+        pattern = pattern[match.end() :]
+        match = GLOBAL_FLAGS_REGEX.match(pattern)
+    if not flags:
+        return pattern
+    return f"(?{flags}:{pattern})"
+
+
+def compile_alternation(patterns: list):
+    """
+    Compiles patterns to one regex, every pattern is wrapped to a group. Returns the regex and the map
+    of group index to pattern index, the matched pattern is known by match.lastindex (the wrapping group
+    is closed after groups of the pattern). Raises ValueError if patterns can't be joined.
+
+    :param patterns: list of regex strings
+    """
+    if not patterns:
+        return None, {}
+    parts = []
+    groups = {}
+    group = 1
+    for i, pattern in enumerate(patterns):
+        if NUMBERED_BACKREFERENCE_REGEX.search(pattern):
+            raise ValueError(
+                f"Numbered backreferences are not supported, use named groups: {pattern}"
+            )
+        pattern = scope_global_flags(pattern)
+        try:
+            pattern_groups = re.compile(pattern).groups
+        except re.error as e:
+            raise ValueError(f"Invalid regex {patterns[i]}: {e}")
+        groups[group] = i
+        parts.append(f"({pattern})")
+        group += pattern_groups + 1
+    try:
+        return re.compile("|".join(parts)), groups
+    except re.error as e:
+        # like the same group name in two patterns
+        raise ValueError(f"Patterns can't be combined: {e}")
+
+
+class RateLimit:
+    def __init__(self, lines_per_second: float):
+        self.rate = lines_per_second
+        self.tokens = lines_per_second
+        self.updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class AppLogFilter:
+    """
+    Include/exclude regexes, min level, subsystems and per-pattern rate limits.
+    Rules are changed from the LLDB command thread while lines are filtered on the logger thread,
+    so every change builds a new compiled state which is swapped by a single assignment.
+    """
+
+    def __init__(self):
+        self.includes = []
+        self.excludes = []
+        self.subsystems = []
+        self.min_level = None
+        # list of (regex, lines per second)
+        self.limits = []
+        self._compiled = None
+
+    @staticmethod
+    def _compile(includes, excludes, subsystems, min_level, limits):
+        if not any([includes, excludes, subsystems, min_level, limits]):
+            return None
+        limits_regex, limit_groups = compile_alternation([p for p, _ in limits])
+        return (
+            compile_alternation(includes)[0],
+            compile_alternation(excludes)[0],
+            frozenset(subsystems),
+            None if min_level is None else LEVELS.index(min_level),
+            limits_regex,
+            {group: RateLimit(limits[i][1]) for group, i in limit_groups.items()},
+        )
+
+    def _update(self, **rules):
+        """
+        Compiles rules with the change first, so an invalid rule changes nothing.
+        """
+        current = {
+            "includes": self.includes,
+            "excludes": self.excludes,
+            "subsystems": self.subsystems,
+            "min_level": self.min_level,
+            "limits": self.limits,
+        }
+        current.update(rules)
+        compiled = self._compile(**current)
+        for name, value in current.items():
+            setattr(self, name, value)
+        self._compiled = compiled
+
+    def include(self, pattern: str):
+        self._update(includes=self.includes + [pattern])
+
+    def exclude(self, pattern: str):
+        self._update(excludes=self.excludes + [pattern])
+
+    def subsystem(self, name: str):
+        self._update(subsystems=self.subsystems + [name])
+
+    def level(self, level: str):
+        level = normalize_level(level)
+        if level not in LEVELS:
+            raise ValueError(
+                f"Unknown level {level}, valid levels: {', '.join(LEVELS)}"
+            )
+        self._update(min_level=level)
+
+    def limit(self, lines_per_second: float, pattern: str):
+        if lines_per_second <= 0:
+            raise ValueError("Rate limit should be positive")
+        self._update(limits=self.limits + [(pattern, lines_per_second)])
+
+    def clear(self):
+        self.__init__()
+
+    def accept(self, line: str) -> bool:
+        """
+        Returns True if the line should be printed.
+
+        :param line: log line
+        """
+        compiled = self._compiled
+        if compiled is None:
+            return True
+        includes, excludes, subsystems, min_level, limits, buckets = compiled
+
+        if excludes is not None and excludes.search(line):
+            return False
+        if includes is not None and not includes.search(line):
+            return False
+        if subsystems and extract_subsystem(line) not in subsystems:
+            return False
+        if min_level is not None and LEVELS.index(extract_level(line)) < min_level:
+            return False
+        if limits is not None:
+            match = limits.search(line)
+            if match is not None:
+                return buckets[match.lastindex].allow()
+        return True
+
+    def describe(self) -> str:
+        rules = []
+        rules += [f"include {p}" for p in self.includes]
+        rules += [f"exclude {p}" for p in self.excludes]
+        rules += [f"subsystem {s}" for s in self.subsystems]
+        if self.min_level:
+            rules.append(f"level {self.min_level}")
+        rules += [f"limit {rate:g} {p}" for p, rate in self.limits]
+        return "\n".join(rules) if rules else "no filter rules"
+
+    def apply_command(self, command: str) -> str:
+        """
+        Applies a rule from `app_log` command arguments:
+            include <regex> | exclude <regex> | subsystem <name> | level <level>
+            | limit <lines per second> <regex> | clear | rules
+
+        :return: message for the command result
+        """
+        args = shlex.split(command)
+        if not args:
+            raise ValueError("Empty filter command")
+        name, args = args[0], args[1:]
+        if name in ("include", "exclude", "subsystem", "level") and len(args) == 1:
+            getattr(self, name)(args[0])
+        elif name == "limit" and len(args) == 2:
+            self.limit(float(args[0]), args[1])
+        elif name == "clear" and not args:
+            self.clear()
+        elif name != "rules" or args:
+            raise ValueError(f"Invalid filter command: {command}")
+        return self.describe()
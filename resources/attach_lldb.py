@@ -1,15 +1,16 @@
 #!/usr/bin/env python3
 from enum import Enum
-import fcntl
 import time
 import subprocess
 import threading
 import os
 import json
+import signal
 import helper
 import lldb
 from app_log import AppLogger
 import runtime_warning_database
+from runtime_issue_stream import RuntimeIssueStreamReader
 
 LOG_DEBUG = 0
 
@@ -149,6 +150,51 @@ def kill_codelldb(debugger: lldb.SBDebugger):
 
 
 runtime_warning_process: subprocess.Popen = None
+runtime_issue_reader: RuntimeIssueStreamReader = None
+
+
+def store_runtime_warning(message: str, frames):
+    """
+    Stores a runtime warning matched by the runtime issue reader.
+
+    :param message: message of log record
+    :param frames: backtrace of the warning
+    """
+    try:
+        runtime_warning_database.store_runtime_warning(message, frames)
+        log_message(message)
+    except runtime_warning_database.MessageInDatabaseError:
+        pass
+    except Exception as e:
+        log_message(f"Error logging to runtime database: {str(e)}")
+
+
+def stop_apple_runtime_warning_watch_process():
+    """
+    Stops the log stream of the previously watched process, its reader reports pending warnings and exits.
+    """
+    global runtime_warning_process
+    global runtime_issue_reader
+    if runtime_warning_process is not None:
+        # the shell and the log stream it spawned are in their own process group
+        for sig, timeout in ((signal.SIGTERM, 2), (signal.SIGKILL, None)):
+            try:
+                os.killpg(runtime_warning_process.pid, sig)
+                runtime_warning_process.wait(timeout=timeout)
+                break
+            except ProcessLookupError:
+                break
+            except subprocess.TimeoutExpired:
+                continue
+            except Exception as e:
+                log_message(f"Error on stopping runtime warning watch: {e}")
+                break
+    if runtime_issue_reader is not None:
+        runtime_issue_reader.join(timeout=2)
+    if runtime_warning_process is not None:
+        runtime_warning_process.stdout.close()
+    runtime_warning_process = None
+    runtime_issue_reader = None
 
 
 def create_apple_runtime_warning_watch_process(debugger: lldb.SBDebugger, pid: str):
@@ -159,6 +205,8 @@ def create_apple_runtime_warning_watch_process(debugger: lldb.SBDebugger, pid: s
     :param pid: process identifier
     """
     global runtime_warning_process
+    global runtime_issue_reader
+    stop_apple_runtime_warning_watch_process()
     try:
         device_id = os.getenv("DEVICE_ID").strip("\n")
 
@@ -166,22 +214,19 @@ def create_apple_runtime_warning_watch_process(debugger: lldb.SBDebugger, pid: s
             log_message("Runtime warnings are not supported for MacOS apps")
             return
 
-        command = f"xcrun simctl spawn {device_id} log stream --level debug --style syslog --color none --predicate 'subsystem CONTAINS \"com.apple.runtime-issues\" AND processIdentifier == {pid}'"
+        command = f"xcrun simctl spawn {device_id} log stream --level debug --style ndjson --color none --predicate 'subsystem CONTAINS \"com.apple.runtime-issues\" AND processIdentifier == {pid}'"
         log_message(f"Watching runtime warning command: {command}")
 
         runtime_warning_process = subprocess.Popen(
             command,
             shell=True,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        flags = fcntl.fcntl(
-            runtime_warning_process.stdout, fcntl.F_GETFL
-        )  # first get current process.stdout flags
-        fcntl.fcntl(
-            runtime_warning_process.stdout, fcntl.F_SETFL, flags | os.O_NONBLOCK
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
         )
+        runtime_issue_reader = RuntimeIssueStreamReader(
+            runtime_warning_process.stdout, store_runtime_warning, log_message
+        ).start()
     except Exception as e:
         log_message(f"Error on watching {e}")
 
@@ -423,48 +468,6 @@ def watch_new_process(
     wait_for_process(process_name, debugger, existing_pids, session_id)
 
 
-mutex_log_runtime_error = threading.Lock()
-
-
-def log_runtime_error(debugger: lldb.SBDebugger, json):
-    """
-    Logs a runtime error from the runtime warning process.
-
-    :param debugger: debugger instance
-    :param json: JSON representation of the runtime error
-    """
-    if not runtime_warning_process:
-        return
-
-    with mutex_log_runtime_error:
-        last_line = None
-        while True:
-            try:
-                input_line = runtime_warning_process.stdout.readline()
-                if not input_line:
-                    time.sleep(0.1)
-                    if not last_line:
-                        continue
-                    if last_line.find("[com.apple.runtime-issues") == -1:
-                        continue
-
-                    break
-                last_line = input_line
-                if last_line.find("[com.apple.runtime-issues") != -1:
-                    break
-                # log_message(input_line)
-            except:
-                if not last_line or last_line.find("[com.apple.runtime-issues") == -1:
-                    continue
-                break
-        try:
-            runtime_warning_database.store_runtime_warning(last_line, json)
-            log_message(last_line)
-            # log_message(json)
-        except Exception as e:
-            log_message(f"Error logging to runtime database: {str(e)}")
-
-
 def print_runtime_warning(
     debugger: lldb.SBDebugger,
     command: str,
@@ -505,8 +508,9 @@ def print_runtime_warning(
                 frames.append(frame_info)
             return frames
 
-        frame = bt_to_json(frame)
-        threading.Thread(target=log_runtime_error, args=(debugger, frame)).start()
+        if runtime_issue_reader is None:
+            return
+        runtime_issue_reader.add_backtrace(process.GetProcessID(), bt_to_json(frame))
 
     except Exception as e:
         log_message("---------------Runtime warning error:\n" + str(e))
@@ -523,11 +527,8 @@ def wait_for_exit(debugger: lldb.SBDebugger, session_id: str):
     :type session_id: str
     """
     log_message("Waiting for exit")
-    while True:
-        if not helper.is_debug_session_valid(session_id):
-            perform_debugger_command(debugger, "process detach")
-            return
-        time.sleep(0.5)
+    helper.wait_debug_session_invalid(session_id)
+    perform_debugger_command(debugger, "process detach")
 
 
 def wait_until_build(debugger: lldb.SBDebugger, session_id: str):
@@ -537,14 +538,15 @@ def wait_until_build(debugger: lldb.SBDebugger, session_id: str):
     :param debugger: debugger instance
     :param session_id: session identifier
     """
-    while True:
-        if not helper.is_debug_session_valid(session_id):
-            kill_codelldb(debugger)
-            return "stopped"
-        status = helper.get_debugger_launch_config(session_id, "status")
-        if status == "launching" or status == "launched":
-            return status
-        time.sleep(0.3)
+    session = helper.DEBUGGER_SESSION_STATE.wait_until(
+        session_id,
+        lambda session: session is None
+        or session.get("status") in ["stopped", "launching", "launched"],
+    )
+    if session is None or session.get("status") == "stopped":
+        kill_codelldb(debugger)
+        return "stopped"
+    return session["status"]
 
 
 def set_environmental_var(
@@ -611,6 +613,13 @@ def create_target(
             return
 
         app_logger.session_id = session_id
+        try:
+            device = os.getenv("DEVICE_ID").strip('"')
+            app_logger.mark_session_start(
+                f".vscode/xcode/logs/app_{device}.log", session_id
+            )
+        except Exception as e:
+            log_message(f"Error marking app log session start: {str(e)}")
         log_message(f"Creating Session with session id: {session_id}")
         result.AppendMessage("Start lldb watching new instance of App")
 
@@ -648,13 +657,22 @@ def app_log(
     internal_dict,
 ):
     """
-    On/off application logging.
+    On/off application logging and filter rules of app log lines:
+        app_log on|off
+        app_log include <regex>
+        app_log exclude <regex>
+        app_log subsystem <name>
+        app_log level <debug|info|default|warning|error|fault>
+        app_log limit <lines per second> <regex>
+        app_log clear
+        app_log rules
 
     :param debugger: debugger instance
     :param command: The command string.
     :param result: Description
     :param internal_dict: Description
     """
+    command = command.strip()
     if command == "on":
         app_logger.enabled = True
         result.AppendMessage("App Logger Turned On")
@@ -662,7 +680,12 @@ def app_log(
         app_logger.enabled = False
         result.AppendMessage("App Logger Turned Off")
     else:
-        result.AppendMessage("Valid value of app_log command is <on/off>")
+        try:
+            result.AppendMessage(app_logger.filter.apply_command(command))
+        except Exception as e:
+            result.AppendMessage(
+                f"{str(e)}\nValid values of app_log command are <on/off/include/exclude/subsystem/level/limit/clear/rules>"
+            )
 
 
 def terminate_debugger(
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Splits compiler command lines the same way as shlex.split (posix mode, no comments), but works with
+# regex matched parts instead of characters, and extracts compiled files in the same pass.
+import re
+
+PLAIN_TOKEN_REGEX = re.compile(r"[^ \t\r\n]+")
+
+PART_REGEX = re.compile(
+    r"""([^ \t\r\n'"\\]+)"""  # 1 - plain chars
+    r"""|\\([\s\S])"""  # 2 - escaped char
+    r"""|'([^']*)'"""  # 3 - single quoted
+    r"""|"((?:[^"\\]|\\[\s\S])*)\""""  # 4 - double quoted
+    r"""|([ \t\r\n]+)"""  # 5 - whitespace
+    r"""|([\s\S])"""  # 6 - not closed quote or escape at the end
+)
+DOUBLE_QUOTED_ESCAPE_REGEX = re.compile(r'\\(["\\])')
+
+COMPILE_FILE_KEYS = ("-primary-file", "-c")
+
+
+def iter_tokens(line: str):
+    """
+    Yields (token, end position of token in the line) like shlex.split, raises ValueError on not
+    closed quotes and escape at the end of the line.
+
+    :param line: command line
+    """
+    if "'" not in line and '"' not in line and "\\" not in line:
+        # most of compiler command lines don't need quote processing
+        for match in PLAIN_TOKEN_REGEX.finditer(line):
+            yield match.group(0), match.end()
+        return
+
+    token = []
+    has_token = False
+    end = 0
+    for match in PART_REGEX.finditer(line):
+        group = match.lastindex
+        if group == 5:
+            if has_token:
+                yield "".join(token), end
+                token = []
+                has_token = False
+            continue
+        if group == 6:
+            if match.group(6) == "\\":
+                raise ValueError("No escaped character")
+            raise ValueError("No closing quotation")
+        value = match.group(group)
+        if group == 4 and "\\" in value:
+            # only \" and \\ are escapes inside of double quotes
+            value = DOUBLE_QUOTED_ESCAPE_REGEX.sub(r"\1", value)
+        token.append(value)
+        has_token = True
+        end = match.end()
+    if has_token:
+        yield "".join(token), end
+
+
+def split_command_line(line: str) -> list[str]:
+    """
+    Same as shlex.split(line).
+
+    :param line: command line
+    """
+    return [token for token, _ in iter_tokens(line)]
+
+
+def compile_files(line: str) -> list[str]:
+    """
+    Absolute paths which follow -primary-file or -c arguments. Tokenizing stops once there is
+    no key in the rest of the line, so only an error before that point (not closed quote) gives no files.
+
+    :param line: swift-frontend or clang command line
+    """
+    last_key = max(line.rfind(key) for key in COMPILE_FILE_KEYS)
+    if last_key == -1:
+        return []
+    files = []
+    after_key = False
+    try:
+        for token, end in iter_tokens(line):
+            if after_key and token.startswith("/"):
+                files.append(token)
+            after_key = token in COMPILE_FILE_KEYS
+            if not after_key and end > last_key:
+                break
+    except ValueError:
+        return []
+    return files
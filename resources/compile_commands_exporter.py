@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Keeps compile_commands.json (clang JSON compilation database) up to date from the latest command lines
+# of the hot reload log accumulator.
+import os
+import json
+import pathlib
+from command_line_tokenizer import split_command_line
+
+
+def compile_command_entry(file: str, line: str, directory: str) -> dict:
+    """
+    :param file: compiled file
+    :param line: swift-frontend or clang command line
+    :param directory: working directory if the command line doesn't have -working-directory
+    """
+    try:
+        arguments = split_command_line(line)
+    except ValueError:
+        return {"directory": directory, "file": file, "command": line}
+    try:
+        directory = arguments[arguments.index("-working-directory") + 1]
+    except (ValueError, IndexError):
+        pass
+    return {"directory": directory, "file": file, "arguments": arguments}
+
+
+class CompileCommandsExporter:
+    """
+    Only entries of files changed since the last export are encoded again, the file is written with
+    already encoded entries to a tmp file and replaced atomically.
+    """
+
+    def __init__(self, log_accumulator, path, directory: str):
+        self.log_accumulator = log_accumulator
+        self.path = pathlib.Path(path)
+        self.directory = directory
+        # file -> encoded entry
+        self.entries = {}
+        self.seq = 0
+
+    def update(self) -> bool:
+        """
+        :return: True if the file was written
+        """
+        changed = self.log_accumulator.changed_since(self.seq)
+        self.seq = self.log_accumulator.seq
+        if not changed and self.path.exists():
+            return False
+        for file in reversed(changed):
+            line = self.log_accumulator.command(file)
+            if line is None:
+                self.entries.pop(file, None)
+                continue
+            self.entries[file] = json.dumps(
+                compile_command_entry(file, line, self.directory)
+            )
+        self._write()
+        return True
+
+    def _write(self):
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("[")
+                for i, entry in enumerate(self.entries.values()):
+                    f.write(",\n  " if i > 0 else "\n  ")
+                    f.write(entry)
+                f.write("\n]\n")
+            os.replace(tmp_path, self.path)
+        except:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -4,6 +4,13 @@ import json
 import os
 import time
 import signal
+import sys
+import struct
+import socket
+import select
+import threading
+import re
+import hashlib
 
 # to update psutil: cd resources && pip install -t lib/ filelock
 import lib.filelock as fileLock
@@ -11,6 +18,27 @@ import lib.filelock as fileLock
 CAN_RUN_HIGH_PRIORITY_SUBPROCESS = True
 
 
+def has_process_name(command_line: str, process_name: str) -> bool:
+    """
+    Checks if the command line contains the process name followed by whitespace or the end of line.
+
+    :param command_line: command line of a process
+    :param process_name: process name to search for
+    """
+    index = 0
+    while index < len(command_line):
+        index = command_line.find(process_name, index)
+        if index == -1:
+            return False
+        if index + len(process_name) == len(command_line) or (
+            index + len(process_name) < len(command_line)
+            and command_line[index + len(process_name)] in " \t"
+        ):  # end of line or followed by whitespace
+            return True
+        index += len(process_name)
+    return False
+
+
 def get_list_of_pids(process_name: str) -> set[str]:
     """
     Get list of PIDs for the given process name.
@@ -18,55 +46,348 @@ def get_list_of_pids(process_name: str) -> set[str]:
     :param process_name: process name to search for
     :type process_name: str
     """
-    global CAN_RUN_HIGH_PRIORITY_SUBPROCESS
-
-    def call_ps(command: list[str]) -> subprocess.CompletedProcess:
-        return subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True,
+    watcher = create_process_watcher()
+    try:
+        return set(
+            pid
+            for pid, command_line in watcher.new_processes()
+            if has_process_name(command_line, process_name)
         )
+    finally:
+        watcher.close()
 
-    ps_command = ["ps", "-eo", "pid,command"]
-    if CAN_RUN_HIGH_PRIORITY_SUBPROCESS:
-        try:
-            proc = call_ps(["nice", "-n", "-20"] + ps_command)
-        except PermissionError:
-            CAN_RUN_HIGH_PRIORITY_SUBPROCESS = False
+
+# ---------PROCESS WATCHER-------------------------
+
+
+class ProcessWatcher:
+    """
+    Reports processes which were not seen by previous calls of new_processes.
+    The first call reports all running processes.
+    """
+
+    # a forked process can exec a new command after it was seen, so recently started processes are rechecked
+    RECHECK_INTERVAL = 1.0
+
+    def __init__(self):
+        self.known_pids: set[str] = set()
+        self.recent_processes: dict[str, tuple[float, str]] = {}
+        self._is_first_call = True
+
+    def _list_pids(self) -> set[str]:
+        raise NotImplementedError
+
+    def _command_line(self, pid: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def new_processes(self) -> list[tuple[str, str]]:
+        """
+        :return: list of (pid, command line) of processes which appeared or executed a new command since the last call
+        """
+        now = time.time()
+        current_pids = self._list_pids()
+        # forget exited processes, so a reused pid is reported again
+        new_pids = current_pids - self.known_pids
+        self.known_pids = current_pids
+
+        result = []
+        for pid, (seen_time, command_line) in list(self.recent_processes.items()):
+            if pid not in current_pids or now - seen_time > self.RECHECK_INTERVAL:
+                del self.recent_processes[pid]
+                continue
+            new_command_line = self._command_line(pid)
+            if new_command_line and new_command_line != command_line:
+                self.recent_processes[pid] = (seen_time, new_command_line)
+                result.append((pid, new_command_line))
+
+        for pid in new_pids:
+            command_line = self._command_line(pid)
+            if not self._is_first_call:
+                self.recent_processes[pid] = (now, command_line)
+            if command_line:
+                result.append((pid, command_line))
+        self._is_first_call = False
+        return result
+
+
+class PsProcessWatcher(ProcessWatcher):
+    """
+    Fallback watcher, lists all processes with `ps`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lines: dict[str, str] = {}
+
+    def _list_pids(self) -> set[str]:
+        global CAN_RUN_HIGH_PRIORITY_SUBPROCESS
+
+        def call_ps(command: list[str]) -> subprocess.CompletedProcess:
+            return subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+
+        ps_command = ["ps", "-eo", "pid,command"]
+        if CAN_RUN_HIGH_PRIORITY_SUBPROCESS:
+            try:
+                proc = call_ps(["nice", "-n", "-20"] + ps_command)
+            except PermissionError:
+                CAN_RUN_HIGH_PRIORITY_SUBPROCESS = False
+                proc = call_ps(ps_command)
+        else:
             proc = call_ps(ps_command)
-    else:
-        proc = call_ps(ps_command)
 
-    lines = proc.stdout.split("\n")
-    result = set()
+        self.lines = {}
+        for line in proc.stdout.split("\n")[1:]:  # Skip the header line
+            line = line.strip()
+            if len(line) == 0:
+                break
+            pid, _, command_line = line.partition(" ")
+            self.lines[pid] = command_line.strip()
+        return set(self.lines)
 
-    def has_process_name(line: str) -> bool:
-        index = 0
-        while index < len(line):
-            index = line.find(process_name, index)
-            if index == -1:
-                return False
-            if index + len(process_name) == len(line) or (
-                index + len(process_name) < len(line)
-                and line[index + len(process_name)] in " \t"
-            ):  # end of line or followed by whitespace
-                return True
-            index += len(process_name)
-        return False
+    def _command_line(self, pid: str):
+        return self.lines.get(pid)
+
+
+class ProcfsProcessWatcher(ProcessWatcher):
+    """
+    Linux watcher, lists /proc and reads cmdline only of new processes.
+    """
+
+    @staticmethod
+    def is_available() -> bool:
+        return sys.platform.startswith("linux") and os.path.isdir("/proc/self")
+
+    def _list_pids(self) -> set[str]:
+        return set(x for x in os.listdir("/proc") if x.isdigit())
+
+    def _command_line(self, pid: str):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as file:
+                cmdline = file.read()
+        except OSError:
+            return None  # already exited
+        if len(cmdline) == 0:
+            return None  # kernel thread or zombie
+        command_line = cmdline.rstrip(b"\0").replace(b"\0", b" ")
+        return command_line.decode("utf-8", errors="replace")
+
+
+class NetlinkProcessWatcher(ProcfsProcessWatcher):
+    """
+    Linux watcher, listens to exec events of the netlink process connector (requires CAP_NET_ADMIN).
+    /proc is still rescanned periodically in case events are not delivered (containers, dropped events).
+    """
+
+    NETLINK_CONNECTOR = 11
+    CN_IDX_PROC = 1
+    CN_VAL_PROC = 1
+    PROC_CN_MCAST_LISTEN = 1
+    PROC_EVENT_EXEC = 0x00000002
+    NLMSG_DONE = 3
+    NLMSG_HEADER = struct.Struct("=IHHII")
+    CN_MSG_HEADER = struct.Struct("=IIIIHH")
+    PROC_EVENT_HEADER = struct.Struct("=IIQ")
+    EXEC_EVENT = struct.Struct("=II")
+
+    RESCAN_INTERVAL = 0.25
+
+    def __init__(self):
+        super().__init__()
+        self.last_scan_time = 0.0
+        self.sock = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_DGRAM, self.NETLINK_CONNECTOR
+        )
+        try:
+            self.sock.bind((os.getpid(), self.CN_IDX_PROC))
+            op = struct.pack("=I", self.PROC_CN_MCAST_LISTEN)
+            cn_msg = self.CN_MSG_HEADER.pack(
+                self.CN_IDX_PROC, self.CN_VAL_PROC, 0, 0, len(op), 0
+            )
+            length = self.NLMSG_HEADER.size + len(cn_msg) + len(op)
+            header = self.NLMSG_HEADER.pack(length, self.NLMSG_DONE, 0, 0, os.getpid())
+            self.sock.send(header + cn_msg + op)
+            self.sock.setblocking(False)
+        except:
+            self.sock.close()
+            raise
+
+    def close(self):
+        self.sock.close()
+
+    def _exec_pids(self, timeout: float) -> list[str]:
+        pids = []
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        while ready:
+            try:
+                data = self.sock.recv(4096)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + self.NLMSG_HEADER.size <= len(data):
+                length = self.NLMSG_HEADER.unpack_from(data, offset)[0]
+                if length == 0:
+                    break
+                event_offset = offset + self.NLMSG_HEADER.size + self.CN_MSG_HEADER.size
+                what = self.PROC_EVENT_HEADER.unpack_from(data, event_offset)[0]
+                if what == self.PROC_EVENT_EXEC:
+                    pid, _ = self.EXEC_EVENT.unpack_from(
+                        data, event_offset + self.PROC_EVENT_HEADER.size
+                    )
+                    pids.append(str(pid))
+                offset += (length + 3) & ~3  # NLMSG_ALIGN
+        return pids
+
+    def new_processes(self, timeout: float = 0.0) -> list[tuple[str, str]]:
+        """
+        :param timeout: time to wait for exec events
+        """
+        result = []
+        reported = set()
+        for pid in self._exec_pids(timeout):
+            command_line = self._command_line(pid)
+            self.known_pids.add(pid)
+            if command_line and pid not in reported:
+                reported.add(pid)
+                result.append((pid, command_line))
+
+        now = time.time()
+        if now - self.last_scan_time >= self.RESCAN_INTERVAL:
+            self.last_scan_time = now
+            result += [x for x in super().new_processes() if x[0] not in reported]
+        return result
+
+
+class LibprocProcessWatcher(ProcessWatcher):
+    """
+    macOS watcher, lists pids with libproc and reads arguments (sysctl KERN_PROCARGS2) only of new processes.
+    """
+
+    CTL_KERN = 1
+    KERN_ARGMAX = 8
+    KERN_PROCARGS2 = 49
 
-    for line in lines[1:]:  # Skip the header line
-        columns = line.split()
-        if len(line) == 0:
-            break
+    @staticmethod
+    def is_available() -> bool:
+        return sys.platform == "darwin" and os.path.exists("/usr/lib/libproc.dylib")
 
-        command_start = line.find(columns[0]) + len(columns[0])
-        proc_line = line[command_start:].strip()
-        if len(columns) >= 2 and has_process_name(proc_line):
-            pid = columns[0]
-            result.add(pid)
+    def __init__(self):
+        super().__init__()
+        import ctypes
 
-    return result
+        self.ctypes = ctypes
+        self.libc = ctypes.CDLL("/usr/lib/libSystem.B.dylib", use_errno=True)
+        self.libproc = ctypes.CDLL("/usr/lib/libproc.dylib", use_errno=True)
+        argmax = ctypes.c_int(0)
+        size = ctypes.c_size_t(ctypes.sizeof(argmax))
+        mib = (ctypes.c_int * 2)(self.CTL_KERN, self.KERN_ARGMAX)
+        if self.libc.sysctl(mib, 2, ctypes.byref(argmax), ctypes.byref(size), None, 0):
+            raise OSError(ctypes.get_errno(), "sysctl KERN_ARGMAX failed")
+        self.args_buffer = ctypes.create_string_buffer(argmax.value)
+
+    def _list_pids(self) -> set[str]:
+        ctypes = self.ctypes
+        count = self.libproc.proc_listallpids(None, 0)
+        while True:
+            buffer = (ctypes.c_int * (count + 64))()
+            count = self.libproc.proc_listallpids(buffer, ctypes.sizeof(buffer))
+            if count < len(buffer):
+                return set(str(buffer[i]) for i in range(count) if buffer[i] > 0)
+
+    def _command_line(self, pid: str):
+        ctypes = self.ctypes
+        mib = (ctypes.c_int * 3)(self.CTL_KERN, self.KERN_PROCARGS2, int(pid))
+        size = ctypes.c_size_t(len(self.args_buffer))
+        if self.libc.sysctl(mib, 3, self.args_buffer, ctypes.byref(size), None, 0):
+            return None  # exited or not permitted
+        return self.procargs_command_line(self.args_buffer.raw[: size.value])
+
+    @staticmethod
+    def procargs_command_line(data: bytes) -> str:
+        """
+        Command line of KERN_PROCARGS2 data: int argc, exec path, NUL padding, argv[0] ... argv[argc - 1], env.
+        Arguments are NUL terminated, so only the padding is skipped and empty arguments are kept.
+        """
+        argc = int.from_bytes(data[0:4], sys.byteorder)
+        start = data.find(b"\0", 4)
+        if start == -1:
+            return ""
+        while start < len(data) and data[start] == 0:
+            start += 1
+        args = data[start:].split(b"\0")[:argc]
+        return b" ".join(args).decode("utf-8", errors="replace")
+
+
+def create_process_watcher() -> ProcessWatcher:
+    """
+    Creates the cheapest process watcher available on this system, `ps` based watcher is used as fallback.
+    """
+    if ProcfsProcessWatcher.is_available():
+        try:
+            return NetlinkProcessWatcher()
+        except (OSError, AttributeError):  # no permission or no AF_NETLINK
+            return ProcfsProcessWatcher()
+    if LibprocProcessWatcher.is_available():
+        try:
+            return LibprocProcessWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PsProcessWatcher()
+
+
+def wait_for_new_process(
+    process_name: str,
+    existing_pids: set[str],
+    callback=None,
+    should_stop=None,
+    interval: float = 0.001,
+    max_interval: float = 0.05,
+):
+    """
+    Blocks until a new process with the given name is started. Polling watchers back off while no processes
+    are started: the time between polls doubles from `interval` up to `max_interval`.
+
+    :param process_name: process name to search for
+    :param existing_pids: PIDs which should be ignored
+    :param callback: called with the pid of a found process, waiting continues while it returns True
+    :param should_stop: called periodically, waiting stops once it returns True
+    :param interval: time between polls of the process list after processes were started
+    :param max_interval: max time between polls of the process list, or of waiting for exec events
+    :return: PID of the last found process or None if stopped
+    """
+    watcher = create_process_watcher()
+    found_pid = None
+    delay = interval
+    try:
+        while True:
+            if should_stop is not None and should_stop():
+                return found_pid
+            if isinstance(watcher, NetlinkProcessWatcher):
+                # exec events wake it up at once, the timeout only bounds checks of should_stop
+                processes = watcher.new_processes(timeout=max_interval)
+            else:
+                processes = watcher.new_processes()
+            for pid, command_line in processes:
+                if pid in existing_pids or not has_process_name(
+                    command_line, process_name
+                ):
+                    continue
+                found_pid = pid
+                if callback is None or not callback(pid):
+                    return found_pid
+            if not isinstance(watcher, NetlinkProcessWatcher):
+                # a new process can be followed by the one we wait for (xcodebuild spawns several processes)
+                delay = interval if processes else min(delay * 2, max_interval)
+                time.sleep(delay)
+    finally:
+        watcher.close()
 
 
 class ProcessError(Exception):
@@ -155,9 +476,397 @@ def update_git_exclude(file_to_exclude):
             print(f"Git ignore update exception: {str(e)}")
 
 
+# ---------FILE WATCHER----------------------------
+
+
+def file_stat_key(path: str):
+    """
+    Key which changes on every write or replace of the file, None if file doesn't exist.
+
+    :param path: file path
+    """
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    """
+    Waits for changes of a single file. Base implementation polls the file stat.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_key = file_stat_key(path)
+
+    def _wait_event(self, timeout: float):
+        time.sleep(min(timeout, self.POLL_INTERVAL))
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until the file is changed (written, created, replaced or deleted).
+
+        :param timeout: max time to wait in seconds, None to wait forever
+        :return: True if the file changed, False on timeout
+        """
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            key = file_stat_key(self.path)
+            if key != self.last_key:
+                self.last_key = key
+                return True
+            remaining = 1.0 if end_time is None else end_time - time.time()
+            if remaining <= 0:
+                return False
+            # events only wake up the waiter earlier, stat key decides if file changed
+            self._wait_event(min(remaining, 1.0))
+
+    def wait_settled(
+        self, timeout: float = None, quiet: float = 0.1, max_delay: float = 1.0
+    ) -> bool:
+        """
+        Waits for a change and then for a burst of changes to end: returns once the file was not changed
+        for `quiet` seconds or `max_delay` seconds after the first change, whatever comes first.
+
+        :param timeout: max time to wait for the first change in seconds, None to wait forever
+        :param quiet: time without changes which ends the burst
+        :param max_delay: max time to wait for the end of the burst
+        :return: True if the file changed, False on timeout
+        """
+        if not self.wait(timeout):
+            return False
+        end_time = time.time() + max_delay
+        while True:
+            remaining = end_time - time.time()
+            if remaining <= 0 or not self.wait(min(quiet, remaining)):
+                return True
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class InotifyFileWatcher(FileWatcher):
+    """
+    Linux watcher, watches the parent folder as files are replaced atomically.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    EVENT_HEADER = struct.Struct("iIII")
+
+    @staticmethod
+    def is_available() -> bool:
+        return sys.platform.startswith("linux")
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        folder = os.path.dirname(os.path.abspath(path))
+        mask = (
+            self.IN_MODIFY
+            | self.IN_ATTRIB
+            | self.IN_CLOSE_WRITE
+            | self.IN_MOVED_TO
+            | self.IN_CREATE
+            | self.IN_DELETE
+        )
+        if libc.inotify_add_watch(self.fd, folder.encode("utf-8"), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {folder}")
+
+    def _wait_event(self, timeout: float):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class KqueueFileWatcher(FileWatcher):
+    """
+    macOS watcher, watches the parent folder (file replaced/created) and the file itself (written).
+    """
+
+    @staticmethod
+    def is_available() -> bool:
+        return hasattr(select, "kqueue")
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.kq = select.kqueue()
+        self.file_fd = -1
+        self.file_ino = None
+        # O_EVTONLY on macOS, do not prevent the volume from being unmounted
+        self.open_flags = getattr(os, "O_EVTONLY", os.O_RDONLY)
+        folder = os.path.dirname(os.path.abspath(path))
+        self.folder_fd = os.open(folder, self.open_flags)
+        self._register(self.folder_fd, select.KQ_NOTE_WRITE)
+        self._watch_file()
+
+    def _register(self, fd: int, fflags: int):
+        event = select.kevent(
+            fd,
+            filter=select.KQ_FILTER_VNODE,
+            flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+            fflags=fflags,
+        )
+        self.kq.control([event], 0, 0)
+
+    def _watch_file(self):
+        key = file_stat_key(self.path)
+        ino = key[2] if key else None
+        if ino == self.file_ino and self.file_fd >= 0:
+            return
+        if self.file_fd >= 0:
+            os.close(self.file_fd)  # closing removes its events from kqueue
+            self.file_fd = -1
+        self.file_ino = ino
+        if ino is None:
+            return
+        try:
+            self.file_fd = os.open(self.path, self.open_flags)
+        except OSError:
+            return
+        self._register(
+            self.file_fd,
+            select.KQ_NOTE_WRITE
+            | select.KQ_NOTE_EXTEND
+            | select.KQ_NOTE_ATTRIB
+            | select.KQ_NOTE_DELETE
+            | select.KQ_NOTE_RENAME,
+        )
+
+    def _wait_event(self, timeout: float):
+        self.kq.control(None, 8, timeout)
+        self._watch_file()
+
+    def close(self):
+        if self.file_fd >= 0:
+            os.close(self.file_fd)
+            self.file_fd = -1
+        if self.folder_fd >= 0:
+            os.close(self.folder_fd)
+            self.folder_fd = -1
+        self.kq.close()
+
+
+def create_file_watcher(path: str) -> FileWatcher:
+    """
+    Creates inotify (Linux) or kqueue (macOS) file watcher, polling watcher is used as fallback.
+
+    :param path: file to watch, parent folder should exist for event based watchers
+    """
+    for watcher_class in [InotifyFileWatcher, KqueueFileWatcher]:
+        if watcher_class.is_available():
+            try:
+                return watcher_class(path)
+            except (OSError, AttributeError):
+                break
+    return FileWatcher(path)
+
+
 # ---------DEBUGGER--------------------------------
+# legacy storage of all sessions in one json, only read for compatibility and migrated on compaction
 DEBUGGER_CONFIG_FILE = ".vscode/xcode/debugger.launching"
 DEBUGGER_CONFIG_FILE_LOCK = f"{DEBUGGER_CONFIG_FILE}.lock"
+# one small record per session: {"updated": time, "state": {...}}, replaced atomically so readers don't need the lock
+DEBUGGER_SESSIONS_FOLDER = ".vscode/xcode/debugger.sessions"
+# stopped sessions are kept for a while, so late updates can not bring them back
+STOPPED_SESSION_TTL = 10 * 60
+# sessions which were never reported as stopped (crashed debugger or extension)
+SESSION_TTL = 24 * 60 * 60
+
+
+class DebuggerSessionState:
+    """
+    In-memory view of debugger sessions, a session record is re-read only if it was changed.
+    """
+
+    def __init__(
+        self,
+        sessions_folder: str = DEBUGGER_SESSIONS_FOLDER,
+        legacy_config_file: str = DEBUGGER_CONFIG_FILE,
+    ):
+        self.sessions_folder = sessions_folder
+        self.legacy_config_file = legacy_config_file
+        self._mutex = threading.Lock()
+        # record path -> (stat key, record)
+        self._records = {}
+        self._legacy_key = None
+        self._legacy_config = {}
+
+    def record_path(self, session_id) -> str:
+        """
+        :param session_id: Debugger session identifier
+        """
+        session_id = str(session_id)
+        if not re.fullmatch(r"[\w.-]+", session_id):
+            session_id = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.sessions_folder, f"{session_id}.json")
+
+    def _read_record(self, path: str):
+        key = file_stat_key(path)
+        if key is None:
+            self._records.pop(path, None)
+            return None
+        cached = self._records.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as file:
+            record = json.load(file)
+        self._records[path] = (key, record)
+        return record
+
+    def legacy_config(self) -> dict:
+        """
+        Get sessions of the legacy file, raises an exception if there's no file or it can not be parsed
+        (the extension empties it on start), so unknown sessions are treated as before records were added.
+        """
+        key = file_stat_key(self.legacy_config_file)
+        if key is None:
+            raise FileNotFoundError(self.legacy_config_file)
+        if key != self._legacy_key:
+            with open(self.legacy_config_file, "r", encoding="utf-8") as file:
+                config = json.load(file)
+            if not isinstance(config, dict):
+                raise ValueError(f"Invalid debugger config: {self.legacy_config_file}")
+            self._legacy_key = key
+            self._legacy_config = config
+        return self._legacy_config
+
+    def session(self, session_id):
+        """
+        Get a session state, None if there's no such session.
+
+        :param session_id: Debugger session identifier
+        """
+        with self._mutex:
+            record = self._read_record(self.record_path(session_id))
+            if record is not None:
+                return record["state"]
+            return self.legacy_config().get(session_id, None)
+
+    def write_session(self, session_id, state: dict):
+        """
+        Atomically replace the session record, should be called under DEBUGGER_CONFIG_FILE_LOCK.
+
+        :param session_id: Debugger session identifier
+        :param state: session state
+        """
+        path = self.record_path(session_id)
+        os.makedirs(self.sessions_folder, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"updated": time.time(), "state": state}, file)
+        os.replace(tmp_path, path)
+
+    def compact(self, now: float = None):
+        """
+        Remove expired session records and migrate the legacy file, should be called under DEBUGGER_CONFIG_FILE_LOCK.
+
+        :param now: current time
+        """
+        now = time.time() if now is None else now
+        try:
+            names = os.listdir(self.sessions_folder)
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.sessions_folder, name)
+            try:
+                if name.endswith(".tmp"):
+                    expired = now - os.path.getmtime(path) > STOPPED_SESSION_TTL
+                else:
+                    with open(path, "r", encoding="utf-8") as file:
+                        record = json.load(file)
+                    age = now - record["updated"]
+                    expired = age > SESSION_TTL or (
+                        record["state"].get("status") == "stopped"
+                        and age > STOPPED_SESSION_TTL
+                    )
+                if expired:
+                    os.remove(path)
+            except (OSError, ValueError, KeyError, AttributeError):
+                continue
+
+        try:
+            legacy_config = self.legacy_config()
+        except (OSError, ValueError):
+            return
+        if len(legacy_config) == 0:
+            return
+        for session_id, state in legacy_config.items():
+            if state.get("status") == "stopped":
+                continue
+            if not os.path.exists(self.record_path(session_id)):
+                self.write_session(session_id, state)
+        with open(self.legacy_config_file, "w", encoding="utf-8") as file:
+            file.write("{}")
+
+    def wait_until(self, session_id, predicate, timeout: float = None):
+        """
+        Blocks until the predicate returns True for the session state, wakes up on file changes instead of polling.
+
+        :param session_id: Debugger session identifier
+        :param predicate: called with the session state or None if there's no such session
+        :param timeout: max time to wait in seconds, None to wait forever
+        :return: the session state which satisfies the predicate
+        :raises TimeoutError: if timeout expired
+        """
+        end_time = None if timeout is None else time.time() + timeout
+        try:
+            os.makedirs(self.sessions_folder, exist_ok=True)
+        except OSError:
+            pass  # polling watcher would be used
+        with create_file_watcher(self.record_path(session_id)) as watcher:
+            while True:
+                try:
+                    session = self.session(session_id)
+                    if predicate(session):
+                        return session
+                except (OSError, ValueError, AttributeError, KeyError):
+                    pass  # no storage yet, wait for the next change
+                remaining = None if end_time is None else end_time - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Debug session {session_id} is not changed")
+                watcher.wait(remaining)
+
+
+DEBUGGER_SESSION_STATE = DebuggerSessionState()
+
+
+def _is_session_valid(session) -> bool:
+    if session is None:
+        return False
+    if not "status" in session:
+        return True  # valid as it's not reported as stopped yet
+    return session["status"] != "stopped"
 
 
 def wait_debugger_to_action(session_id, actions: list[str]):
@@ -168,20 +877,20 @@ def wait_debugger_to_action(session_id, actions: list[str]):
     :param actions: List of actions to wait for
     :type actions: list[str]
     """
-    while True:
-        with fileLock.FileLock(DEBUGGER_CONFIG_FILE_LOCK):
-            with open(DEBUGGER_CONFIG_FILE, "r", encoding="utf-8") as file:
-                config = json.load(file)
-        if config is not None and not session_id in config:
-            break
-
-        if config is not None and config[session_id]["status"] in actions:
-            break
+    DEBUGGER_SESSION_STATE.wait_until(
+        session_id, lambda session: session is None or session.get("status") in actions
+    )
 
-        time.sleep(1)
 
+def wait_debug_session_invalid(session_id):
+    """
+    Wait until the debug session with the given session ID is stopped or removed.
 
-LAST_DEBUGGER_CONFIG_CACHE = {}
+    :param session_id: Debugger session identifier
+    """
+    DEBUGGER_SESSION_STATE.wait_until(
+        session_id, lambda session: not _is_session_valid(session)
+    )
 
 
 def is_debug_session_valid(session_id) -> bool:
@@ -193,33 +902,7 @@ def is_debug_session_valid(session_id) -> bool:
     :rtype: bool
     """
     try:
-        global LAST_DEBUGGER_CONFIG_CACHE
-
-        def check_status(config) -> bool:
-            if not session_id in config:
-                return False
-            if not "status" in config[session_id]:
-                return True  # valid as it's not reported as stopped yet
-            if config[session_id]["status"] == "stopped":
-                return False
-
-            return True
-
-        mtime = os.path.getmtime(DEBUGGER_CONFIG_FILE)
-        if (
-            "cache_mtime" in LAST_DEBUGGER_CONFIG_CACHE
-            and LAST_DEBUGGER_CONFIG_CACHE["cache_mtime"] == mtime
-        ):
-            return check_status(LAST_DEBUGGER_CONFIG_CACHE)
-
-        with fileLock.FileLock(DEBUGGER_CONFIG_FILE_LOCK):
-            with open(DEBUGGER_CONFIG_FILE, "r", encoding="utf-8") as file:
-                config = json.load(file)
-                LAST_DEBUGGER_CONFIG_CACHE = config
-                LAST_DEBUGGER_CONFIG_CACHE["cache_mtime"] = os.path.getmtime(
-                    DEBUGGER_CONFIG_FILE
-                )
-            return check_status(config)
+        return _is_session_valid(DEBUGGER_SESSION_STATE.session(session_id))
     except:  # no file or a key, so the session is valid
         return True
 
@@ -231,14 +914,10 @@ def get_debugger_launch_config(session_id, key):
     :param session_id: Debugger session identifier
     :param key: Configuration key
     """
-    with fileLock.FileLock(DEBUGGER_CONFIG_FILE_LOCK):
-        with open(DEBUGGER_CONFIG_FILE, "r", encoding="utf-8") as file:
-            config = json.load(file)
-            if config is not None and not session_id in config:
-                return None
-
-            if config is not None and config[session_id][key]:
-                return config[session_id][key]
+    session = DEBUGGER_SESSION_STATE.session(session_id)
+    if session is None:
+        return None
+    return session.get(key, None)
 
 
 def update_debugger_launch_config(session_id, key, value):
@@ -249,54 +928,174 @@ def update_debugger_launch_config(session_id, key, value):
     :param key: Configuration key
     :param value: Configuration value
     """
-    config = {}
     try:
         with fileLock.FileLock(DEBUGGER_CONFIG_FILE_LOCK):
-            if os.path.exists(DEBUGGER_CONFIG_FILE):
-                try:
-                    with open(DEBUGGER_CONFIG_FILE, "r+", encoding="utf-8") as file:
-                        config = json.load(file)
-                except:
-                    pass
+            try:
+                state = DEBUGGER_SESSION_STATE.session(session_id)
+            except:
+                state = None
+            state = dict(state) if state is not None else {}
 
-            if session_id in config:
-                # stopped can not be updated once reported
-                if (
-                    key == "status"
-                    and key in config[session_id]
-                    and config[session_id][key] == "stopped"
-                ):
-                    return
-                config[session_id][key] = value
-            else:
-                config[session_id] = {}
-                config[session_id][key] = value
+            # stopped can not be updated once reported
+            if key == "status" and key in state and state[key] == "stopped":
+                return
+            state[key] = value
+            DEBUGGER_SESSION_STATE.write_session(session_id, state)
 
-            with open(DEBUGGER_CONFIG_FILE, "w+", encoding="utf-8") as file:
-                json.dump(config, file, indent=2)
+            if key == "status" and value == "stopped":
+                DEBUGGER_SESSION_STATE.compact()
     except:
         pass  # config is empty
 
 
-if __name__ == "__main__":
-    print("ok")
-
-# ---------------------BINARY READER HELPER----------------------------
+# ---------------------FILE TAIL----------------------------
 
 
-def binary_readline(file, newline=b"\r\n"):
+class FileTail:
     """
-    Read a line from a binary file until the specified newline sequence.
+    Follows a growing file: reads big chunks, splits them into lines with bytes.find and keeps
+    the last partial line till it's completed. Waits for new data on file events (inotify/kqueue)
+    instead of sleeping, reopens the file if it's replaced or truncated.
 
-    :param file: Binary file object
-    :param newline: Newline sequence to read until
+    Supports size based rotation (file renamed to "<path>.1" and a new one created): the rest of the
+    rotated file is read before switching to the new one. Reading can be resumed from a position
+    (offset and inode) saved before, even if the file was rotated since then.
     """
-    line = bytearray()
-    while True:
-        x = file.read(1)
-        if x:
-            line.extend(x)
-            if line.endswith(newline):
-                return line
-        else:
-            time.sleep(0.1)
+
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, path: str, newline=b"\n", offset: int = 0, ino=None):
+        """
+        :param path: file path
+        :param newline: newline sequence
+        :param offset: position to start from, see `position`
+        :param ino: inode of the file the offset belongs to, None for the current file at path
+        """
+        self.path = path
+        self.newline = newline
+        self.file = None
+        self.ino = None
+        self.offset = 0
+        self.partial = b""
+        self.start = (offset, ino)
+        self.watcher = create_file_watcher(path)
+
+    @property
+    def rotated_path(self) -> str:
+        return f"{self.path}.1"
+
+    @property
+    def position(self):
+        """
+        (offset, inode) of the first byte which is not returned as a line yet.
+        """
+        # partial line started in the rotated file can not be resumed, it's skipped then
+        return max(self.offset - len(self.partial), 0), self.ino
+
+    def _open(self, path: str, ino, offset: int, keep_partial=False) -> bool:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        try:
+            self.file = open(path, "rb", buffering=0)
+        except OSError:
+            return False
+        if offset:
+            self.file.seek(offset)
+        self.ino = ino
+        self.offset = offset
+        if not keep_partial:
+            self.partial = b""
+        return True
+
+    def _open_at_start(self, key) -> bool:
+        offset, ino = self.start
+        if ino is None or ino == key[2]:
+            return self._open(self.path, key[2], offset if offset <= key[1] else 0)
+        rotated_key = file_stat_key(self.rotated_path)
+        if (
+            rotated_key is not None
+            and rotated_key[2] == ino
+            and offset <= rotated_key[1]
+        ):
+            return self._open(self.rotated_path, ino, offset)
+        # the file was replaced since the position was saved
+        return self._open(self.path, key[2], 0)
+
+    def read_lines(self) -> list[bytes]:
+        """
+        Reads all complete lines available now, without blocking. Lines include the newline sequence.
+        """
+        lines = []
+        key = file_stat_key(self.path)
+        if self.file is None:
+            if key is None or not self._open_at_start(key):
+                return lines
+        elif key is not None and key[2] == self.ino and key[1] < self.offset:
+            # truncated, start over
+            self._open(self.path, key[2], 0)
+
+        self._read_chunks(lines)
+
+        key = file_stat_key(self.path)
+        if key is not None and key[2] != self.ino:
+            # rotated or replaced, the old file is read till the end, continue with the new one.
+            # a line cut by rotation continues in the new file, so the partial line is kept
+            if self._open(self.path, key[2], 0, keep_partial=True):
+                self._read_chunks(lines)
+        return lines
+
+    def _read_chunks(self, lines: list):
+        newline_len = len(self.newline)
+        while True:
+            chunk = self.file.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            self.offset += len(chunk)
+            data = self.partial + chunk if self.partial else chunk
+            start = 0
+            while True:
+                end = data.find(self.newline, start)
+                if end == -1:
+                    break
+                end += newline_len
+                lines.append(data[start:end])
+                start = end
+            self.partial = data[start:]
+            if len(chunk) < self.CHUNK_SIZE:
+                break
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until the file changes.
+
+        :param timeout: max time to wait in seconds, None to wait forever
+        :return: True if the file changed, False on timeout
+        """
+        return self.watcher.wait(timeout)
+
+    def follow(self, should_stop=None, timeout: float = 1.0):
+        """
+        Yields batches of new lines as they are written to the file.
+
+        :param should_stop: optional callback, checked at least every timeout seconds
+        :param timeout: max time to wait for file events between checks of should_stop
+        """
+        while should_stop is None or not should_stop():
+            lines = self.read_lines()
+            if lines:
+                yield lines
+            else:
+                self.wait(timeout)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.watcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
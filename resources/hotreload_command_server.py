@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Serves latest compile command lines of the hot reload log accumulator over a unix socket,
+# so a single file can be looked up without parsing the whole dumped xcactivitylog.
+#
+# Protocol: one json object per line in both directions
+#   {"method": "command", "file": "/path/File.swift"}
+#       -> {"epoch": e, "seq": n, "file": f, "command": "swift-frontend ..." or null}
+#   {"method": "changed_since", "seq": n, "epoch": e}
+#       -> {"epoch": e, "seq": n, "reset": bool, "files": [...]}
+# Sequences are only valid for one process (epoch), if the epoch of the request is different
+# all files are returned with "reset": true.
+# The extension doesn't query the server yet, it's used by tools through the command line below.
+# usage: python3 resources/hotreload_command_server.py <workspace> command <file> | changed_since <seq> [epoch]
+import os
+import sys
+import json
+import errno
+import uuid
+import socket
+import hashlib
+import tempfile
+import threading
+import socketserver
+
+# max length of unix socket path is 104 on macOS
+MAX_SOCKET_PATH = 100
+
+
+def socket_path(workspace_path: str) -> str:
+    path = os.path.join(workspace_path, ".vscode", "xcode", "hotreload_commands.sock")
+    if len(path.encode("utf-8")) <= MAX_SOCKET_PATH:
+        return path
+    workspace_hash = hashlib.sha256(workspace_path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"vscode-ios-{workspace_hash}.sock")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.command_server.handle(json.loads(line))
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CompileCommandServer:
+    """
+    Answers queries from the in-memory LogAccumulator, the accumulator is changed by the ingesting thread
+    only while `lock` is held.
+    """
+
+    def __init__(self, log_accumulator, path: str, lock=None):
+        self.log_accumulator = log_accumulator
+        self.path = path
+        self.lock = lock or threading.Lock()
+        self.epoch = uuid.uuid4().hex
+        self.server = None
+
+    def handle(self, request: dict) -> dict:
+        method = request.get("method")
+        with self.lock:
+            seq = self.log_accumulator.seq
+            if method == "command":
+                file = request["file"]
+                return {
+                    "epoch": self.epoch,
+                    "seq": seq,
+                    "file": file,
+                    "command": self.log_accumulator.command(file),
+                }
+            if method == "changed_since":
+                reset = request.get("epoch") != self.epoch
+                since = 0 if reset else int(request["seq"])
+                return {
+                    "epoch": self.epoch,
+                    "seq": seq,
+                    "reset": reset,
+                    "files": self.log_accumulator.changed_since(since),
+                }
+        raise ValueError(f"Unknown method: {method}")
+
+    def start(self):
+        """
+        Raises OSError if another server answers on the socket, a socket left by a killed process is replaced.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if is_serving(self.path):
+            raise OSError(
+                errno.EADDRINUSE, "Compile command server is already running", self.path
+            )
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        self.server = _UnixServer(self.path, _Handler)
+        self.server.command_server = self
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def is_serving(path: str, timeout: float = 1.0) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except socket.timeout:
+            # busy server
+            return True
+        except OSError:
+            # no socket or nobody listens on it
+            return False
+    return True
+
+
+def query(path: str, request: dict, timeout: float = 5.0) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+if __name__ == "__main__":
+    path = socket_path(sys.argv[1])
+    if sys.argv[2] == "command":
+        request = {"method": "command", "file": sys.argv[3]}
+    else:
+        request = {"method": "changed_since", "seq": int(sys.argv[3])}
+        if len(sys.argv) > 4:
+            request["epoch"] = sys.argv[4]
+    print(json.dumps(query(path, request), indent=2))
@@ -3,138 +3,575 @@ import sys
 import pathlib
 import json
 import os
-import time
 import gzip
 import hashlib
+from collections import deque
+import helper
+import hotreload_command_server
 from xcode_build_helper import parse_xclogs
-
+from command_line_tokenizer import compile_files
+from compile_commands_exporter import CompileCommandsExporter
+from xclog_cache import XclogCache
 
 VERSION = "1.0.0"
 
 HOT_RELOAD_LOG_XCLOG_KEY = "hot_reload_log_xclog.xcactivitylog"
+# manifest is rewritten several times at the end of a build, parse logs once it's not changed for this time
+MANIFEST_QUIET_TIME = 0.1
+
+
+# ---------------- SHARED ARGUMENTS ----------------
+# Command lines of one module share almost all arguments, so a line is stored as a reference to an interned
+# argument table (arguments of the first line of the same module) and a delta: [[start, end, [arguments]]]
+# replacing table[start:end]. Arguments are units of the line split by a single space, so joining them back
+# gives exactly the same line, quoting doesn't matter.
+
+# resync window of diff_units, in arguments
+DIFF_LOOKAHEAD = 64
+# number of equal arguments to consider both sequences in sync again
+DIFF_SYNC = 3
+
+
+def split_units(line: str) -> list[str]:
+    return line.split(" ")
+
+
+def group_key(units: list[str]) -> str:
+    """
+    Lines of the same compiler, module and target share a table.
+    """
+    key = [units[0]]
+    for flag in ("-module-name", "-target"):
+        try:
+            key.append(units[units.index(flag) + 1])
+        except (ValueError, IndexError):
+            key.append("")
+    return "\0".join(key)
+
+
+def table_id(units: list[str]) -> str:
+    return hashlib.sha256("\0".join(units).encode("utf-8")).hexdigest()[:32]
 
 
 def to_hash_line(line: str):
     return hashlib.sha256(line.encode("utf-8")).hexdigest()
 
 
+def diff_units(base: list[str], units: list[str], max_changed: int):
+    """
+    Delta which turns base into units, greedy diff which resyncs within DIFF_LOOKAHEAD arguments.
+    Returns None if more than max_changed arguments are different.
+    """
+    delta = []
+    changed = 0
+    i = j = 0
+    len_base, len_units = len(base), len(units)
+    while i < len_base and j < len_units:
+        if base[i] == units[j]:
+            i += 1
+            j += 1
+            continue
+        sync = None
+        for distance in range(1, DIFF_LOOKAHEAD):
+            for x in range(distance + 1):
+                y = distance - x
+                if (
+                    i + x < len_base
+                    and j + y < len_units
+                    and base[i + x : i + x + DIFF_SYNC]
+                    == units[j + y : j + y + DIFF_SYNC]
+                ):
+                    sync = (x, y)
+                    break
+            if sync is not None:
+                break
+        if sync is None:
+            break
+        x, y = sync
+        delta.append([i, i + x, units[j : j + y]])
+        changed += max(x, y)
+        if changed > max_changed:
+            return None
+        i += x
+        j += y
+    if i < len_base or j < len_units:
+        delta.append([i, len_base, units[j:]])
+        changed += max(len_base - i, len_units - j)
+    if changed > max_changed:
+        return None
+    return delta
+
+
+def apply_delta(base: list[str], delta: list) -> list[str]:
+    result = []
+    position = 0
+    for start, end, replacement in delta:
+        result.extend(base[position:start])
+        result.extend(replacement)
+        position = end
+    result.extend(base[position:])
+    return result
+
+
 class LogAccumulator:
-    def __init__(self, log_accumulator_path):
-        self.log_accumulator_path = log_accumulator_path
-        self.dirty = False
-        self.data = self._read_log_accumulator(log_accumulator_path)
+    """
+    Keeps the latest compile command line of every source file.
+
+    Storage is an append-only journal of json lines, every change appends only the changed records:
+        {"version": VERSION}                                    - header
+        {"op": "table", "id": id, "args": [...]}               - shared arguments of lines
+        {"op": "line", "hash": h, "table": id, "delta": d, "st_ctime": t}
+                                                                - command line as a delta of the table
+        {"op": "file", "file": f, "hash": h}                   - file compiled with the command line
+        {"op": "parsed", "files": [...]}                       - parsed xclog files
+        {"op": "clean_parsed"}                                 - parsed xclog files reset
+    The journal is replayed on start and compacted (rewritten with live records only) once it has
+    COMPACT_RATIO times more records than live ones. The old json storage and "line" records with
+    full lines are migrated on the first start.
+    """
+
+    COMPACT_RATIO = 3
+    COMPACT_MIN_RECORDS = 1000
+    # a line with more changed arguments than this part of the table gets its own table
+    MAX_DELTA_RATIO = 0.1
+    # bytes of lines passed to gzip at once
+    DUMP_CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, log_accumulator_path, legacy_json_path=None):
+        self.log_accumulator_path = pathlib.Path(log_accumulator_path)
+        self.data = {"version": VERSION, "tables": {}, "hashes": {}, "files": {}}
+        # group key -> table of the latest lines of the group
+        self.groups = {}
+        # number of files compiled with the command line, line is dropped once it's not used
+        self.hash_refs = {}
+        self.pending = []
+        self.journal_records = 0
+        # journal of other version or with a cut line, it's rewritten instead of appending to it
+        self.compaction_needed = False
+        # hash of lines of the last dump
+        self.dump_hash = None
+        # change sequence of this process, file -> sequence of its last change, ordered by sequence
+        self.seq = 0
+        self.file_seq = {}
+
+        if self.log_accumulator_path.exists():
+            self._replay_journal()
+        elif legacy_json_path is not None and pathlib.Path(legacy_json_path).exists():
+            self._migrate(pathlib.Path(legacy_json_path))
+
+    def _set_table(self, table, units):
+        units = [sys.intern(unit) for unit in units]
+        self.data["tables"][table] = units
+        self.groups[group_key(units)] = table
+
+    def _encode(self, line: str):
+        """
+        Returns (table, delta, arguments of a new table or None).
+        """
+        units = split_units(line)
+        table = self.groups.get(group_key(units), None)
+        if table is not None:
+            base = self.data["tables"][table]
+            delta = diff_units(
+                base, units, max(16, int(len(base) * self.MAX_DELTA_RATIO))
+            )
+            if delta is not None:
+                return table, delta, None
+        table = table_id(units)
+        if table in self.data["tables"]:
+            self.groups[group_key(units)] = table
+            return table, [], None
+        return table, [], units
+
+    def line(self, hash_line) -> str:
+        """
+        Rebuilds the full command line.
+        """
+        value = self.data["hashes"][hash_line]
+        return " ".join(
+            apply_delta(self.data["tables"][value["table"]], value["delta"])
+        )
+
+    def command(self, file):
+        """
+        Latest command line of the file or None.
+        """
+        hash_line = self.data["files"].get(file, None)
+        if hash_line is None or hash_line not in self.data["hashes"]:
+            return None
+        return self.line(hash_line)
+
+    def changed_since(self, seq: int) -> list:
+        """
+        Files which command lines changed after the sequence, latest first.
+        """
+        files = []
+        for file in reversed(self.file_seq):
+            if self.file_seq[file] <= seq:
+                break
+            files.append(file)
+        return files
+
+    def _set_file(self, file, hash_line):
+        old_hash = self.data["files"].get(file, None)
+        if old_hash == hash_line:
+            return
+        self.data["files"][file] = hash_line
+        self.seq += 1
+        self.file_seq.pop(file, None)
+        self.file_seq[file] = self.seq
+        self.hash_refs[hash_line] = self.hash_refs.get(hash_line, 0) + 1
+        if old_hash is not None:
+            self.hash_refs[old_hash] -= 1
+            if self.hash_refs[old_hash] == 0:
+                del self.hash_refs[old_hash]
+                self.data["hashes"].pop(old_hash, None)
+
+    def _apply(self, record: dict):
+        op = record.get("op")
+        if op == "line":
+            if "line" in record:
+                # full line of older journal
+                table, delta, units = self._encode(record["line"])
+                if units is not None:
+                    self._set_table(table, units)
+                self.compaction_needed = True
+            else:
+                table, delta = record["table"], record["delta"]
+            self.data["hashes"][record["hash"]] = {
+                "table": table,
+                "delta": delta,
+                "st_ctime": record["st_ctime"],
+            }
+        elif op == "table":
+            self._set_table(record["id"], record["args"])
+        elif op == "file":
+            self._set_file(record["file"], record["hash"])
+        elif op == "parsed":
+            parsed = self.data.setdefault("parsed_xclog_files", {})
+            for f in record["files"]:
+                parsed[f] = True
+        elif op == "clean_parsed":
+            self.data["parsed_xclog_files"] = {}
+
+    def _record(self, record: dict):
+        self._apply(record)
+        self.pending.append(record)
+
+    def _replay_journal(self):
+        try:
+            with open(self.log_accumulator_path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != VERSION:
+                    self.compaction_needed = True
+                    return
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # the last line can be cut if the process was killed while appending
+                        self.compaction_needed = True
+                        continue
+                    self._apply(record)
+                    self.journal_records += 1
+        except (OSError, ValueError):
+            self.compaction_needed = True
+        # drop lines which are not used by any file anymore
+        self.data["hashes"] = {
+            k: v for k, v in self.data["hashes"].items() if k in self.hash_refs
+        }
+
+    def _migrate(self, legacy_json_path: pathlib.Path):
+        try:
+            with open(legacy_json_path, "r") as f:
+                data = json.load(f)
+            if data["version"] == VERSION:
+                hashes = data.get("hashes", {})
+                for file, hash_line in data.get("files", {}).items():
+                    if hash_line in hashes:
+                        self._apply(
+                            {
+                                "op": "line",
+                                "hash": hash_line,
+                                "line": hashes[hash_line]["line"],
+                                "st_ctime": hashes[hash_line]["st_ctime"],
+                            }
+                        )
+                        self._set_file(file, hash_line)
+                self.data["parsed_xclog_files"] = data.get("parsed_xclog_files", {})
+        except:
+            pass
+        self.compact()
+        try:
+            os.unlink(legacy_json_path)
+        except OSError:
+            pass
 
     def set_log(self, file, line: str, st_ctime):
+        # the full line is hashed, the same line can be encoded against different tables of its group
         hash_line = to_hash_line(line)
 
-        if "hashes" not in self.data:
-            self.data["hashes"] = {}
-            self.dirty = True
-
         log_line_data = self.data["hashes"].get(hash_line, None)
+        if log_line_data is None:
+            table, delta, units = self._encode(line)
+            if units is not None:
+                self._record({"op": "table", "id": table, "args": units})
+        else:
+            table, delta = log_line_data["table"], log_line_data["delta"]
         if log_line_data is None or log_line_data["st_ctime"] < st_ctime:
-            self.data["hashes"][hash_line] = {"line": line, "st_ctime": st_ctime}
-            self.dirty = True
+            self._record(
+                {
+                    "op": "line",
+                    "hash": hash_line,
+                    "table": table,
+                    "delta": delta,
+                    "st_ctime": st_ctime,
+                }
+            )
 
-        if "files" not in self.data:
-            self.data["files"] = {}
-            self.dirty = True
         if self.data["files"].get(file, None) != hash_line:
-            self.dirty = True
-            self.data["files"][file] = hash_line
+            self._record({"op": "file", "file": file, "hash": hash_line})
 
     def clean_xclog_files(self):
         if "parsed_xclog_files" not in self.data:
             return
-        self.data["parsed_xclog_files"] = {}
+        self._record({"op": "clean_parsed"})
 
     def set_parsed_xclog_files(self, parsed_xclog_files):
-        if "parsed_xclog_files" not in self.data:
-            self.data["parsed_xclog_files"] = {}
-            self.dirty = True
-        for f in parsed_xclog_files:
-            self.data["parsed_xclog_files"][str(f)] = True
-            self.dirty = True
-
-    def _read_log_accumulator(self, log_accumulator_path):
-        empty = {"version": VERSION}
-        if log_accumulator_path.exists():
-            try:
-                with open(log_accumulator_path, "r") as f:
-                    data = json.load(f)
-                    if data["version"] != VERSION:
-                        return empty
-                    return data
-            except:
-                pass
-        return empty
+        files = [str(f) for f in parsed_xclog_files]
+        if files:
+            self._record({"op": "parsed", "files": files})
+
+    def _drop_unused_tables(self):
+        used = set(value["table"] for value in self.data["hashes"].values())
+        self.data["tables"] = {
+            table: units
+            for table, units in self.data["tables"].items()
+            if table in used
+        }
+        self.groups = {
+            key: table for key, table in self.groups.items() if table in used
+        }
 
-    def _clean_not_used_hashes(self):
-        if not self.dirty:
-            return
-        valid_hashes = set(
-            hash_line for hash_line in self.data.get("files", {}).values()
+    def _live_records(self):
+        yield {"version": VERSION}
+        for table, units in self.data["tables"].items():
+            yield {"op": "table", "id": table, "args": units}
+        for hash_line, value in self.data["hashes"].items():
+            yield {
+                "op": "line",
+                "hash": hash_line,
+                "table": value["table"],
+                "delta": value["delta"],
+                "st_ctime": value["st_ctime"],
+            }
+        for file, hash_line in self.data["files"].items():
+            yield {"op": "file", "file": file, "hash": hash_line}
+        parsed = list(self.data.get("parsed_xclog_files", {}).keys())
+        if parsed:
+            yield {"op": "parsed", "files": parsed}
+
+    def compact(self):
+        """
+        Rewrites the journal with live records only.
+        """
+        self._drop_unused_tables()
+        tmp_path = self.log_accumulator_path.with_name(
+            f"{self.log_accumulator_path.name}.{os.getpid()}.tmp"
+        )
+        records = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self._live_records():
+                f.write(json.dumps(record))
+                f.write("\n")
+                records += 1
+        os.replace(tmp_path, self.log_accumulator_path)
+        self.journal_records = records - 1
+        self.pending = []
+        self.compaction_needed = False
+
+    def _should_compact(self) -> bool:
+        if self.compaction_needed or not self.log_accumulator_path.exists():
+            return True
+        live_records = (
+            len(self.data["tables"])
+            + len(self.data["hashes"])
+            + len(self.data["files"])
+            + 1
+        )
+        journal_records = self.journal_records + len(self.pending)
+        return journal_records > max(
+            self.COMPACT_RATIO * live_records, self.COMPACT_MIN_RECORDS
         )
-        self.data["hashes"] = {
-            k: v for k, v in self.data.get("hashes", {}).items() if k in valid_hashes
-        }
-        self.dirty = False
 
     def save_log_accumulator(self):
-        self._clean_not_used_hashes()
-        with open(self.log_accumulator_path, "w") as f:
-            json.dump(self.data, f)
+        if self._should_compact():
+            self.compact()
+            return
+        if not self.pending:
+            return
+        with open(self.log_accumulator_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in self.pending))
+        self.journal_records += len(self.pending)
+        self.pending = []
 
     def dump_xclog_file(self, xclog_file):
-        self._clean_not_used_hashes()
-        lines = list(self.data.get("hashes", {}).values())
+        """
+        Writes all lines (latest first) gzipped, lines are rebuilt and compressed one by one,
+        so memory doesn't depend on the total size. The file is replaced atomically and not rewritten
+        if lines didn't change since the last dump.
+        """
+        xclog_file = pathlib.Path(xclog_file)
         # sort by st_ctime desc
-        lines.sort(key=lambda x: -x["st_ctime"])
-        lines = "\n\n".join(x["line"] for x in lines)
+        hashes = sorted(self.data["hashes"].items(), key=lambda x: -x[1]["st_ctime"])
+        hashes = [hash_line for hash_line, _ in hashes]
+        # line hash depends on the whole line, so the list of hashes identifies the content
+        dump_hash = hashlib.sha256("\n".join(hashes).encode("utf-8")).hexdigest()
+        if dump_hash == self.dump_hash and xclog_file.exists():
+            return
 
+        tmp_path = xclog_file.with_name(f"{xclog_file.name}.{os.getpid()}.tmp")
         try:
-            os.unlink(xclog_file)
+            with gzip.open(tmp_path, "wb") as f:
+                chunk = []
+                chunk_size = 0
+                for i, hash_line in enumerate(hashes):
+                    data = self.line(hash_line).encode("utf-8")
+                    if i > 0:
+                        chunk.append(b"\n\n")
+                    chunk.append(data)
+                    chunk_size += len(data)
+                    if chunk_size >= self.DUMP_CHUNK_SIZE:
+                        f.write(b"".join(chunk))
+                        chunk = []
+                        chunk_size = 0
+                f.write(b"".join(chunk))
+            os.replace(tmp_path, xclog_file)
         except:
-            pass
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.dump_hash = dump_hash
 
-        # gunzip lines
-        with gzip.open(xclog_file, "wb") as f:
-            f.write(lines.encode("utf-8"))
+
+def get_all_xclog_files(xclog_path: pathlib.Path):
+    # find all xclog files in xclog_path and sort them by creation date
+    xclog_files = list(xclog_path.glob("*.xcactivitylog"))
+    xclog_files.sort(key=lambda x: x.stat().st_ctime)
+    return [x for x in xclog_files if HOT_RELOAD_LOG_XCLOG_KEY not in x.name]
 
 
-def cmd_split(s):
-    import shlex
+# sections without compiler invocations are skipped by the tokenizer without decoding
+COMPILE_LINE_FILTER = (b"swift-frontend", b"clang")
 
+
+def is_compile_line(line: str) -> bool:
+    return ("-primary-file" in line and "swift-frontend" in line) or (
+        "-c" in line and "clang" in line
+    )
+
+
+def parse_compile_lines(xclog_file: str):
     try:
-        return shlex.split(s)  # shlex is more right
+        for line in parse_xclogs(xclog_file, string_filter=COMPILE_LINE_FILTER):
+            if is_compile_line(line):
+                yield line
     except:
-        return []
+        pass
 
 
-def get_all_xclog_files(xclog_path: pathlib.Path):
-    # find all xclog files in xclog_path and sort them by creation date
-    xclog_files = list(xclog_path.glob("*.xcactivitylog"))
-    xclog_files.sort(key=lambda x: x.stat().st_ctime)
-    return [x for x in xclog_files if HOT_RELOAD_LOG_XCLOG_KEY not in x.name]
+def read_compile_lines(xclog_file: str) -> list[str]:
+    """
+    Worker of the process pool: returns only compile command lines of one xcactivitylog, so only a small
+    part of the log is sent back to the main process. Lines are cached on disk, so logs parsed before
+    (by the previous start or by another workspace) are not parsed again.
+
+    :param xclog_file: path of xcactivitylog file
+    """
+    return list(
+        XclogCache().lines(
+            xclog_file, "compile_lines", lambda: parse_compile_lines(xclog_file)
+        )
+    )
+
+
+def log_workers() -> int:
+    """
+    Number of processes parsing xcactivitylogs, HOT_RELOAD_LOG_WORKERS environment variable, cpu count by default.
+    """
+    try:
+        return max(1, int(os.environ["HOT_RELOAD_LOG_WORKERS"]))
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+
+def log_max_pending(workers: int) -> int:
+    """
+    Max number of parsed logs waiting to be merged, bounds memory of the main process.
+    HOT_RELOAD_LOG_MAX_PENDING environment variable, twice the number of workers by default.
+    """
+    try:
+        return max(workers, int(os.environ["HOT_RELOAD_LOG_MAX_PENDING"]))
+    except (KeyError, ValueError):
+        return 2 * workers
 
 
 def extract_all_logs(xclog_files):
+    """
+    Yields (line, st_ctime) of compile command lines. Logs are parsed in parallel, one log per worker,
+    but results are yielded in order of xclog_files (sorted by st_ctime), so the latest line wins.
+
+    :param xclog_files: list of xcactivitylog paths sorted by st_ctime
+    """
+    ctimes = {}
     for xclog_file in xclog_files:
         try:
-            raw_logs = parse_xclogs(str(xclog_file))
-            for line in raw_logs:
-                yield (line, xclog_file.stat().st_ctime)
-        except:
+            ctimes[xclog_file] = xclog_file.stat().st_ctime
+        except OSError:
             pass
+    xclog_files = [f for f in xclog_files if f in ctimes]
 
+    workers = min(log_workers(), len(xclog_files))
+    if workers <= 1:
+        for xclog_file in xclog_files:
+            for line in read_compile_lines(str(xclog_file)):
+                yield (line, ctimes[xclog_file])
+        return
 
-def get_files_from_args(args):
-    files = []
-    for i in range(len(args)):
-        if args[i] in ["-primary-file", "-c"]:
-            if i + 1 < len(args) and args[i + 1].startswith("/"):
-                files.append(args[i + 1])
-    return files
+    from concurrent.futures import ProcessPoolExecutor
+
+    def worker_result(xclog_file, future):
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                # worker died (killed for memory?), the pool is broken for all later logs
+                print(f"Log worker failed for {xclog_file}: {e}", file=sys.stderr)
+        try:
+            return read_compile_lines(str(xclog_file))
+        except Exception:
+            return []
+
+    max_pending = log_max_pending(workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for xclog_file in xclog_files:
+            try:
+                future = executor.submit(read_compile_lines, str(xclog_file))
+            except Exception:
+                future = None  # broken pool, parsed in this process
+            pending.append((xclog_file, future))
+            if len(pending) < max_pending:
+                continue
+            done_file, future = pending.popleft()
+            for line in worker_result(done_file, future):
+                yield (line, ctimes[done_file])
+        while pending:
+            done_file, future = pending.popleft()
+            for line in worker_result(done_file, future):
+                yield (line, ctimes[done_file])
 
 
 def run():
@@ -143,25 +580,31 @@ def run():
     build_path = sys.argv[1]
     workspace_path = sys.argv[2]
 
-    log_accumulator_path = (
-        pathlib.Path(workspace_path)
-        / ".vscode"
-        / "xcode"
-        / "hotreloading_flags_accumulator.json"
+    xcode_path = pathlib.Path(workspace_path) / ".vscode" / "xcode"
+    log_accumulator = LogAccumulator(
+        xcode_path / "hotreloading_flags_accumulator.journal",
+        legacy_json_path=xcode_path / "hotreloading_flags_accumulator.json",
     )
 
-    log_accumulator = LogAccumulator(log_accumulator_path)
-
     xclog_path = pathlib.Path(build_path) / "Logs" / "Build"
 
-    def parse_line(line, st_ctime):
-        if ("-primary-file" in line and "swift-frontend" in line) or (
-            "-c" in line and "clang" in line
-        ):
-            args = cmd_split(line)
+    # queries are answered from the server thread, the accumulator is changed only under its lock
+    command_server = hotreload_command_server.CompileCommandServer(
+        log_accumulator, hotreload_command_server.socket_path(workspace_path)
+    )
+    try:
+        command_server.start()
+    except OSError as e:
+        print(f"Compile command server is not started: {e}", file=sys.stderr)
 
-            files = get_files_from_args(args)
-            if len(files) > 0:
+    compile_commands_exporter = CompileCommandsExporter(
+        log_accumulator, xcode_path / "compile_commands.json", workspace_path
+    )
+
+    def parse_line(line, st_ctime):
+        if is_compile_line(line):
+            files = compile_files(line)
+            with command_server.lock:
                 for file in files:
                     log_accumulator.set_log(file, line, st_ctime)
 
@@ -178,25 +621,23 @@ def run():
         already_parsed_files |= set(str(f) for f in xclog_files)
         log_accumulator.set_parsed_xclog_files(xclog_files)
         if force_dump or len(xclog_files) > 0:
-            log_accumulator.save_log_accumulator()
+            with command_server.lock:
+                log_accumulator.save_log_accumulator()
             log_accumulator.dump_xclog_file(xclog_path / HOT_RELOAD_LOG_XCLOG_KEY)
+            compile_commands_exporter.update()
 
     log_accumulator.clean_xclog_files()
 
+    # xcodebuild updates the manifest once a build log is written, watcher is created before the first
+    # parsing, so a build which finishes meanwhile is not missed
     log_manifest_path = xclog_path / "LogStoreManifest.plist"
-    last_mtime = log_manifest_path.stat().st_mtime
-    parse_new_logs(True)
-
-    # watch for changes in xclog_path and parse new logs
-
-    while True:
-        mtime = log_manifest_path.stat().st_mtime
-        if mtime != last_mtime:
-            # add only new created files, because xcodebuild creates new xclog file for each build
-            parse_new_logs(False)
-            last_mtime = mtime
+    with helper.create_file_watcher(str(log_manifest_path)) as watcher:
+        parse_new_logs(True)
 
-        time.sleep(5)
+        while True:
+            if watcher.wait_settled(quiet=MANIFEST_QUIET_TIME):
+                # add only new created files, because xcodebuild creates new xclog file for each build
+                parse_new_logs(False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# Reads `log stream --style ndjson` output of runtime issues and matches every record to the backtrace
+# captured by the runtime issue breakpoint of the same process.
+import os
+import json
+import time
+import select
+import threading
+from datetime import datetime
+
+RUNTIME_ISSUES_SUBSYSTEM = "com.apple.runtime-issues"
+
+# max distance in seconds between a log record and a backtrace of the same warning
+MATCH_WINDOW = 5.0
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class RuntimeIssueRecord:
+    def __init__(self, pid: int, timestamp: float, message: str):
+        self.pid = pid
+        self.timestamp = timestamp
+        self.message = message
+        self.received = time.monotonic()
+
+
+class PendingBacktrace:
+    def __init__(self, pid: int, timestamp: float, frames):
+        self.pid = pid
+        self.timestamp = timestamp
+        self.frames = frames
+        self.received = time.monotonic()
+
+
+def parse_timestamp(value: str) -> float:
+    """
+    Parses timestamp of ndjson log record, like "2024-05-01 12:34:56.123456+0200".
+
+    :param value: timestamp string
+    """
+    for time_format in ("%Y-%m-%d %H:%M:%S.%f%z", "%Y-%m-%d %H:%M:%S%z"):
+        try:
+            return datetime.strptime(value, time_format).timestamp()
+        except ValueError:
+            continue
+    return time.time()
+
+
+def parse_record(line: bytes):
+    """
+    Decodes one ndjson line of `log stream`, returns None for lines which are not runtime issues
+    (like "Filtering the log data using ..." header).
+
+    :param line: line without trailing new line
+    """
+    line = line.strip()
+    if not line.startswith(b"{"):
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    subsystem = record.get("subsystem") or ""
+    if not subsystem.startswith(RUNTIME_ISSUES_SUBSYSTEM):
+        return None
+    pid = record.get("processID")
+    if pid is None:
+        return None
+    category = record.get("category") or ""
+    message = f"[{subsystem}:{category}] {record.get('eventMessage', '')}"
+    return RuntimeIssueRecord(
+        int(pid), parse_timestamp(record.get("timestamp", "")), message
+    )
+
+
+class RuntimeIssueStreamReader:
+    """
+    Consumes the log stream in one long-lived thread. Backtraces come from the breakpoint on other threads,
+    log records come from the stream, whichever comes first waits for the other one for MATCH_WINDOW seconds.
+    A record is matched to the pending backtrace of the same pid closest in time, so bursts of warnings
+    don't get their messages and backtraces swapped. Unmatched ones are still reported after the window.
+    """
+
+    def __init__(self, stream, on_warning, on_error=None):
+        """
+        :param stream: binary file object with ndjson output of `log stream`
+        :param on_warning: callback(message, frames) for every runtime warning
+        :param on_error: optional callback(message) for logging
+        """
+        self.stream = stream
+        self.on_warning = on_warning
+        self.on_error = on_error
+        self.condition = threading.Condition()
+        self.backtraces = []
+        self.records = []
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def join(self, timeout: float = None):
+        """
+        Waits for the reader thread, it exits once the stream is closed by the writer.
+        """
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def add_backtrace(self, pid: int, frames, timestamp: float = None):
+        """
+        Adds a backtrace captured by the runtime issue breakpoint.
+
+        :param pid: process identifier
+        :param frames: frames of backtrace
+        :param timestamp: time of the breakpoint hit, now by default
+        """
+        backtrace = PendingBacktrace(
+            int(pid), time.time() if timestamp is None else timestamp, frames
+        )
+        with self.condition:
+            record = self._take_closest(self.records, backtrace)
+            if record is None:
+                self.backtraces.append(backtrace)
+                return
+        self._report(record.message, backtrace.frames)
+
+    def _take_closest(self, candidates: list, item):
+        best_index = None
+        best_distance = MATCH_WINDOW
+        for index, candidate in enumerate(candidates):
+            if candidate.pid != item.pid:
+                continue
+            distance = abs(candidate.timestamp - item.timestamp)
+            if distance <= best_distance and (
+                best_index is None or distance < best_distance
+            ):
+                best_index = index
+                best_distance = distance
+        if best_index is None:
+            return None
+        return candidates.pop(best_index)
+
+    def _add_record(self, record: RuntimeIssueRecord):
+        with self.condition:
+            backtrace = self._take_closest(self.backtraces, record)
+            if backtrace is None:
+                self.records.append(record)
+                return
+        self._report(record.message, backtrace.frames)
+
+    def _expire(self, flush_all=False):
+        deadline = time.monotonic() - MATCH_WINDOW
+        with self.condition:
+            expired_records = [
+                r for r in self.records if flush_all or r.received < deadline
+            ]
+            expired_backtraces = [
+                b for b in self.backtraces if flush_all or b.received < deadline
+            ]
+            self.records = [r for r in self.records if r not in expired_records]
+            self.backtraces = [
+                b for b in self.backtraces if b not in expired_backtraces
+            ]
+        for record in expired_records:
+            self._report(record.message, ())
+        for backtrace in expired_backtraces:
+            self._report(
+                f"[{RUNTIME_ISSUES_SUBSYSTEM}] Runtime issue without log message",
+                backtrace.frames,
+            )
+
+    def _report(self, message: str, frames):
+        try:
+            self.on_warning(message, frames)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"Error reporting runtime warning: {str(e)}")
+
+    def run(self):
+        fd = self.stream.fileno()
+        buffer = b""
+        try:
+            while True:
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if ready:
+                    chunk = os.read(fd, READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    start = 0
+                    while True:
+                        end = buffer.find(b"\n", start)
+                        if end == -1:
+                            break
+                        record = parse_record(buffer[start:end])
+                        if record is not None:
+                            self._add_record(record)
+                        start = end + 1
+                    buffer = buffer[start:]
+                self._expire()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(f"Runtime issue stream stopped: {str(e)}")
+        finally:
+            if buffer:
+                record = parse_record(buffer)
+                if record is not None:
+                    self._add_record(record)
+            self._expire(flush_all=True)
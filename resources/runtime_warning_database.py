@@ -1,37 +1,243 @@
 #!/usr/bin/env python3
+import os
 import json
+import time
+import errno
+import select
+import hashlib
+import threading
+from collections import OrderedDict, deque
 
-DATA_BASE = dict()
+# element id -> {"message", "count", "data"}, ordered from least to most recently reported
+DATA_BASE = OrderedDict()
+# content hash of normalized message and backtrace -> element id
+DATA_BASE_INDEX = dict()
 ITEM_ID = 0
+# guards DATA_BASE as snapshots are taken on the writer thread
+DATA_BASE_LOCK = threading.Lock()
 
-STORAGE_FILE = None
+# max number of distinct warnings, least recently reported ones are evicted
+# can be changed by RUNTIME_WARNINGS_MAX_COUNT environment variable of the debugger process
+MAX_WARNINGS_COUNT = 500
 
+STORAGE_FIFO = ".vscode/xcode/fifo/.app_runtime_warnings.fifo"
+STORAGE_WRITER = None
 
-class SetEncoder(json.JSONEncoder):
+# compact representation of a frame, a tuple of values in this order
+FRAME_KEYS = ("index", "function", "file", "line", "column")
+
+RUNTIME_ISSUES_TAG = "[com.apple.runtime-issues"
+
+
+def max_warnings_count() -> int:
+    """
+    Returns the max number of distinct warnings to keep.
+    """
+    try:
+        return int(os.environ.get("RUNTIME_WARNINGS_MAX_COUNT", MAX_WARNINGS_COUNT))
+    except ValueError:
+        return MAX_WARNINGS_COUNT
+
+
+def normalize_frame(frame) -> tuple:
+    """
+    Converts a frame (dict or frozenset of items) to a compact tuple.
+
+    :param frame: frame of backtrace
+    """
+    values = dict(frame)
+    return tuple(values.get(key) for key in FRAME_KEYS)
+
+
+def normalize_message(error_message: str) -> str:
+    """
+    Strips syslog prefix (time, process, pid) of the message, so the same warning has the same text.
+
+    :param error_message: The error message.
+    """
+    index = error_message.find(RUNTIME_ISSUES_TAG)
+    if index != -1:
+        end = error_message.find("]", index)
+        if end != -1:
+            return error_message[end + 1 :].strip()
+    return error_message.strip()
+
+
+def warning_hash(message: str, frames: tuple) -> str:
+    """
+    Content hash of normalized message and backtrace.
+
+    :param message: normalized message
+    :param frames: normalized frames
+    """
+    content = json.dumps([message, frames], separators=(",", ":"))
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def database_to_json() -> dict:
+    """
+    Converts the database to the format of the runtime warnings panel.
+    """
+    return {
+        element_id: warning_to_json(value) for element_id, value in DATA_BASE.items()
+    }
+
+
+def database_snapshot() -> dict:
     """
-    JSON encoder for set and frozenset types.
+    Thread safe copy of the database in the format of the runtime warnings panel.
+    """
+    with DATA_BASE_LOCK:
+        return database_to_json()
+
+
+class RuntimeWarningsWriter:
+    """
+    Streams changes of the database to the runtime warnings panel as json lines:
+        {"type": "snapshot", "seq": n, "warnings": {id: warning}}
+        {"type": "new", "seq": n, "id": id, "warning": warning}
+        {"type": "count", "seq": n, "counts": {id: count}}
+        {"type": "remove", "seq": n, "id": id}
+    Every event is idempotent, so a delta which is already included in a snapshot can be applied again.
+    The reader drops deltas after a gap in seq numbers till the next snapshot.
+
+    Callers never block: events are queued and written by a background thread to a FIFO opened in non-blocking
+    mode. Count bumps of the same warning are coalesced, on queue overflow queued events are dropped and
+    a snapshot is sent instead. A snapshot is also sent on every (re)connection of the reader and after
+    SNAPSHOT_EVERY events.
     """
 
-    def default(self, o):
-        if isinstance(o, set) or isinstance(o, frozenset):
-            data = dict()
-            for key, value in o:
-                data[key] = value
-            return data
-        return json.JSONEncoder.default(self, o)
+    MAX_QUEUE_SIZE = 256
+    SNAPSHOT_EVERY = 200
+    RECONNECT_INTERVAL = 0.5
+
+    def __init__(self, path: str, snapshot):
+        self.path = path
+        self.snapshot = snapshot
+        self.condition = threading.Condition()
+        self.events = deque()
+        self.counts = dict()
+        self.needs_snapshot = True
+        self.events_since_snapshot = 0
+        self.seq = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _push(self, event: dict):
+        if len(self.events) >= self.MAX_QUEUE_SIZE:
+            self._request_snapshot()
+        else:
+            self.events.append(event)
+        self.condition.notify()
+
+    def _request_snapshot(self):
+        self.events.clear()
+        self.counts.clear()
+        self.needs_snapshot = True
+
+    def new_warning(self, element_id: str, warning: dict):
+        with self.condition:
+            self.counts.pop(element_id, None)
+            self._push({"type": "new", "id": element_id, "warning": warning})
+
+    def count_changed(self, element_id: str, count: int):
+        with self.condition:
+            self.counts[element_id] = count
+            self.condition.notify()
+
+    def removed(self, element_id: str):
+        with self.condition:
+            self.counts.pop(element_id, None)
+            self._push({"type": "remove", "id": element_id})
 
+    def _next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
 
-def dump_database():
+    def _take_events(self) -> bytes:
+        with self.condition:
+            while not (self.needs_snapshot or self.events or self.counts):
+                self.condition.wait()
+            if self.events_since_snapshot >= self.SNAPSHOT_EVERY:
+                self._request_snapshot()
+            take_snapshot = self.needs_snapshot
+            self.needs_snapshot = False
+            events = list(self.events)
+            self.events.clear()
+            if self.counts:
+                events.append({"type": "count", "counts": self.counts})
+                self.counts = dict()
+
+        lines = []
+        if take_snapshot:
+            # taken outside of the condition lock, as producers hold DATA_BASE_LOCK while queueing events
+            # events queued in between are applied on top of the snapshot, which is fine as they are idempotent
+            warnings = self.snapshot()
+            lines.append(
+                json.dumps(
+                    {"type": "snapshot", "seq": self._next_seq(), "warnings": warnings}
+                )
+            )
+            self.events_since_snapshot = 0
+        for event in events:
+            event["seq"] = self._next_seq()
+            lines.append(json.dumps(event))
+            self.events_since_snapshot += 1
+        return "".join(f"{line}\n" for line in lines).encode("utf-8")
+
+    def _open(self):
+        try:
+            # fails with ENXIO till the panel opens the FIFO for reading
+            return os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            return None
+
+    def _run(self):
+        fd = None
+        pending = b""
+        while True:
+            if fd is None:
+                fd = self._open()
+                if fd is None:
+                    time.sleep(self.RECONNECT_INTERVAL)
+                    continue
+                # new reader, start it from a snapshot and never from the middle of a line
+                with self.condition:
+                    self._request_snapshot()
+                pending = b""
+
+            if not pending:
+                pending = self._take_events()
+
+            try:
+                select.select([], [fd], [], 1.0)
+                written = os.write(fd, pending)
+                pending = pending[written:]
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                if e.errno not in (errno.EPIPE, errno.EBADF):
+                    raise
+                os.close(fd)
+                fd = None
+
+
+def storage_writer() -> RuntimeWarningsWriter:
     """
-    Dumps the runtime warning database to a FIFO file.
+    Lazily starts the writer of the runtime warning panel FIFO.
     """
-    global STORAGE_FILE
-    if STORAGE_FILE is None:
-        STORAGE_FILE = open(
-            ".vscode/xcode/fifo/.app_runtime_warnings.fifo", "w", 1, encoding="utf-8"
-        )
-    json_str = json.dumps(DATA_BASE, cls=SetEncoder)
-    STORAGE_FILE.write(f"{json_str}\n")
+    global STORAGE_WRITER
+    if STORAGE_WRITER is None:
+        STORAGE_WRITER = RuntimeWarningsWriter(STORAGE_FIFO, database_snapshot)
+    return STORAGE_WRITER
+
+
+def warning_to_json(value) -> dict:
+    return {
+        "message": value["message"],
+        "count": value["count"],
+        "data": [dict(zip(FRAME_KEYS, frame)) for frame in value["data"]],
+    }
 
 
 class MessageInDatabaseError(Exception):
@@ -49,18 +255,33 @@ def store_runtime_warning(error_message: str, data: tuple):
     """
     global ITEM_ID
 
-    for _, value in DATA_BASE.items():
-        if value["data"] == data:
+    frames = tuple(normalize_frame(frame) for frame in data)
+    content_hash = warning_hash(normalize_message(error_message), frames)
+    writer = storage_writer()
+
+    with DATA_BASE_LOCK:
+        element_id = DATA_BASE_INDEX.get(content_hash, None)
+        if element_id is not None:
+            value = DATA_BASE[element_id]
             value["count"] += 1
-            dump_database()
+            DATA_BASE.move_to_end(element_id)
+            writer.count_changed(element_id, value["count"])
             raise MessageInDatabaseError("Message is already in database")
 
-    DATA_BASE[f"element_{str(ITEM_ID)}"] = {
-        "message": error_message,
-        "count": 1,
-        "data": data,
-    }
+        while len(DATA_BASE) >= max(max_warnings_count(), 1):
+            evicted_id, evicted = DATA_BASE.popitem(last=False)
+            del DATA_BASE_INDEX[evicted["hash"]]
+            writer.removed(evicted_id)
+
+        element_id = f"element_{str(ITEM_ID)}"
+        DATA_BASE[element_id] = {
+            "message": error_message,
+            "count": 1,
+            "data": frames,
+            "hash": content_hash,
+        }
+        DATA_BASE_INDEX[content_hash] = element_id
 
-    ITEM_ID += 1
+        ITEM_ID += 1
 
-    dump_database()
+        writer.new_warning(element_id, warning_to_json(DATA_BASE[element_id]))
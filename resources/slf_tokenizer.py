@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Streaming tokenizer of SLF (xcactivitylog) files: gzip is decompressed chunk by chunk and token headers
+# are matched in place, so memory is bounded by the biggest token instead of the whole log.
+#
+# SLF is "SLF0" followed by tokens, every token is an optional value and a type char:
+#   <int>#  integer          <hex>^  double (little endian hex)    -  null
+#   <len>"<bytes>  string    <len>%<bytes>  class name             <index>@  class name reference
+#   <count>(  list of count objects                                <len>*<bytes>  json
+import re
+import gzip
+import struct
+from enum import Enum
+
+
+class TokenType(Enum):
+    String = '"'
+    Int = "#"
+    Double = "^"
+    Null = "-"
+    ClassName = "%"
+    ClassNameRef = "@"
+    List = "("
+    Json = "*"
+
+
+HEADER_REGEX = re.compile(rb'([0-9a-f]*)([-#%@"^(*])')
+# tokens followed by a payload of the given length
+PAYLOAD_TYPES = frozenset(b'"%*')
+TOKEN_TYPES = {ord(t.value): t for t in TokenType}
+STRING_CHAR = ord(TokenType.String.value)
+DOUBLE_CHAR = ord(TokenType.Double.value)
+NULL_CHAR = ord(TokenType.Null.value)
+GZIP_MAGIC = b"\x1f\x8b"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _read_chunks(f, chunk_size: int):
+    if f.read(2) == GZIP_MAGIC:
+        # GzipFile decompresses only as much as is read, concatenated gzip members are supported
+        f.seek(0)
+        f = gzip.GzipFile(fileobj=f)
+    else:
+        # not compressed log
+        f.seek(0)
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            return
+        yield data
+
+
+def _value(type_char: int, value: bytes, view, start: int, end: int):
+    # type chars are compared instead of enum members, it's called for every token
+    if type_char in PAYLOAD_TYPES:
+        return str(view[start:end], "utf-8", "replace")
+    if type_char == DOUBLE_CHAR:
+        return struct.unpack("<d", bytes.fromhex(value.decode("ascii")))[0]
+    if type_char == NULL_CHAR:
+        return None
+    return int(value)
+
+
+def tokenize(
+    path,
+    token_types=None,
+    string_filter=None,
+    chunk_size: int = CHUNK_SIZE,
+    max_string_size: int = None,
+):
+    """
+    Yields (TokenType, value) of the log.
+
+    :param path: gzipped or plain SLF file
+    :param token_types: types to yield, other tokens are skipped without decoding, None for all types
+    :param string_filter: byte strings, strings which don't contain any of them are skipped without decoding
+    :param chunk_size: size of decompressed chunks
+    :param max_string_size: longer strings are yielded as None without decoding, the structure of the log
+        can be walked without decoding big section texts
+    """
+    if token_types is not None:
+        token_types = frozenset(ord(t.value) for t in token_types)
+    with open(path, "rb") as f:
+        chunks = _read_chunks(f, chunk_size)
+        buf = b""
+        pos = 0
+        # "SLF0" header
+        need = 4
+        header_checked = False
+        eof = False
+        while True:
+            if need > len(buf) - pos:
+                # join chunks once the whole token is read, big strings are not copied per chunk
+                parts = [buf[pos:]]
+                available = len(parts[0])
+                while available < need:
+                    data = next(chunks, None)
+                    if data is None:
+                        eof = True
+                        break
+                    parts.append(data)
+                    available += len(data)
+                buf = b"".join(parts)
+                view = memoryview(buf)
+                pos = 0
+                if not header_checked:
+                    if not buf.startswith(b"SLF"):
+                        raise ValueError(f"Not a SLF file: {path}")
+                    header_checked = True
+                    pos = 4
+                need = 1
+            if pos == len(buf) and eof:
+                return
+
+            match = HEADER_REGEX.match(buf, pos)
+            if match is None:
+                if eof or len(buf) - pos > 64:
+                    raise ValueError(f"Invalid SLF token at {pos}: {buf[pos:pos + 16]}")
+                need = len(buf) - pos + 1
+                continue
+            type_char = buf[match.end() - 1]
+            value = match.group(1)
+            start = end = match.end()
+            if type_char in PAYLOAD_TYPES:
+                end = start + int(value)
+                if end > len(buf):
+                    if eof:
+                        raise ValueError(f"Unexpected end of SLF file: {path}")
+                    need = end - pos
+                    continue
+            pos = end
+
+            if token_types is not None and type_char not in token_types:
+                continue
+            if type_char == STRING_CHAR:
+                if string_filter is not None and not any(
+                    buf.find(s, start, end) != -1 for s in string_filter
+                ):
+                    continue
+                if max_string_size is not None and end - start > max_string_size:
+                    yield TokenType.String, None
+                    continue
+            yield TOKEN_TYPES[type_char], _value(type_char, value, view, start, end)
+
+
+def tokenizer(path):
+    """
+    All tokens of the log, same as xcactivitylog.tokenizer of xcode-build-server.
+    """
+    return tokenize(path)
@@ -22,27 +22,29 @@ def wait_for_process(
     """
 
     check_debug_session_last_time = time.time()
-    while True:
+
+    def is_session_stopped() -> bool:
+        nonlocal check_debug_session_last_time
         if check_debug_session_last_time + 1.5 < time.time():
             if not helper.is_debug_session_valid(session_id):
-                raise SessionNotValidError("Debug session is no longer valid.")
+                return True
             check_debug_session_last_time = time.time()
+        return False
 
-        new_pids = [
-            x for x in helper.get_list_of_pids(process_name) if x not in existing_pids
-        ]
-
-        if len(new_pids) > 0:
-            pid = new_pids.pop()
-            process = helper.get_process_by_pid(pid)
+    # only processes started after the previous check are examined
+    pid = helper.wait_for_new_process(
+        process_name, existing_pids, should_stop=is_session_stopped
+    )
+    if pid is None:
+        raise SessionNotValidError("Debug session is no longer valid.")
 
-            # process attach command sometimes fails to stop the process, so we try to do it manually before attaching
-            # if we can not do it either way, process would be detached from debugger silently and all status of tests would be lost
-            process.suspend()
+    process = helper.get_process_by_pid(pid)
 
-            return pid
+    # process attach command sometimes fails to stop the process, so we try to do it manually before attaching
+    # if we can not do it either way, process would be detached from debugger silently and all status of tests would be lost
+    process.suspend()
 
-        time.sleep(0.001)
+    return pid
 
 
 if __name__ == "__main__":
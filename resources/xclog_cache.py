@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# On-disk cache of lines extracted from xcactivitylogs, shared by all tools which parse build logs.
+#
+# An entry is addressed by the hash of (kind of lines, path, size, mtime_ns) of the log, so a changed log
+# never hits a stale entry. Entry file: b"XCLC1 <lines count>\n" followed by lines joined by "\n",
+# lines are read from a memory map. Least recently used entries are evicted once the cache is bigger
+# than the budget (XCLOG_CACHE_MAX_SIZE environment variable in MB).
+import os
+import sys
+import mmap
+import hashlib
+import helper
+
+MAGIC = b"XCLC1"
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+
+def default_cache_folder() -> str:
+    if sys.platform == "darwin":
+        root = os.path.expanduser("~/Library/Caches")
+    else:
+        root = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(root, "vscode-ios", "xclog")
+
+
+def default_max_size() -> int:
+    try:
+        return int(float(os.environ["XCLOG_CACHE_MAX_SIZE"]) * 1024 * 1024)
+    except (KeyError, ValueError):
+        return DEFAULT_MAX_SIZE
+
+
+class XclogCache:
+    def __init__(self, folder: str = None, max_size: int = None):
+        self.folder = folder or default_cache_folder()
+        self.max_size = default_max_size() if max_size is None else max_size
+
+    def entry_path(self, xclog_file, kind: str):
+        """
+        Entry path of the current state of the log or None if the log doesn't exist.
+        """
+        try:
+            stat = os.stat(xclog_file)
+        except OSError:
+            return None
+        key = f"{kind}\0{os.path.realpath(xclog_file)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.folder, f"{name}.lines")
+
+    def lines(self, xclog_file, kind: str, parse):
+        """
+        Yields cached lines of the log, the log is parsed only once by one of processes sharing the cache,
+        others wait for the entry to be written.
+
+        :param xclog_file: xcactivitylog path
+        :param kind: kind of extracted lines, entries of different kinds are independent
+        :param parse: function returning iterable of lines (without newlines) of the log
+        """
+        path = self.entry_path(xclog_file, kind)
+        if path is None:
+            yield from parse()
+            return
+        entry = self._open(path)
+        if entry is None:
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                lock = helper.fileLock.FileLock(f"{path}.lock")
+                lock.acquire()
+            except OSError:
+                # cache folder is not writable
+                yield from parse()
+                return
+            try:
+                entry = self._open(path)
+                if entry is None:
+                    yield from self._write(path, parse())
+                    return
+            finally:
+                lock.release()
+                self.evict()
+        with entry:
+            yield from self._read(entry)
+
+    def _open(self, path: str):
+        try:
+            with open(path, "rb") as f:
+                entry = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if entry[: len(MAGIC) + 1] != MAGIC + b" ":
+            entry.close()
+            return None
+        try:
+            # used time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _read(self, entry):
+        end = entry.find(b"\n")
+        count = int(entry[len(MAGIC) + 1 : end])
+        for _ in range(count):
+            start = end + 1
+            end = entry.find(b"\n", start)
+            if end == -1:
+                end = len(entry)
+            yield entry[start:end].decode("utf-8", "replace")
+
+    def _write(self, path: str, lines):
+        """
+        Yields lines while they are written, so the first parse is streamed too. The entry is created
+        only if all lines are read, errors of writing only disable the cache.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        # count is patched once all lines are written
+        header = MAGIC + b" %020d\n"
+        try:
+            f = open(tmp_path, "wb")
+            f.write(header % 0)
+        except OSError:
+            yield from lines
+            return
+        writable = True
+        count = 0
+        batch = []
+        try:
+            for line in lines:
+                yield line
+                batch.append(line.encode("utf-8"))
+                count += 1
+                if len(batch) == 1024 and writable:
+                    try:
+                        f.write(b"\n".join(batch) + b"\n")
+                    except OSError:
+                        writable = False
+                    batch = []
+            if writable:
+                f.write(b"\n".join(batch))
+                f.seek(0)
+                f.write(header % count)
+                f.close()
+                os.replace(tmp_path, path)
+        except OSError:
+            pass
+        finally:
+            f.close()
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """
+        Removes least recently used entries till the cache fits the budget.
+        """
+        entries = []
+        total = 0
+        try:
+            names = set(os.listdir(self.folder))
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.folder, name)
+            if name.endswith(".lines.lock"):
+                # processes waiting for the entry find it written once they get the lock
+                if name[: -len(".lock")] in names:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                continue
+            if not name.endswith(".lines"):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                # mapped entries stay readable till they are closed
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# Extracts build diagnostics (errors, warnings, notes) from the structure of an xcactivitylog and prints
+# them as NDJSON records as soon as they are found:
+#   {"severity": "error", "file": "/path/File.swift", "line": 10, "column": 5, "message": "...", "target": "App"}
+# Xcode stores the same diagnostic in the step section and in its parent sections, duplicates are dropped.
+#
+# Messages are IDEActivityLogMessage/IDEDiagnosticActivityLogMessage objects:
+#   title, shortTitle, timeEmitted, rangeEndInSectionText, rangeStartInSectionText, subMessages (list),
+#   severity, type, location, categoryIdent, secondaryLocations (list), additionalDescription
+# Locations are DVTTextDocumentLocation (documentURLString, timestamp, startingLineNumber,
+# startingColumnNumber, endingLineNumber, endingColumnNumber, characterRangeEnd, characterRangeStart,
+# locationEncoding, numbers are 0 based) or DVTDocumentLocation (documentURLString, timestamp).
+# Other objects are not parsed, tokens are scanned till the next message, so unknown classes of newer
+# Xcode versions only hide their own messages.
+# Records are cached by XclogCache, so the same log is parsed once.
+# usage: python3 resources/xclog_diagnostics.py <log.xcactivitylog>
+import re
+import sys
+import json
+import urllib.parse
+from slf_tokenizer import tokenize, TokenType
+
+MESSAGE_CLASSES = frozenset(
+    ["IDEActivityLogMessage", "IDEDiagnosticActivityLogMessage"]
+)
+TEXT_LOCATION_CLASS = "DVTTextDocumentLocation"
+DOCUMENT_LOCATION_CLASS = "DVTDocumentLocation"
+SEVERITIES = {0: "note", 1: "warning", 2: "error"}
+# not set line/column numbers are UInt64.max
+MAX_NUMBER = 2**63
+# strings of messages are short, section texts (the whole output of build steps) are not decoded
+MAX_STRING_SIZE = 64 * 1024
+TARGET_REGEXES = [
+    re.compile(r"\(in target '([^']+)'"),
+    re.compile(r"^Build target (.+?)(?: of project .*)?$"),
+]
+
+
+class _Desync(Exception):
+    pass
+
+
+class _EndOfLog(Exception):
+    pass
+
+
+def target_of_section(title: str):
+    for regex in TARGET_REGEXES:
+        match = regex.search(title)
+        if match is not None:
+            return match.group(1)
+    return None
+
+
+def file_path(url: str) -> str:
+    if url.startswith("file://"):
+        return urllib.parse.unquote(url[len("file://") :])
+    return url
+
+
+class DiagnosticsExtractor:
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.pushed_back = None
+        self.class_names = []
+        self.target = None
+        self.seen = set()
+
+    def _next(self):
+        if self.pushed_back is not None:
+            token, self.pushed_back = self.pushed_back, None
+            return token
+        # StopIteration can't be raised through generators
+        token = next(self.tokens, None)
+        if token is None:
+            raise _EndOfLog()
+        return token
+
+    def _expect(self, token_type: TokenType):
+        token = self._next()
+        if token[0] == token_type:
+            return token[1]
+        if token[0] == TokenType.Null:
+            # empty strings and lists can be written as null
+            if token_type == TokenType.String:
+                return ""
+            if token_type == TokenType.List:
+                return 0
+        # the token can start the next object
+        self.pushed_back = token
+        raise _Desync()
+
+    def _class_name(self, token):
+        if token[0] == TokenType.ClassName:
+            self.class_names.append(token[1])
+            return token[1]
+        if token[0] == TokenType.ClassNameRef:
+            # references are 1 based
+            if 0 < token[1] <= len(self.class_names):
+                return self.class_names[token[1] - 1]
+        return None
+
+    def _read_location(self):
+        token = self._next()
+        if token[0] == TokenType.Null:
+            return None
+        class_name = self._class_name(token)
+        if class_name == TEXT_LOCATION_CLASS:
+            url = self._expect(TokenType.String)
+            self._expect(TokenType.Double)
+            line = self._expect(TokenType.Int)
+            column = self._expect(TokenType.Int)
+            for _ in range(5):
+                self._expect(TokenType.Int)
+            return (
+                file_path(url),
+                line + 1 if line < MAX_NUMBER else None,
+                column + 1 if column < MAX_NUMBER else None,
+            )
+        if class_name == DOCUMENT_LOCATION_CLASS:
+            url = self._expect(TokenType.String)
+            self._expect(TokenType.Double)
+            return file_path(url), None, None
+        self.pushed_back = token
+        raise _Desync()
+
+    def _read_message(self):
+        title = self._expect(TokenType.String)
+        self._expect(TokenType.String)
+        self._expect(TokenType.Double)
+        self._expect(TokenType.Int)
+        self._expect(TokenType.Int)
+        for _ in range(self._expect(TokenType.List)):
+            token = self._next()
+            if token[0] == TokenType.Null:
+                continue
+            if self._class_name(token) not in MESSAGE_CLASSES:
+                self.pushed_back = token
+                raise _Desync()
+            yield from self._read_message()
+        severity = self._expect(TokenType.Int)
+        self._expect(TokenType.String)
+        location = self._read_location()
+        self._expect(TokenType.String)
+        for _ in range(self._expect(TokenType.List)):
+            self._read_location()
+        self._expect(TokenType.String)
+
+        if title is None or severity not in SEVERITIES:
+            return
+        file, line, column = location or (None, None, None)
+        key = (severity, file, line, column, title)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        yield {
+            "severity": SEVERITIES[severity],
+            "file": file,
+            "line": line,
+            "column": column,
+            "message": title,
+            "target": self.target,
+        }
+
+    def _read_section_title(self):
+        self._expect(TokenType.Int)
+        self._expect(TokenType.String)
+        title = self._expect(TokenType.String)
+        target = target_of_section(title or "")
+        if target is not None:
+            self.target = target
+
+    def diagnostics(self):
+        """
+        Yields diagnostic records in order of the log.
+        """
+        while True:
+            try:
+                token = self._next()
+            except _EndOfLog:
+                return
+            class_name = self._class_name(token)
+            if class_name is None:
+                continue
+            try:
+                if class_name in MESSAGE_CLASSES:
+                    yield from self._read_message()
+                elif class_name.startswith("IDE") and class_name.endswith("Section"):
+                    self._read_section_title()
+            except _Desync:
+                pass
+            except _EndOfLog:
+                return
+
+
+def extract_diagnostics(xclog_file):
+    return DiagnosticsExtractor(
+        tokenize(xclog_file, max_string_size=MAX_STRING_SIZE)
+    ).diagnostics()
+
+
+if __name__ == "__main__":
+    from xclog_cache import XclogCache
+
+    path = sys.argv[1]
+    # records of the same log are read from the cache without parsing
+    for record in XclogCache().lines(
+        path,
+        "diagnostics",
+        lambda: (json.dumps(d) for d in extract_diagnostics(path)),
+    ):
+        print(record, flush=True)
@@ -1,21 +1,16 @@
-import sys
-import pathlib
+from slf_tokenizer import tokenize, TokenType
 
-# import sibling folder from xcode-build-server
-path_root = pathlib.Path(__file__).resolve().parent.parent
-path_root = path_root / "xcode-build-server"
-sys.path.append(str(path_root))
 
-# import from xcode-build-server activitylog parser
-from xcactivitylog import tokenizer, TokenType
+def parse_xclogs(build_path, string_filter=None):
+    """
+    Yields lines of all log sections of the xcactivitylog, an empty line ends a section.
 
-
-def parse_xclogs(build_path):
-    for type, value in tokenizer(build_path):
-        # print(type, value)
-        if type != TokenType.String:
-            continue
-        assert isinstance(value, str)
+    :param build_path: xcactivitylog path
+    :param string_filter: byte strings, sections which don't contain any of them are skipped
+    """
+    for type, value in tokenize(
+        build_path, token_types={TokenType.String}, string_filter=string_filter
+    ):
         lines = value.splitlines()
         if len(lines) >= 1:
             yield from iter(lines)
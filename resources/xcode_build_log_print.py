@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 import sys
 from xcode_build_helper import parse_xclogs
+from xclog_cache import XclogCache
 
 # print xcode build logs to console
 
 build_path = sys.argv[1]
-for l in parse_xclogs(build_path):
+for l in XclogCache().lines(build_path, "lines", lambda: parse_xclogs(build_path)):
     print(l)
@@ -54,13 +54,17 @@ export class DebugAdapterTracker implements vscode.DebugAdapterTracker {
             : (this.debugSession.configuration.isDebuggable as boolean);
     }
     private _stream: fs.WriteStream;
+    // app log is rotated to "<logPath>.1" by size, attach_lldb.py app logger follows the rotation
+    private static AppLogMaxSize = 32 * 1024 * 1024;
+    private appLogSize = 0;
+    private appLogPending?: string[];
 
     private unverifiedBreakpointDisposables?: vscode.Disposable;
 
     constructor(debugSession: vscode.DebugSession, problemResolver: ProblemDiagnosticResolver) {
         this.debugSession = debugSession;
         this.problemResolver = problemResolver;
-        this._stream = fs.createWriteStream(getFilePathInWorkspace(this.logPath), { flags: "a+" });
+        this._stream = this.openAppLog();
         this.log = this.context?.commandContext.log;
         this.simulatorInteractor = new SimulatorFocus(this.log);
         this.unverifiedBreakpointDisposables = vscode.debug.onDidReceiveDebugSessionCustomEvent(
@@ -82,6 +86,50 @@ export class DebugAdapterTracker implements vscode.DebugAdapterTracker {
         return this.debugSession.configuration.logPath;
     }
 
+    private openAppLog() {
+        const filePath = getFilePathInWorkspace(this.logPath);
+        try {
+            this.appLogSize = fs.statSync(filePath).size;
+        } catch {
+            this.appLogSize = 0;
+        }
+        return fs.createWriteStream(filePath, { flags: "a+" });
+    }
+
+    private writeAppLog(std: string) {
+        if (this.appLogPending) {
+            this.appLogPending.push(std);
+            return;
+        }
+        this._stream.write(std);
+        this.appLogSize += Buffer.byteLength(std);
+        if (this.appLogSize >= DebugAdapterTracker.AppLogMaxSize) {
+            this.rotateAppLog();
+        }
+    }
+
+    private rotateAppLog() {
+        // rename only after all writes are flushed, so the reader gets the rotated file complete
+        this.appLogPending = [];
+        this._stream.end(() => {
+            const filePath = getFilePathInWorkspace(this.logPath);
+            try {
+                fs.renameSync(filePath, `${filePath}.1`);
+            } catch (error) {
+                this.log?.error(`Error rotating app log: ${error}`);
+            }
+            const pending = this.appLogPending || [];
+            this.appLogPending = undefined;
+            if (this.isTerminated) {
+                return;
+            }
+            this._stream = this.openAppLog();
+            for (const std of pending) {
+                this.writeAppLog(std);
+            }
+        });
+    }
+
     onWillStartSession() {
         this.breakpoints = [...vscode.debug.breakpoints];
         this.simulatorInteractor.init(this.context!.commandContext.projectEnv, this.processExe);
@@ -89,7 +137,7 @@ export class DebugAdapterTracker implements vscode.DebugAdapterTracker {
         vscode.debug.activeDebugSession;
         this.disList.push(
             this.context!.commandContext.debugConsoleEvent(std => {
-                this._stream.write(std);
+                this.writeAppLog(std);
             })
         );
         this.disList.push(
@@ -29,6 +29,12 @@ function runtimeWarningsConfigStatus() {
         .get<string>("swiftui.runtimeWarnings");
 }
 
+function appLogStartConfig() {
+    return vscode.workspace
+        .getConfiguration("vscode-ios", getWorkspaceFolder())
+        .get<string>("debug.appLogStart", "resume");
+}
+
 function runtimeWarningBreakPointCommand() {
     switch (runtimeWarningsConfigStatus()) {
         case "report":
@@ -465,6 +471,7 @@ export class DebugConfigurationProvider implements vscode.DebugConfigurationProv
             `set_environmental_var PROCESS_EXE=!!=${processExe}`,
             `set_environmental_var SCRIPT_PATH=!!=${getScriptPath()}`,
             `set_environmental_var APP_EXE=!!=${exe}`,
+            `set_environmental_var APP_LOG_START=!!=${appLogStartConfig()}`,
 
             // log level
             `set_debug_level ${context.log.logLevel}`,
@@ -3,8 +3,6 @@
 import sys
 import os
 import asyncio
-import subprocess
-import lib.filelock as filelock
 from MessageReader import MessageReader, MsgStatus
 from BuildServiceUtils import (
     get_session_id,
@@ -18,8 +16,20 @@ from BuildServiceUtils import (
     config_file,
     update_build_status,
     get_build_id,
+    cacheable_service_requests,
+    origin_service_path,
+    xcode_developer_dir,
+    register_server,
+    unregister_server,
 )
 from MessageModifiers import MessageModifierBase, ClientMessageModifier
+from MessageResponders import (
+    MessageResponderBase,
+    MessageResponderChain,
+    SessionReuseResponder,
+    ResponseCacheResponder,
+    DEFAULT_CACHEABLE_REQUESTS,
+)
 from MessageSpy import MessageSpyBase, MessageType
 from TargetBuildingMessageSpy import TargetBuildingMessageSpy
 from ServerBuildOperationMessageSpy import ServerBuildOperationMessageSpy
@@ -39,23 +49,23 @@ class Context:
         self.should_exit = False
 
         # log file for debug info
+        self.cache_path = os.path.expanduser(f"~/Library/Caches/{serviceName}Proxy")
 
-        xcode_dev_path = (
-            subprocess.run(
-                "xcode-select -p", shell=True, capture_output=True, check=True
+        service_path = origin_service_path()
+        if service_path is None:
+            xcode_dev_path = xcode_developer_dir(
+                os.path.join(self.cache_path, "developer_dir.json")
             )
-            .stdout.decode("utf-8")
-            .strip("\n")
-        )
-        xcode_dev_path_components = xcode_dev_path.split(os.path.sep)
-        if xcode_dev_path_components[-1] == "Developer":
-            build_service_path = os.path.sep.join(xcode_dev_path_components[0:-1])
-        else:
-            build_service_path = os.path.sep.join(xcode_dev_path_components)
-        build_service_path = os.path.join(
-            build_service_path,
-            "SharedFrameworks/SwiftBuild.framework/Versions/A/PlugIns/SWBBuildService.bundle/Contents/MacOS",
-        )
+            xcode_dev_path_components = xcode_dev_path.split(os.path.sep)
+            if xcode_dev_path_components[-1] == "Developer":
+                build_service_path = os.path.sep.join(xcode_dev_path_components[0:-1])
+            else:
+                build_service_path = os.path.sep.join(xcode_dev_path_components)
+            build_service_path = os.path.join(
+                build_service_path,
+                "SharedFrameworks/SwiftBuild.framework/Versions/A/PlugIns/SWBBuildService.bundle/Contents/MacOS",
+            )
+            service_path = f"{build_service_path}/{serviceName}-origin"
 
         self.is_client = True
         self.session_id = get_session_id()
@@ -74,14 +84,12 @@ class Context:
 
         self.log_file = None
 
-        self.command = [f"{build_service_path}/{serviceName}-origin"] + filter_args()
+        self.command = [service_path] + filter_args()
 
     def __enter__(self):
         if self.debug_mode == 0:
             return self
-        cache_path = os.path.join(
-            os.path.expanduser(f"~/Library/Caches/{self.serviceName}Proxy"),
-        )
+        cache_path = self.cache_path
 
         os.makedirs(cache_path, exist_ok=True)
         file_name = f"{'server' if not self.is_client else 'client'}"
@@ -125,6 +133,9 @@ class STDFeeder:
         self.context = context
         self._stdin = stdin
         self._message_spy = None
+        self._message_responder = None
+        # async callable to write a message frame directly to the client
+        self.reply_to_client = None
 
     @property
     def stdin(self):
@@ -146,6 +157,14 @@ class STDFeeder:
     def message_spy(self, value: MessageSpyBase):
         self._message_spy = value
 
+    @property
+    def message_responder(self):
+        return self._message_responder
+
+    @message_responder.setter
+    def message_responder(self, value: MessageResponderBase):
+        self._message_responder = value
+
     def __enter__(self):
         return self
 
@@ -208,6 +227,18 @@ class STDFeeder:
                             MessageType.client_message, self.msg_reader
                         )
 
+                    if self.message_responder and self.reply_to_client:
+                        reply = self.message_responder.respond(self.msg_reader)
+                        if reply is not None:
+                            # answered by proxy, service doesn't need to handle it
+                            self.msg_reader.reset()
+                            await self.reply_to_client(reply)
+                            if self.context.debug_mode:
+                                self.context.log(
+                                    f"CLIENT (proxy reply): {str(reply[12:])}"
+                                )
+                            continue
+
                     buffer = self.msg_reader.buffer.copy()
                     self.msg_reader.reset()
 
@@ -233,6 +264,9 @@ class STDOuter:
         self.context = context
         self._stdout = stdout
         self._message_spy = None
+        self._message_responder = None
+        # service messages and proxy replies can be written concurrently
+        self._write_lock = asyncio.Lock()
 
     @property
     def stdout(self):
@@ -252,6 +286,14 @@ class STDOuter:
     def message_spy(self, value: MessageSpyBase):
         self._message_spy = value
 
+    @property
+    def message_responder(self):
+        return self._message_responder
+
+    @message_responder.setter
+    def message_responder(self, value: MessageResponderBase):
+        self._message_responder = value
+
     def __enter__(self):
         return self
 
@@ -264,11 +306,12 @@ class STDOuter:
 
     async def write_stdout_bytes(self, out):
         loop = asyncio.get_running_loop()
-        if hasattr(self.stdout, "buffer"):  # sys.stdout
-            await push_data_to_stdout(out, self.stdout)
-        else:  # regular file object
-            await loop.run_in_executor(None, self.stdout.write, out)
-            await loop.run_in_executor(None, self.stdout.flush)
+        async with self._write_lock:
+            if hasattr(self.stdout, "buffer"):  # sys.stdout
+                await push_data_to_stdout(out, self.stdout)
+            else:  # regular file object
+                await loop.run_in_executor(None, self.stdout.write, out)
+                await loop.run_in_executor(None, self.stdout.flush)
 
     async def read_server_data(self, proc_stdout):
         loop = asyncio.get_running_loop()
@@ -300,6 +343,8 @@ class STDOuter:
                             await self.message_spy.on_receive_message(
                                 MessageType.server_message, self.msg_reader
                             )
+                        if self.message_responder:
+                            self.message_responder.on_server_message(self.msg_reader)
 
                         self.msg_reader.reset()
 
@@ -412,6 +457,13 @@ def run_client(context: Context):
 
 # SERVER side
 async def main_server(context: Context):
+    import lib.filelock as filelock
+
+    registry_lock = register_server(context.session_id)
+    if registry_lock is None:
+        context.log("SERVER: another server is already running for this session")
+        sys.exit(0)
+
     process = await asyncio.create_subprocess_exec(
         *context.command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
     )
@@ -424,6 +476,29 @@ async def main_server(context: Context):
             message_spy = ServerBuildOperationMessageSpy()
             outer.message_spy = message_spy
             reader.message_spy = message_spy
+            # reuse service sessions and responses of idempotent requests between xcodebuild clients
+            cacheable_requests = cacheable_service_requests()
+            if cacheable_requests is None:
+                cacheable_requests = DEFAULT_CACHEABLE_REQUESTS
+            else:
+                cacheable_requests = [x.encode("utf-8") for x in cacheable_requests]
+            message_responder = MessageResponderChain(
+                [
+                    SessionReuseResponder(context),
+                    ResponseCacheResponder(
+                        context,
+                        cacheable_requests,
+                        service_generation=process.pid,
+                    ),
+                ]
+            )
+            outer.message_responder = message_responder
+            reader.message_responder = message_responder
+            reader.reply_to_client = outer.write_stdout_bytes
+            # cached sessions and responses must not outlive the service which produced them
+            asyncio.create_task(process.wait()).add_done_callback(
+                lambda _: message_responder.on_service_exited()
+            )
             asyncio.create_task(reader.feed_stdin(process.stdin))
             asyncio.create_task(outer.read_server_data(process.stdout))
             last_mtime = None
@@ -476,6 +551,7 @@ async def main_server(context: Context):
                                 reader.stdin.close()
                             reader.stdin = open(stdin_file_path, "rb")
                             reader.msg_reader = MessageReader()
+                            message_responder.on_client_changed()
 
                             if outer.stdout:
                                 outer.stdout.close()
@@ -498,6 +574,7 @@ async def main_server(context: Context):
         if process.returncode is None:
             process.terminate()
         context.should_exit = True
+        unregister_server(registry_lock)
         sys.exit(0)
 
 
@@ -2,12 +2,14 @@ import os
 import fcntl
 import asyncio
 import json
+import time
 
+# vendored packages are imported lazily in functions which need them, as xcodebuild spawns proxy several times per build
 # to update psutil: cd src/XCBBuildServiceProxy && pip install -t lib/ psutil
-import lib.psutil as psutil
+# to update filelock: cd src/XCBBuildServiceProxy && pip install -t lib/ filelock
 
-# to update psutil: cd src/XCBBuildServiceProxy && pip install -t lib/ filelock
-import lib.filelock as filelock
+# link written by `xcode-select -s`, used by `xcode-select -p` if DEVELOPER_DIR is not set
+XCODE_SELECT_LINK = "/var/db/xcode_select_link"
 
 
 def is_behave_like_proxy():
@@ -25,6 +27,78 @@ def server_spy_output_file():
     return None
 
 
+def cacheable_service_requests():
+    # comma separated list of request names which responses can be cached by daemon server
+    if "SWBBUILD_SERVICE_PROXY_CACHEABLE_REQUESTS" in os.environ:
+        value = os.environ["SWBBUILD_SERVICE_PROXY_CACHEABLE_REQUESTS"]
+        return [x.strip() for x in value.split(",") if x.strip()]
+    return None
+
+
+def origin_service_path():
+    # path to origin service executable, if set then Xcode developer dir is not resolved
+    if "SWBBUILD_SERVICE_PROXY_ORIGIN_SERVICE" in os.environ:
+        return os.environ["SWBBUILD_SERVICE_PROXY_ORIGIN_SERVICE"]
+    return None
+
+
+def _mtime_ns(path: str, follow_symlinks=True):
+    try:
+        return os.stat(path, follow_symlinks=follow_symlinks).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_developer_dir_cache(cache_file: str):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return None
+
+
+def _write_developer_dir_cache(cache_file: str, cache):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, cache_file)
+    except:
+        pass  # cache is optional
+
+
+def xcode_developer_dir(cache_file: str):
+    # `xcode-select -p` costs a subprocess on every proxy start, so its result is cached
+    # and valid while DEVELOPER_DIR, xcode-select link and the developer dir itself are not changed
+    key = [os.environ.get("DEVELOPER_DIR"), _mtime_ns(XCODE_SELECT_LINK, False)]
+    cache = _read_developer_dir_cache(cache_file)
+    if (
+        cache is not None
+        and cache.get("key") == key
+        and cache.get("developer_dir_mtime") is not None
+        and _mtime_ns(cache["developer_dir"]) == cache["developer_dir_mtime"]
+    ):
+        return cache["developer_dir"]
+
+    import subprocess
+
+    developer_dir = (
+        subprocess.run(["xcode-select", "-p"], capture_output=True, check=True)
+        .stdout.decode("utf-8")
+        .strip("\n")
+    )
+    _write_developer_dir_cache(
+        cache_file,
+        {
+            "key": key,
+            "developer_dir": developer_dir,
+            "developer_dir_mtime": _mtime_ns(developer_dir),
+        },
+    )
+    return developer_dir
+
+
 def get_session_id():
     if "SWBBUILD_SERVICE_PROXY_SESSION_ID" in os.environ:
         return os.environ["SWBBUILD_SERVICE_PROXY_SESSION_ID"]
@@ -58,6 +132,8 @@ def update_build_status(message: str, with_lock=True):
             json.dump(message, f)
 
     if with_lock:
+        import lib.filelock as filelock
+
         with filelock.FileLock(lock_path, timeout=5):
             write_message()
     else:
@@ -90,6 +166,8 @@ def build_status(with_lock=True):
             return json.loads(cnt)
 
     if with_lock:
+        import lib.filelock as filelock
+
         with filelock.FileLock(lock_path, timeout=5):
             return read_message()
     else:
@@ -97,31 +175,167 @@ def build_status(with_lock=True):
 
 
 def is_pid_alive(pid: int):
-    if psutil.pid_exists(pid):
-        return True
-    return False
+    # the same as psutil.pid_exists on posix, but without importing psutil
+    if pid is None or pid < 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, but owned by another user
+    return True
 
 
 def kill_by_pid(pid: int):
+    import lib.psutil as psutil
+
     if pid and psutil.pid_exists(pid):
         psutil.Process(pid).kill()
         return True
     return False
 
 
+# Daemon server registers itself in a per session registry:
+#   <config_file>.server       - {"pid", "start_time", "session_id", "control_address"}, replaced atomically
+#   <config_file>.server.lock  - exclusive advisory lock which is held by the server while it's alive
+# so clients resolve the server without scanning all processes and detect stale entries by the free lock.
+def server_registry_file():
+    config_file_path = config_file()
+    if config_file_path is None:
+        return None
+    return config_file_path + ".server"
+
+
+def _is_registry_locked(lock_path: str):
+    try:
+        fd = os.open(lock_path, os.O_RDONLY)
+    except OSError:
+        return False  # server has never been registered
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return False  # nobody holds the lock, registry is stale
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+
+# environment variable with the registry lock descriptor which a client passes to the server it spawns
+REGISTRY_LOCK_FD_ENV = "SWBBUILD_SERVICE_PROXY_REGISTRY_LOCK_FD"
+
+
+def _open_registry_lock(registry_path: str):
+    os.makedirs(os.path.dirname(registry_path), exist_ok=True)
+    return os.open(registry_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _write_registry_entry(registry_path: str, session_id: str, pid: int):
+    entry = {
+        "pid": pid,
+        "start_time": time.time(),
+        "session_id": session_id,
+        "control_address": config_file(),
+    }
+    tmp_path = f"{registry_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, registry_path)
+
+
+# client side: takes the registry lock before a server is spawned, the lock is handed over to the server,
+# so there is no window in which a starting server is invisible to other clients.
+# returns the lock file descriptor or None if the lock is held by a running, starting or exiting server
+def lock_server_registry():
+    registry_path = server_registry_file()
+    if registry_path is None:
+        return None
+    lock_fd = _open_registry_lock(registry_path)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(lock_fd)
+        return None
+    return lock_fd
+
+
+# client side: registers the spawned server which inherited the lock, the client's descriptor is closed,
+# the lock is held by the server's copy of it
+def publish_server(lock_fd, session_id: str, pid: int):
+    try:
+        _write_registry_entry(server_registry_file(), session_id, pid)
+    finally:
+        os.close(lock_fd)
+
+
+# returns the lock file descriptor which should be kept open while server is alive, None if another server is alive
+def register_server(session_id: str, timeout=2.0):
+    registry_path = server_registry_file()
+    if registry_path is None:
+        return None
+
+    # lock which is already held by the client which spawned this server
+    inherited_fd = os.environ.pop(REGISTRY_LOCK_FD_ENV, None)
+    if inherited_fd is not None:
+        lock_fd = int(inherited_fd)
+        # service subprocesses should not keep the registry locked
+        os.set_inheritable(lock_fd, False)
+    else:
+        lock_fd = _open_registry_lock(registry_path)
+    time_start = time.time()
+    while True:
+        try:
+            # no-op for the inherited descriptor which already holds the lock
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except BlockingIOError:
+            # previous server can be still exiting
+            if time.time() - time_start > timeout:
+                os.close(lock_fd)
+                return None
+            time.sleep(0.05)
+
+    _write_registry_entry(registry_path, session_id, os.getpid())
+    return lock_fd
+
+
+def unregister_server(lock_fd):
+    if lock_fd is None:
+        return
+    try:
+        os.remove(server_registry_file())
+    except OSError:
+        pass
+    os.close(lock_fd)  # releases the lock
+
+
+def read_server_registry(session_id: str):
+    registry_path = server_registry_file()
+    if registry_path is None:
+        return None
+    if not _is_registry_locked(registry_path + ".lock"):
+        return None
+    # server holds the lock, but can be in the middle of writing its entry
+    for _ in range(10):
+        try:
+            with open(registry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry["session_id"] == session_id and is_pid_alive(entry["pid"]):
+                return entry
+        except (OSError, ValueError, KeyError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
 def get_server_pid_by_session_id(session_id: str):
     if session_id is None:
         return False
-    # find pid of server with command line argument session_id
-    for proc in psutil.process_iter(["pid", "cmdline"]):
-        try:
-            cmdline = proc.info["cmdline"]
-            if cmdline and session_id in " ".join(cmdline):
-                pid = proc.info["pid"]
-                return pid
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
-    return None
+    entry = read_server_registry(session_id)
+    if entry is None:
+        return None
+    return entry["pid"]
 
 
 async def push_data_to_stdout(out, stdout):
@@ -143,6 +357,8 @@ async def push_data_to_stdout(out, stdout):
 
 
 def is_parent_process_alive():
+    import lib.psutil as psutil
+
     ppid = os.getppid()
     if psutil.pid_exists(ppid):
         parent = psutil.Process(ppid)
@@ -39,19 +39,31 @@ class Message:
                 return b"BUILD_START"
             if has_prefix(message_data, b"\xacBUILD_CANCEL"):
                 return b"BUILD_CANCEL"
+            if has_prefix(message_data, b"\xbcTRANSFER_SESSION_PIF_REQUEST"):
+                return b"TRANSFER_SESSION_PIF_REQUEST"
+            if has_prefix(
+                message_data, b"\xd9\x24TRANSFER_SESSION_PIF_OBJECTS_REQUEST"
+            ):
+                return b"TRANSFER_SESSION_PIF_OBJECTS_REQUEST"
+            if has_prefix(message_data, b"\xaeDELETE_SESSION"):
+                return b"DELETE_SESSION"
 
         self.message = buffer
         self.message_body = buffer[12:]
+        # responses from the service are sent back with the same channel id as the request
+        self.channel_id = int.from_bytes(buffer[0:8], "little")
 
         self.message_code = message_code(self.message_body)
         if self.message_code is None:
             # we only parse known message codes required for this extension
             return
         self.message_code_len = len(self.message_code)
+        # fixstr has 1 byte header, str8 (0xd9) has 2 bytes header
+        code_header_len = 2 if self.message_body[0:1] == b"\xd9" else 1
 
-        self.message_data = self.message_body[1 + self.message_code_len :]
+        self.message_data = self.message_body[code_header_len + self.message_code_len :]
 
-        self.json_section_start = 12 + 1 + self.message_code_len
+        self.json_section_start = 12 + code_header_len + self.message_code_len
 
         self.json_data_offset = json_offset(self.message_data)
         if self.json_data_offset is not None:
@@ -70,6 +82,25 @@ class Message:
             return None
 
 
+# name of any message, body starts with msgpack string: fixstr (0xa0 - 0xbf) or str8 (0xd9)
+def message_name(message_body: bytearray):
+    if len(message_body) == 0:
+        return None
+    header = message_body[0]
+    if 0xA0 <= header <= 0xBF:
+        return bytes(message_body[1 : 1 + header - 0xA0])
+    if header == 0xD9 and len(message_body) > 1:
+        return bytes(message_body[2 : 2 + message_body[1]])
+    return None
+
+
+# copy of a complete message (12 bytes header + body) addressed to another channel id
+def frame_with_channel_id(frame: bytearray, channel_id: int) -> bytearray:
+    result = bytearray(frame)
+    result[0:8] = channel_id.to_bytes(8, "little")
+    return result
+
+
 class MessageReader:
 
     def __init__(self) -> None:
@@ -0,0 +1,339 @@
+import re
+import hashlib
+import json
+from MessageReader import MessageReader, Message, frame_with_channel_id, message_name
+
+# environment values which are different for every xcodebuild invocation, but don't affect the session
+VOLATILE_SESSION_ENVIRONMENT_KEYS = ("SWBBUILD_SERVICE_PROXY_BUILD_ID",)
+
+SESSION_ID_PATTERN = re.compile(rb'"sessionID"\s*:\s*"([^"]+)"')
+
+# informational requests which are answered the same way while the service is alive
+DEFAULT_CACHEABLE_REQUESTS = (
+    b"GET_PLATFORMS",
+    b"GET_SDKS",
+    b"GET_TOOLCHAINS",
+    b"GET_SPECS",
+    b"GET_BUILD_SETTINGS_DESCRIPTION",
+    b"DEVELOPER_PATH",
+    b"APPLE_SYSTEM_FRAMEWORK_NAMES",
+    b"PRODUCT_TYPE_SUPPORTS_MAC_CATALYST",
+)
+
+
+class MessageResponderBase:
+    # return a complete message frame to answer the client directly, such request is not forwarded to the service
+    def respond(self, message: MessageReader):
+        return None
+
+    def on_server_message(self, message: MessageReader):
+        pass
+
+    # daemon server switched pipes to a new xcodebuild client
+    def on_client_changed(self):
+        pass
+
+    # service process exited, nothing learned from it can be replayed anymore
+    def on_service_exited(self):
+        pass
+
+
+class MessageResponderChain(MessageResponderBase):
+    def __init__(self, responders: list):
+        self.responders = responders
+
+    def respond(self, message: MessageReader):
+        for responder in self.responders:
+            reply = responder.respond(message)
+            if reply is not None:
+                return reply
+        return None
+
+    def on_server_message(self, message: MessageReader):
+        for responder in self.responders:
+            responder.on_server_message(message)
+
+    def on_client_changed(self):
+        for responder in self.responders:
+            responder.on_client_changed()
+
+    def on_service_exited(self):
+        for responder in self.responders:
+            responder.on_service_exited()
+
+
+def session_fingerprint(message: Message) -> str:
+    config = message.json()
+    environment = config.get("environment") if isinstance(config, dict) else None
+    if isinstance(environment, dict):
+        for key in VOLATILE_SESSION_ENVIRONMENT_KEYS:
+            environment.pop(key, None)
+        return hashlib.sha256(
+            json.dumps(config, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+    return hashlib.sha256(message.message_body).hexdigest()
+
+
+def session_handle(message: Message):
+    config = message.json()
+    if isinstance(config, dict):
+        return config.get("sessionHandle")
+    return None
+
+
+def replace_session_handle(
+    message_reader: MessageReader, message: Message, handle, new_handle
+) -> bool:
+    """
+    Rewrites the session handle of the request in place, False if the handle can not be found exactly once.
+    """
+    if message.json_data_offset is None:
+        return False
+    old_value = json.dumps(handle).encode("utf-8")
+    json_data = bytes(message.json_data)
+    if json_data.count(old_value) != 1:
+        return False
+    new_json = json_data.replace(old_value, json.dumps(new_handle).encode("utf-8"))
+    json_start = message.json_section_start + message.json_data_offset
+    message_reader.buffer[message.json_section_start + 1 : json_start] = len(
+        new_json
+    ).to_bytes(message.json_data_offset - 1, "big")
+    message_reader.modify_body(new_json, json_start, json_start + message.json_len)
+    return True
+
+
+# Daemon server keeps SWBBuildService alive between builds, but every xcodebuild client creates a new session
+# and transfers workspace PIF again, so the service reloads the workspace model each time.
+# This responder remembers the session created for the identical CREATE_SESSION request and answers new clients with it.
+# Invalidation:
+#   - PIF transfer is replayed only for the same workspace signature and if the service didn't ask for any PIF objects,
+#     otherwise it's forwarded and the service updates the workspace of the session
+#   - DELETE_SESSION of a recorded session is answered by the proxy (once we learned how the service acknowledges it)
+#     and the session is kept alive for the next client. At most max_kept_sessions are kept: once a newer session
+#     would exceed it, the DELETE_SESSION is forwarded for the oldest kept session instead, so every build still
+#     deletes one service session even if the fingerprint changes on every build
+#   - DELETE_SESSION of unknown sessions is forwarded and the session is forgotten
+#   - all sessions are forgotten once the service process exits
+class SessionReuseResponder(MessageResponderBase):
+    def __init__(self, context=None, max_kept_sessions=2):
+        self.context = context
+        self.max_kept_sessions = max_kept_sessions
+        # fingerprint -> {"handle": session id, "response": frame}
+        self.sessions = {}
+        # handles of sessions deleted by clients, but kept alive by the proxy, oldest first
+        self.kept = []
+        # session handle -> {"fingerprint": ..., "response": frame, "objects_requested": bool}
+        self.pif_transfers = {}
+        # channel id -> (kind, key) of requests forwarded to the service and waiting for the response
+        self.pending = {}
+        self.delete_session_response = None
+        self.hits = 0
+        self.misses = 0
+
+    def log(self, *args):
+        if self.context:
+            self.context.log(*args)
+
+    def _recorded_handles(self):
+        return set(x["handle"] for x in self.sessions.values())
+
+    def _forget_session(self, handle):
+        if handle is None:
+            # we can not say which session it is, so don't reuse anything
+            self.sessions.clear()
+            self.pif_transfers.clear()
+            return
+        self.sessions = {
+            k: v for k, v in self.sessions.items() if v["handle"] != handle
+        }
+        self.pif_transfers.pop(handle, None)
+
+    def _delete_session(self, message_reader: MessageReader, message: Message):
+        handle = session_handle(message)
+        if (
+            handle is None
+            or handle not in self._recorded_handles()
+            or self.delete_session_response is None
+        ):
+            self._forget_session(handle)
+            self.pending[message.channel_id] = ("delete", handle)
+            return None
+        if handle not in self.kept:
+            self.kept.append(handle)
+        if len(self.kept) <= self.max_kept_sessions:
+            self.log(f"SESSION: keep session {handle} alive for next build")
+            return frame_with_channel_id(
+                self.delete_session_response, message.channel_id
+            )
+        # the newest session replaces the oldest one, the service deletes that one instead
+        oldest = self.kept[0]
+        if not replace_session_handle(message_reader, message, handle, oldest):
+            self.kept.remove(handle)
+            self._forget_session(handle)
+            self.pending[message.channel_id] = ("delete", handle)
+            return None
+        self.kept.remove(oldest)
+        self._forget_session(oldest)
+        self.pending[message.channel_id] = ("delete", oldest)
+        self.log(f"SESSION: keep session {handle} alive, delete session {oldest}")
+        return None
+
+    def respond(self, message_reader: MessageReader):
+        message = message_reader.getMessage()
+        code = message.message_code
+        try:
+            if code == b"CREATE_SESSION":
+                fingerprint = session_fingerprint(message)
+                session = self.sessions.get(fingerprint)
+                if session is not None and session["handle"] is not None:
+                    self.hits += 1
+                    self.log(f"SESSION: reuse session {session['handle']}")
+                    # the client owns the session till it deletes it again
+                    if session["handle"] in self.kept:
+                        self.kept.remove(session["handle"])
+                    return frame_with_channel_id(
+                        session["response"], message.channel_id
+                    )
+                self.misses += 1
+                self.pending[message.channel_id] = ("session", fingerprint)
+
+            elif code == b"TRANSFER_SESSION_PIF_REQUEST":
+                handle = session_handle(message)
+                fingerprint = hashlib.sha256(message.message_body).hexdigest()
+                transfer = self.pif_transfers.get(handle)
+                if (
+                    transfer is not None
+                    and transfer["fingerprint"] == fingerprint
+                    and transfer["response"] is not None
+                    and not transfer["objects_requested"]
+                ):
+                    self.hits += 1
+                    self.log(f"SESSION: workspace of session {handle} is up to date")
+                    return frame_with_channel_id(
+                        transfer["response"], message.channel_id
+                    )
+                # workspace changed or was never transferred to this session
+                self.misses += 1
+                self.pif_transfers[handle] = {
+                    "fingerprint": fingerprint,
+                    "response": None,
+                    "objects_requested": False,
+                }
+                self.pending[message.channel_id] = ("pif", handle)
+
+            elif code == b"TRANSFER_SESSION_PIF_OBJECTS_REQUEST":
+                transfer = self.pif_transfers.get(session_handle(message))
+                if transfer is not None:
+                    transfer["objects_requested"] = True
+
+            elif code == b"DELETE_SESSION":
+                return self._delete_session(message_reader, message)
+        except Exception as e:
+            self.log(f"SESSION: can not handle {code}: {e}")
+            self._forget_session(None)
+        return None
+
+    def on_server_message(self, message_reader: MessageReader):
+        if len(self.pending) == 0:
+            return
+        message = message_reader.getMessage()
+        request = self.pending.pop(message.channel_id, None)
+        if request is None:
+            return
+        kind, key = request
+        frame = message_reader.buffer.copy()
+        if kind == "session":
+            handle = SESSION_ID_PATTERN.search(frame)
+            self.sessions[key] = {
+                "handle": handle.group(1).decode("utf-8") if handle else None,
+                "response": frame,
+            }
+        elif kind == "pif":
+            transfer = self.pif_transfers.get(key)
+            if transfer is not None and transfer["response"] is None:
+                transfer["response"] = frame
+        elif kind == "delete":
+            self.delete_session_response = frame
+
+    def on_client_changed(self):
+        # requests of previous client would never be answered to the new one
+        self.pending.clear()
+
+    def on_service_exited(self):
+        self._forget_session(None)
+        self.kept.clear()
+        self.pending.clear()
+        self.delete_session_response = None
+
+
+# Every xcodebuild client attached to the daemon server asks the same informational requests at startup
+# (platforms, sdks, toolchains...), answers don't change while the service process is alive.
+# Responses of allow-listed requests are cached by request bytes (without channel id) and service generation.
+class ResponseCacheResponder(MessageResponderBase):
+    def __init__(
+        self,
+        context=None,
+        cacheable_requests=DEFAULT_CACHEABLE_REQUESTS,
+        service_generation=0,
+        max_entries=256,
+    ):
+        self.context = context
+        self.cacheable_requests = set(cacheable_requests)
+        self.service_generation = service_generation
+        self.max_entries = max_entries
+        # (generation, request body hash) -> response frame
+        self.responses = {}
+        # channel id -> key of cacheable request waiting for the response
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def log(self, *args):
+        if self.context:
+            self.context.log(*args)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.responses),
+            "generation": self.service_generation,
+        }
+
+    def respond(self, message_reader: MessageReader):
+        body = message_reader.buffer[12:]
+        name = message_name(body)
+        if name not in self.cacheable_requests:
+            return None
+        key = (self.service_generation, hashlib.sha256(body).hexdigest())
+        channel_id = int.from_bytes(message_reader.buffer[0:8], "little")
+        response = self.responses.get(key)
+        if response is not None:
+            self.hits += 1
+            self.log(f"CACHE: hit {name}, {self.stats()}")
+            return frame_with_channel_id(response, channel_id)
+        self.misses += 1
+        self.pending[channel_id] = key
+        return None
+
+    def on_server_message(self, message_reader: MessageReader):
+        if len(self.pending) == 0:
+            return
+        channel_id = int.from_bytes(message_reader.buffer[0:8], "little")
+        key = self.pending.pop(channel_id, None)
+        if key is None or key[0] != self.service_generation:
+            return
+        if len(self.responses) >= self.max_entries:
+            # drop the oldest response
+            del self.responses[next(iter(self.responses))]
+        self.responses[key] = message_reader.buffer.copy()
+
+    def on_client_changed(self):
+        self.pending.clear()
+        self.log(f"CACHE: {self.stats()}")
+
+    # all cached responses are outdated, responses of requests sent before are not cached
+    def on_service_exited(self):
+        self.service_generation += 1
+        self.responses.clear()
+        self.pending.clear()
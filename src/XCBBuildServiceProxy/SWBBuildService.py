@@ -14,8 +14,10 @@ from BuildServiceUtils import (
     get_build_id,
     build_status,
     config_file,
+    lock_server_registry,
+    publish_server,
+    REGISTRY_LOCK_FD_ENV,
 )
-import lib.filelock as filelock
 from BuildServiceHelper import Context, run_client, run_server, run_xcode_client
 
 
@@ -44,6 +46,7 @@ def main():
 
             import subprocess
             import tempfile
+            import lib.filelock as filelock
 
             # create pipes communication with server, delete temp files after communication done
             with tempfile.NamedTemporaryFile(
@@ -84,6 +87,21 @@ def main():
                 context.server_pid = get_server_pid_by_session_id(context.session_id)
 
                 def start_server():
+                    # the registry lock is taken before spawning, so concurrent clients see the starting server
+                    time_start = time.time()
+                    while True:
+                        lock_fd = lock_server_registry()
+                        if lock_fd is not None:
+                            break
+                        server_pid = get_server_pid_by_session_id(context.session_id)
+                        if server_pid:
+                            # started by another client
+                            return server_pid
+                        if time.time() - time_start > 5:
+                            # the lock holder doesn't register, spawn anyway and let the server resolve it
+                            break
+                        time.sleep(0.05)
+
                     server_command = sys.argv + ["-proxy-server", context.session_id]
                     if is_debug():
                         server_command = context.command + [
@@ -91,16 +109,28 @@ def main():
                             context.session_id,
                         ]
                         server_command[0] = server_command[0].replace("-origin", "")
-                    server = subprocess.Popen(
-                        server_command,
-                        close_fds=True,
-                        start_new_session=True,
-                        cwd=os.getcwd(),
-                        env=os.environ,
-                        stdin=subprocess.DEVNULL,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL,
-                    )
+                    env = dict(os.environ)
+                    if lock_fd is not None:
+                        env[REGISTRY_LOCK_FD_ENV] = str(lock_fd)
+                    try:
+                        server = subprocess.Popen(
+                            server_command,
+                            close_fds=True,
+                            pass_fds=() if lock_fd is None else (lock_fd,),
+                            start_new_session=True,
+                            cwd=os.getcwd(),
+                            env=env,
+                            stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                        )
+                    except:
+                        if lock_fd is not None:
+                            os.close(lock_fd)
+                        raise
+                    if lock_fd is not None:
+                        # the server holds the lock through the inherited descriptor
+                        publish_server(lock_fd, context.session_id, server.pid)
                     return server.pid
 
                 if not context.server_pid:
@@ -17,7 +17,10 @@ export class RuntimeWarningsLogWatcher {
     private rl?: Interface;
     private stream?: fs.ReadStream;
 
-    private cachedContent: string = "";
+    // warnings by element id, kept in sync by applying events of runtime_warning_database.py
+    private warnings = new Map<string, any>();
+    // seq of the last applied event, undefined till the first snapshot or after a gap
+    private lastSeq?: number;
     private log: LogChannelInterface;
 
     static get logPath(): string {
@@ -38,8 +41,8 @@ export class RuntimeWarningsLogWatcher {
         await createFifo(RuntimeWarningsLogWatcher.logPath);
         try {
             this.panel.refresh([]);
-            this.cachedContent = "";
-            this.updateTree("");
+            this.warnings.clear();
+            this.lastSeq = undefined;
         } catch {
             /* empty */
         }
@@ -80,42 +83,80 @@ export class RuntimeWarningsLogWatcher {
     }
 
     private updateTree(content: string) {
-        if (content === this.cachedContent) {
-            return;
-        }
-        //  convert to html
-        const elements: RuntimeWarningMessageNode[] = [];
         try {
-            const root = JSON.parse(content);
-
-            for (const element in root) {
-                const value = root[element];
-                const warning = new RuntimeWarningMessageNode(value.message, value.count, element);
-                const stacks = value.data;
-                for (const frame of stacks) {
-                    if (
-                        frame.file &&
-                        frame.file.length > 0 &&
-                        frame.file.indexOf("<compiler-generated>") === -1
-                    ) {
-                        const frameNode = new RuntimeWarningStackNode(
-                            frame.function,
-                            frame.line,
-                            frame.file
-                        );
-                        warning.stack.push(frameNode);
+            const event = JSON.parse(content);
+            if (this.applyEvent(event)) {
+                this.refreshPanel();
+            }
+        } catch (error) {
+            this.log.error(`Error of parsing runtime errors data: ${error}`);
+            throw error;
+        }
+    }
+
+    private applyEvent(event: any): boolean {
+        if (event.type === undefined) {
+            // old format, the whole database on every line
+            this.warnings = new Map(Object.entries(event));
+            this.lastSeq = undefined;
+            return true;
+        }
+        if (event.type === "snapshot") {
+            this.warnings = new Map(Object.entries(event.warnings));
+            this.lastSeq = event.seq;
+            return true;
+        }
+        if (this.lastSeq === undefined || event.seq !== this.lastSeq + 1) {
+            // missed events, wait for the next snapshot
+            this.lastSeq = undefined;
+            return false;
+        }
+        this.lastSeq = event.seq;
+        switch (event.type) {
+            case "new":
+                this.warnings.set(event.id, event.warning);
+                return true;
+            case "count": {
+                let changed = false;
+                for (const id in event.counts) {
+                    const warning = this.warnings.get(id);
+                    if (warning) {
+                        warning.count = event.counts[id];
+                        changed = true;
                     }
                 }
+                return changed;
+            }
+            case "remove":
+                return this.warnings.delete(event.id);
+            default:
+                return false;
+        }
+    }
 
-                elements.push(warning);
+    private refreshPanel() {
+        const elements: RuntimeWarningMessageNode[] = [];
+        for (const [element, value] of this.warnings) {
+            const warning = new RuntimeWarningMessageNode(value.message, value.count, element);
+            const stacks = value.data;
+            for (const frame of stacks) {
+                if (
+                    frame.file &&
+                    frame.file.length > 0 &&
+                    frame.file.indexOf("<compiler-generated>") === -1
+                ) {
+                    const frameNode = new RuntimeWarningStackNode(
+                        frame.function,
+                        frame.line,
+                        frame.file
+                    );
+                    warning.stack.push(frameNode);
+                }
             }
 
-            this.panel.refresh(elements);
-        } catch (error) {
-            this.log.error(`Error of parsing runtime errors data: ${error}`);
-            throw error;
-        } finally {
-            this.cachedContent = content;
+            elements.push(warning);
         }
+
+        this.panel.refresh(elements);
     }
 }
@@ -122,6 +122,8 @@ async function initialize(
     }
 
     emptyLog(".vscode/xcode/debugger.launching");
+    // per session records of debugger state, reset together with the legacy file
+    deleteFile(getFilePathInWorkspace(".vscode/xcode/debugger.sessions"));
     async function checkWorkspaceWrapper() {
         try {
             await atomicCommand.userCommand(
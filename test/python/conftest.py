@@ -0,0 +1,8 @@
+# Python scripts of the extension are run with their folder as the working directory and import each
+# other as top level modules, tests import them the same way.
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "resources"))
+sys.path.insert(0, os.path.join(ROOT, "src", "XCBBuildServiceProxy"))
@@ -0,0 +1,190 @@
+# Writes SLF (xcactivitylog) token streams for tests of the tokenizer and of log parsers.
+import gzip
+import struct
+import urllib.parse
+
+from slf_tokenizer import TokenType
+
+PAYLOAD_TOKEN_TYPES = (TokenType.String, TokenType.ClassName, TokenType.Json)
+
+
+def encode_slf(tokens) -> bytes:
+    """
+    :param tokens: (TokenType, value) pairs, as yielded by slf_tokenizer.tokenize
+    """
+    out = [b"SLF0"]
+    for token_type, value in tokens:
+        char = token_type.value.encode("ascii")
+        if token_type in PAYLOAD_TOKEN_TYPES:
+            data = value.encode("utf-8")
+            out.append(b"%d%s%s" % (len(data), char, data))
+        elif token_type == TokenType.Double:
+            out.append(struct.pack("<d", value).hex().encode("ascii") + char)
+        elif token_type == TokenType.Null:
+            out.append(char)
+        else:
+            out.append(b"%d%s" % (value, char))
+    return b"".join(out)
+
+
+def random_tokens(rng, count: int):
+    """
+    Tokens of all types, strings contain token chars and compile command words.
+
+    :param rng: random.Random
+    """
+    words = [
+        "swift-frontend",
+        "clang",
+        "-c",
+        "-primary-file",
+        "/src/é.swift",
+        "\n",
+        "#",
+        '"',
+        "12",
+        "SLF0",
+        "-",
+    ]
+    tokens = []
+    for _ in range(count):
+        token_type = rng.choice(list(TokenType))
+        if token_type in PAYLOAD_TOKEN_TYPES:
+            value = " ".join(rng.choice(words) for _ in range(rng.randint(0, 40)))
+        elif token_type == TokenType.Double:
+            value = rng.uniform(-1e9, 1e9)
+        elif token_type == TokenType.Null:
+            value = None
+        else:
+            value = rng.randint(0, 2**40)
+        tokens.append((token_type, value))
+    return tokens
+
+
+def synthetic_build_log(path, steps: int, output_lines: int = 200):
+    """
+    Writes a log of one target with `steps` compile sections, every section has build output text and
+    an error with a note, the parent section repeats all diagnostics like Xcode does.
+    """
+    T = TokenType
+
+    def class_token(name):
+        # repeated class names are replaced with references once the order of tokens is known
+        return [(T.ClassName, name)]
+
+    def location(file, line, column):
+        return class_token("DVTTextDocumentLocation") + [
+            (T.String, f"file://{urllib.parse.quote(file)}"),
+            (T.Double, 1.0),
+            (T.Int, line),
+            (T.Int, column),
+            (T.Int, line),
+            (T.Int, column),
+            (T.Int, 2**64 - 1),
+            (T.Int, 0),
+            (T.Int, 1),
+        ]
+
+    def list_token(count, null_if_empty):
+        # Xcode writes some empty arrays as null
+        if count == 0 and null_if_empty:
+            return (T.Null, None)
+        return (T.List, count)
+
+    def message(title, severity, file, line, column, sub_messages=(), null_lists=False):
+        tokens = class_token("IDEDiagnosticActivityLogMessage") + [
+            (T.String, title),
+            (T.String, title),
+            (T.Double, 2.0),
+            (T.Int, 0),
+            (T.Int, 0),
+            list_token(len(sub_messages), null_lists),
+        ]
+        for sub_message in sub_messages:
+            tokens += sub_message
+        tokens += [(T.Int, severity), (T.String, "com.apple.dt.IDE.diagnostic")]
+        tokens += location(file, line, column)
+        tokens += [(T.String, ""), list_token(0, null_lists), (T.Null, None)]
+        return tokens
+
+    def section(title, text, sub_sections, messages):
+        tokens = class_token("IDEActivityLogSection") + [
+            (T.Int, 1),
+            (T.String, "com.apple.dt.IDE.BuildLogSection"),
+            (T.String, title),
+            (T.String, title),
+            (T.Double, 1.0),
+            (T.Double, 2.0),
+            (T.List, len(sub_sections)),
+        ]
+        for sub_section in sub_sections:
+            tokens += sub_section
+        tokens += [(T.String, text), (T.List, len(messages))]
+        for m in messages:
+            tokens += m
+        return tokens
+
+    expected = []
+    all_messages = []
+    sub_sections = []
+    for i in range(steps):
+        file = f"/src/My Module/File{i}.swift"
+        # empty lists of every other step are written as null
+        note = message("did you mean 'x'?", 0, file, i, 4, null_lists=i % 2 == 1)
+        error = message(
+            f"cannot find 'y{i}' in scope",
+            2,
+            file,
+            i + 1,
+            9,
+            [note],
+            null_lists=i % 2 == 1,
+        )
+        output = "\n".join(
+            f"/usr/bin/swift-frontend -frontend -c -primary-file /src/Other{j}.swift -module-name App"
+            for j in range(output_lines)
+        )
+        text = (
+            f"{output}\n{file}:{i + 2}:10: error: cannot find 'y{i}' in scope\n"
+            f"{file}:{i + 1}:5: note: did you mean 'x'?\n"
+        )
+        sub_sections.append(
+            section(
+                f"Compile File{i}.swift (in target 'App' from project 'App')",
+                text,
+                [],
+                [error],
+            )
+        )
+        all_messages.append(error)
+        expected.append(
+            {
+                "severity": "note",
+                "file": file,
+                "line": i + 1,
+                "column": 5,
+                "message": "did you mean 'x'?",
+                "target": "App",
+            }
+        )
+        expected.append(
+            {
+                "severity": "error",
+                "file": file,
+                "line": i + 2,
+                "column": 10,
+                "message": f"cannot find 'y{i}' in scope",
+                "target": "App",
+            }
+        )
+    tokens = section("Build target App", "", sub_sections, all_messages)
+    class_names = {}
+    for i, (token_type, value) in enumerate(tokens):
+        if token_type == T.ClassName:
+            if value in class_names:
+                tokens[i] = (T.ClassNameRef, class_names[value])
+            else:
+                class_names[value] = len(class_names) + 1
+    with gzip.open(path, "wb") as f:
+        f.write(encode_slf(tokens))
+    return expected
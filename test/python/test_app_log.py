@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+
+import pytest
+
+import helper
+import app_log
+from app_log import AppLogger
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    # lines are printed only inside a debugger
+    monkeypatch.setenv("LLDB_PROVIDER", "code_lldb")
+    monkeypatch.delenv("APP_LOG_START", raising=False)
+    return str(tmp_path / "app.log")
+
+
+def _write(path, lines):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(f"{line}\n" for line in lines)
+
+
+def _logger(path, printed):
+    logger = AppLogger(path, printer=lambda text, end: printed.append(text))
+    logger.session_id = "S1"
+    return logger
+
+
+def _read(logger, printed) -> list:
+    """
+    Prints new lines like watch_app_log does, returns the printed lines and the tail to continue.
+    """
+    offset, ino = logger._start_position()
+    tail = helper.FileTail(logger.file_path, offset=offset, ino=ino)
+    logger.print_new_lines(tail)
+    logger.flush()
+    return "".join(printed).splitlines(), tail
+
+
+def test_reading_starts_at_session_start_marker(log_path):
+    _write(log_path, ["previous session"])
+    printed = []
+    logger = _logger(log_path, printed)
+    logger.mark_session_start(log_path, "S1")
+    _write(log_path, ["a", "b"])
+
+    lines, tail = _read(logger, printed)
+    tail.close()
+    assert lines == ["a", "b"]
+
+
+def test_resume_from_checkpoint_across_rotation(log_path):
+    printed = []
+    logger = _logger(log_path, printed)
+    logger.mark_session_start(log_path, "S1")
+    _write(log_path, ["a", "b"])
+    lines, tail = _read(logger, printed)
+    logger._checkpoint(tail)
+    tail.close()
+    assert lines == ["a", "b"]
+
+    # lines written while nobody reads, then the log is rotated like DebugAdapterTracker does by size
+    _write(log_path, ["c", "d"])
+    os.rename(log_path, f"{log_path}.1")
+    _write(log_path, ["e"])
+
+    printed = []
+    lines, tail = _read(_logger(log_path, printed), printed)
+    tail.close()
+    assert lines == ["c", "d", "e"]
+
+
+def test_end_mode_prints_only_new_lines(log_path, monkeypatch):
+    monkeypatch.setenv("APP_LOG_START", "end")
+    printed = []
+    logger = _logger(log_path, printed)
+    logger.mark_session_start(log_path, "S1")
+    _write(log_path, ["a", "b"])
+
+    offset, ino = logger._start_position()
+    with helper.FileTail(log_path, offset=offset, ino=ino) as tail:
+        _write(log_path, ["c"])
+        logger.print_new_lines(tail)
+        logger.flush()
+    assert "".join(printed).splitlines() == ["c"]
+
+    monkeypatch.setenv("APP_LOG_START", "beginning")
+    printed.clear()
+    lines, tail = _read(logger, printed)
+    tail.close()
+    assert lines == ["a", "b", "c"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app_log.time, "monotonic", clock)
+    return clock
+
+
+def test_lines_are_sent_in_batches(clock):
+    sent = []
+    logger = AppLogger("", printer=lambda text, end: sent.append(text))
+    logger.MAX_BATCH_SIZE = 10
+    assert logger._flush_timeout() is None
+
+    logger._print_line("abcd\n")
+    assert sent == []
+    clock.now += 0.01
+    assert logger._flush_timeout() == pytest.approx(AppLogger.MAX_BATCH_DELAY - 0.01)
+    # the full batch is sent at once
+    logger._print_line("efgh\r\n")
+    assert sent == ["abcd\nefgh\n"]
+    assert logger._flush_timeout() is None
+
+    # a line waits no longer than MAX_BATCH_DELAY
+    logger._print_line("ijk")
+    clock.now += AppLogger.MAX_BATCH_DELAY
+    assert logger._flush_timeout() == 0.0
+    logger.flush()
+    assert sent == ["abcd\nefgh\n", "ijk\n"]
+    logger.flush()
+    assert len(sent) == 2
+
+
+def test_lines_over_events_limit_are_suppressed(clock):
+    sent = []
+    logger = AppLogger("", printer=lambda text, end: sent.append(text))
+    logger.MAX_EVENTS_PER_SECOND = 2
+    for i in range(5):
+        logger._print_line(f"{i}")
+        logger.flush()
+    assert sent == ["0\n", "1\n"]
+
+    # the notice is sent once the next second starts, even if no new lines come
+    clock.now += 0.5
+    assert logger._flush_timeout() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert logger._flush_timeout() == 0.0
+    logger.flush()
+    assert sent[2] == "... 3 lines suppressed ...\n"
+
+    logger._print_line("5")
+    logger.flush()
+    logger._print_line("6")
+    logger.flush()
+    clock.now += 1.0
+    logger._print_line("7")
+    logger.flush()
+    assert sent[3:] == ["5\n", "... 1 lines suppressed ...\n7\n"]
+
+
+class StubDebugger:
+    """
+    attach_lldb functions used by AppLogger, records debugger commands instead of running them.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.commands = []
+
+    def is_lldb_dap(self):
+        return self.provider == "lldb-dap"
+
+    def perform_debugger_command(self, debugger, command):
+        self.commands.append(command)
+        # code lldb console fails on non-ascii characters
+        return command.isascii()
+
+
+@pytest.mark.parametrize("provider", ["code_lldb", "lldb-dap"])
+def test_batch_is_one_debugger_command(provider, clock, monkeypatch):
+    debugger = StubDebugger(provider)
+    monkeypatch.setitem(sys.modules, "attach_lldb", debugger)
+    logger = AppLogger("")
+    logger._debugger = debugger
+    text = 'it\'s a "quoted" line\nsecond\n'
+    for line in text.splitlines():
+        logger._print_line(line)
+    logger.flush()
+    assert len(debugger.commands) == 1
+    if provider == "code_lldb":
+        assert debugger.commands[0] == f"script print({text!r}, end='')"
+    else:
+        prefix = "lldb-dap send-event output '"
+        assert debugger.commands[0].startswith(prefix)
+        body = debugger.commands[0][len(prefix) : -1]
+        assert "'" not in body and json.loads(body) == {"output": text}
+
+    logger._print_line("café")
+    logger.flush()
+    if provider == "code_lldb":
+        # console which can't print the text gets it without non-ascii characters
+        assert len(debugger.commands) == 3
+        assert debugger.commands[2] == "script print('caf?\\n', end='')"
+    else:
+        # json escapes non-ascii characters
+        assert len(debugger.commands) == 2
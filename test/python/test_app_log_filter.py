@@ -0,0 +1,72 @@
+import pytest
+from app_log_filter import AppLogFilter
+
+
+def test_no_rules_accepts_everything():
+    assert AppLogFilter().accept("anything")
+
+
+def test_exclude_and_level():
+    log_filter = AppLogFilter()
+    log_filter.apply_command("exclude 'heartbeat|ping'")
+    log_filter.apply_command("level warning")
+    assert not log_filter.accept("2024 App[1:2] [com.app:net] <Error> ping failed")
+    assert log_filter.accept("2024 App[1:2] [com.app:net] <Error> request failed")
+    assert not log_filter.accept("2024 App[1:2] [com.app:net] <Info> request sent")
+    assert not log_filter.accept("plain print statement")
+
+
+def test_subsystem():
+    log_filter = AppLogFilter()
+    log_filter.apply_command("subsystem com.app")
+    assert log_filter.accept("App[1:2] [com.app:ui] view loaded")
+    assert not log_filter.accept("App[1:2] [com.other:ui] view loaded")
+
+
+def test_limit():
+    log_filter = AppLogFilter()
+    log_filter.apply_command("limit 5 'frame \\d+'")
+    assert sum(log_filter.accept(f"frame {i}") for i in range(100)) == 5
+    assert log_filter.accept("other line")
+
+
+def test_global_flags_are_scoped():
+    log_filter = AppLogFilter()
+    log_filter.apply_command("include (?i)error")
+    log_filter.apply_command("include (?s)warn.ing")
+    assert log_filter.accept("ERROR: x")
+    assert log_filter.accept("warn\ning")
+    assert not log_filter.accept("info")
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "include a(?i)b",  # global flags not at the start
+        "include (unclosed",
+        "exclude (a)\\\\1",  # numbered backreference
+        "limit 0 x",
+    ],
+)
+def test_invalid_rule_changes_nothing(command):
+    log_filter = AppLogFilter()
+    log_filter.apply_command("include ok")
+    with pytest.raises(ValueError):
+        log_filter.apply_command(command)
+    assert log_filter.describe() == "include ok"
+    # other commands still work
+    log_filter.apply_command("level error")
+    assert log_filter.describe() == "include ok\nlevel error"
+
+
+def test_group_names_of_patterns():
+    log_filter = AppLogFilter()
+    log_filter.apply_command("limit 2 (?P<p0>x)")
+    log_filter.apply_command("limit 1000 (y)(z)")
+    assert sum(log_filter.accept("x") for _ in range(10)) == 2
+    assert sum(log_filter.accept("yz") for _ in range(10)) == 10
+
+    log_filter.apply_command("include (?P<id>a)")
+    with pytest.raises(ValueError):
+        log_filter.apply_command("include (?P<id>b)")
+    assert log_filter.includes == ["(?P<id>a)"]
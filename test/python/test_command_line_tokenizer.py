@@ -0,0 +1,78 @@
+import random
+import shlex
+
+import pytest
+
+from command_line_tokenizer import (
+    COMPILE_FILE_KEYS,
+    compile_files,
+    split_command_line,
+)
+
+PIECES = [
+    "swift-frontend",
+    "clang",
+    "-primary-file",
+    "-c",
+    "/src/a.swift",
+    "/src/My File.swift",
+    "-I/usr/include",
+    '-DNAME=\\"v\\"',
+    "'single quoted'",
+    '"double \\" quoted"',
+    '"a\\\\b\\n"',
+    "''",
+    '""',
+    "\\ ",
+    "a\\'b",
+    "'",
+    '"',
+    "\\",
+    " ",
+    "\t",
+    "\n",
+    "\x0b",
+    "é",
+]
+
+
+def _files_with_shlex(line: str) -> list:
+    try:
+        args = shlex.split(line)
+    except ValueError:
+        return []
+    files = []
+    for i in range(len(args)):
+        if args[i] in COMPILE_FILE_KEYS:
+            if i + 1 < len(args) and args[i + 1].startswith("/"):
+                files.append(args[i + 1])
+    return files
+
+
+def test_compile_files():
+    line = "swift-frontend -frontend -c /src/a.swift -primary-file '/src/My File.swift' -o /out/a.o"
+    assert compile_files(line) == ["/src/a.swift", "/src/My File.swift"]
+    assert compile_files("clang -x c -o /out/a.o") == []
+
+
+def test_not_closed_quote():
+    with pytest.raises(ValueError):
+        split_command_line("clang '-DX")
+    assert compile_files("clang '-c /src/a.m") == []
+
+
+def test_same_as_shlex():
+    rng = random.Random(7)
+    for _ in range(20000):
+        line = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 30)))
+        try:
+            expected = shlex.split(line)
+        except ValueError:
+            expected = ValueError
+        try:
+            actual = split_command_line(line)
+        except ValueError:
+            actual = ValueError
+        assert actual == expected, line
+        if expected is not ValueError:
+            assert compile_files(line) == _files_with_shlex(line), line
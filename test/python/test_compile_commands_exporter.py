@@ -0,0 +1,149 @@
+import os
+import json
+
+import pytest
+
+import compile_commands_exporter
+from compile_commands_exporter import CompileCommandsExporter
+
+
+class FakeAccumulator:
+    """
+    Same change tracking as LogAccumulator: files changed after a sequence, latest first.
+    """
+
+    def __init__(self):
+        self.commands = {}
+        self.file_seq = {}
+        self.seq = 0
+
+    def set(self, file, line):
+        self.commands[file] = line
+        self.seq += 1
+        self.file_seq.pop(file, None)
+        self.file_seq[file] = self.seq
+
+    def remove(self, file):
+        self.set(file, None)
+
+    def command(self, file):
+        return self.commands.get(file, None)
+
+    def changed_since(self, seq: int) -> list:
+        return [file for file in reversed(self.file_seq) if self.file_seq[file] > seq]
+
+
+def _line(file, flags=()):
+    return " ".join(
+        ["swift-frontend", "-frontend", "-c"] + list(flags) + ["-primary-file", file]
+    )
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return {entry["file"]: entry for entry in json.load(f)}
+
+
+@pytest.fixture
+def encoded(monkeypatch):
+    files = []
+    compile_command_entry = compile_commands_exporter.compile_command_entry
+
+    def entry(file, line, directory):
+        files.append(file)
+        return compile_command_entry(file, line, directory)
+
+    monkeypatch.setattr(compile_commands_exporter, "compile_command_entry", entry)
+    return files
+
+
+def test_only_changed_entries_are_encoded(tmp_path, encoded):
+    accumulator = FakeAccumulator()
+    path = tmp_path / "compile_commands.json"
+    exporter = CompileCommandsExporter(accumulator, path, "/project")
+    for name in "ABC":
+        accumulator.set(f"/src/{name}.swift", _line(f"/src/{name}.swift"))
+    assert exporter.update()
+    assert sorted(encoded) == ["/src/A.swift", "/src/B.swift", "/src/C.swift"]
+
+    encoded.clear()
+    accumulator.set("/src/B.swift", _line("/src/B.swift", ["-DDEBUG"]))
+    assert exporter.update()
+    assert encoded == ["/src/B.swift"]
+    entries = _read(path)
+    assert len(entries) == 3
+    assert "-DDEBUG" in entries["/src/B.swift"]["arguments"]
+    assert entries["/src/A.swift"]["arguments"] == _line("/src/A.swift").split(" ")
+
+
+def test_files_without_command_are_removed(tmp_path):
+    accumulator = FakeAccumulator()
+    path = tmp_path / "compile_commands.json"
+    exporter = CompileCommandsExporter(accumulator, path, "/project")
+    accumulator.set("/src/A.swift", _line("/src/A.swift"))
+    accumulator.set("/src/B.swift", _line("/src/B.swift"))
+    exporter.update()
+
+    accumulator.remove("/src/A.swift")
+    assert exporter.update()
+    assert list(_read(path)) == ["/src/B.swift"]
+
+
+def test_working_directory_of_command_line(tmp_path):
+    accumulator = FakeAccumulator()
+    path = tmp_path / "compile_commands.json"
+    exporter = CompileCommandsExporter(accumulator, path, "/project")
+    accumulator.set(
+        "/src/A.swift", _line("/src/A.swift", ["-working-directory", "'/work dir'"])
+    )
+    accumulator.set("/src/B.swift", _line("/src/B.swift"))
+    # not closed quote, the line is kept as it is
+    accumulator.set("/src/C.swift", _line("/src/C.swift", ['"-DX']))
+    exporter.update()
+
+    entries = _read(path)
+    assert entries["/src/A.swift"]["directory"] == "/work dir"
+    assert entries["/src/B.swift"]["directory"] == "/project"
+    assert entries["/src/C.swift"] == {
+        "directory": "/project",
+        "file": "/src/C.swift",
+        "command": _line("/src/C.swift", ['"-DX']),
+    }
+
+
+def test_file_is_replaced_atomically(tmp_path, monkeypatch):
+    accumulator = FakeAccumulator()
+    path = tmp_path / "compile_commands.json"
+    exporter = CompileCommandsExporter(accumulator, path, "/project")
+    accumulator.set("/src/A.swift", _line("/src/A.swift"))
+    assert exporter.update()
+    content = path.read_bytes()
+    stat = path.stat()
+
+    # nothing changed, the file is not written
+    assert not exporter.update()
+    assert path.stat().st_ino == stat.st_ino
+    assert path.stat().st_mtime_ns == stat.st_mtime_ns
+
+    # failed write keeps the old file and leaves no tmp file
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    accumulator.set("/src/B.swift", _line("/src/B.swift"))
+    with pytest.raises(OSError):
+        exporter.update()
+    assert path.read_bytes() == content
+    assert os.listdir(tmp_path) == ["compile_commands.json"]
+
+    # the new file replaces the old one, readers never see a partially written file
+    monkeypatch.undo()
+    accumulator.set("/src/C.swift", _line("/src/C.swift"))
+    assert exporter.update()
+    assert path.stat().st_ino != stat.st_ino
+    assert sorted(_read(path)) == ["/src/A.swift", "/src/B.swift", "/src/C.swift"]
+
+    # removed file is written again even if nothing changed
+    path.unlink()
+    assert exporter.update()
+    assert sorted(_read(path)) == ["/src/A.swift", "/src/B.swift", "/src/C.swift"]
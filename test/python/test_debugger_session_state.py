@@ -0,0 +1,42 @@
+import helper
+from helper import DebuggerSessionState
+
+
+def _state(tmp_path, legacy_content=None):
+    legacy = tmp_path / "debugger.launching"
+    if legacy_content is not None:
+        legacy.write_text(legacy_content)
+    return DebuggerSessionState(str(tmp_path / "debugger.sessions"), str(legacy))
+
+
+def _is_valid(state, session_id, monkeypatch):
+    monkeypatch.setattr(helper, "DEBUGGER_SESSION_STATE", state)
+    return helper.is_debug_session_valid(session_id)
+
+
+def test_unknown_session_is_valid_while_legacy_file_is_empty(tmp_path, monkeypatch):
+    # the extension empties the legacy file on start
+    state = _state(tmp_path, "")
+    assert _is_valid(state, "unknown", monkeypatch)
+    state.write_session("known", {"status": "stopped"})
+    assert not _is_valid(state, "known", monkeypatch)
+    assert _is_valid(state, "unknown", monkeypatch)
+
+
+def test_unknown_session_without_storage_is_valid(tmp_path, monkeypatch):
+    assert _is_valid(_state(tmp_path), "unknown", monkeypatch)
+
+
+def test_sessions_of_legacy_file(tmp_path, monkeypatch):
+    state = _state(
+        tmp_path, '{"running": {"status": "attached"}, "done": {"status": "stopped"}}'
+    )
+    assert _is_valid(state, "running", monkeypatch)
+    assert not _is_valid(state, "done", monkeypatch)
+    assert not _is_valid(state, "unknown", monkeypatch)
+
+    # compaction migrates running sessions to records
+    state.compact()
+    assert (tmp_path / "debugger.launching").read_text() == "{}"
+    assert state.session("running") == {"status": "attached"}
+    assert state.session("done") is None
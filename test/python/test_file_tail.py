@@ -0,0 +1,116 @@
+import os
+import time
+import statistics
+import threading
+import multiprocessing
+
+import pytest
+
+import helper
+
+LINE_PAYLOAD = (
+    "Sample app log line with some payload, user id: 12345, request: /api/v1/items"
+)
+
+
+def generate_log(path: str, lines: int, rate: int):
+    with open(path, "ab", buffering=0) as f:
+        batch = []
+        for i in range(lines):
+            # write timestamp to measure latency on the reader side
+            batch.append(f"{time.time():.6f} {i} {LINE_PAYLOAD}\n".encode("utf-8"))
+            if len(batch) == 64 or i == lines - 1:
+                f.write(b"".join(batch))
+                batch = []
+                if rate:
+                    time.sleep(64 / rate)
+
+
+def byte_by_byte_lines(path: str, lines: int):
+    # previous implementation: read(1) per byte, 100 ms sleep on EOF
+    with open(path, "rb") as file:
+        line = bytearray()
+        read = 0
+        while read < lines:
+            x = file.read(1)
+            if x:
+                line.extend(x)
+                if line.endswith(b"\n"):
+                    yield [bytes(line)]
+                    read += 1
+                    line = bytearray()
+            else:
+                time.sleep(0.1)
+
+
+def file_tail_lines(path: str, lines: int):
+    read = 0
+    with helper.FileTail(path) as tail:
+        for batch in tail.follow(should_stop=lambda: read >= lines):
+            read += len(batch)
+            yield batch
+
+
+def test_lines_written_in_parts_are_joined(tmp_path):
+    path = str(tmp_path / "app.log")
+    open(path, "wb").close()
+    expected = [f"line {i}\n".encode("utf-8") for i in range(1000)]
+    data = b"".join(expected)
+
+    def write():
+        with open(path, "ab", buffering=0) as f:
+            # chunks which split lines
+            for start in range(0, len(data), 777):
+                f.write(data[start : start + 777])
+                time.sleep(0.001)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    lines = [line for batch in file_tail_lines(path, len(expected)) for line in batch]
+    writer.join()
+    assert lines == expected
+
+
+def run(name: str, reader, tmp_path, lines: int, rate: int):
+    path = str(tmp_path / f"{reader.__name__}.log")
+    open(path, "wb").close()
+    generator = multiprocessing.Process(target=generate_log, args=(path, lines, rate))
+    latencies = []
+    count = 0
+    total_bytes = 0
+    start = time.perf_counter()
+    generator.start()
+    for batch in reader(path, lines):
+        now = time.time()
+        for line in batch:
+            count += 1
+            total_bytes += len(line)
+        # latency of the last line of every batch
+        latencies.append(now - float(batch[-1].split(b" ", 1)[0]))
+    elapsed = time.perf_counter() - start
+    generator.join()
+
+    latencies.sort()
+    print(f"{name}:")
+    print(
+        f"  {count} lines, {total_bytes / 1024 / 1024:.1f} MB in {elapsed:.2f} s: "
+        f"{count / elapsed:,.0f} lines/s, {total_bytes / 1024 / 1024 / elapsed:.1f} MB/s"
+    )
+    print(
+        f"  latency median: {statistics.median(latencies) * 1000:.1f} ms, "
+        f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms, "
+        f"max: {latencies[-1] * 1000:.1f} ms"
+    )
+
+
+@pytest.mark.skipif(
+    "APP_LOG_BENCHMARK" not in os.environ,
+    reason="benchmark, set APP_LOG_BENCHMARK to <lines>[,<lines per second, 0 - unlimited>]",
+)
+def test_benchmark(tmp_path):
+    args = [int(x) for x in os.environ["APP_LOG_BENCHMARK"].split(",")]
+    lines = args[0]
+    rate = args[1] if len(args) > 1 else 0
+    run("FileTail (chunked, event driven)", file_tail_lines, tmp_path, lines, rate)
+    # byte by byte reader is too slow for the full run
+    run("read(1) per byte", byte_by_byte_lines, tmp_path, min(lines, 20000), rate)
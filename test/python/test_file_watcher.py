@@ -0,0 +1,62 @@
+import os
+import time
+import threading
+
+import pytest
+
+import helper
+
+
+@pytest.fixture(params=["event", "polling"])
+def watched_file(request, tmp_path):
+    path = str(tmp_path / "LogStoreManifest.plist")
+    with open(path, "w") as f:
+        f.write("0")
+    if request.param == "event":
+        watcher = helper.create_file_watcher(path)
+    else:
+        watcher = helper.FileWatcher(path)
+    with watcher:
+        yield path, watcher
+
+
+def _replace(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def test_wait_reports_change(watched_file):
+    path, watcher = watched_file
+    assert not watcher.wait(0.0)
+    _replace(path, "1")
+    assert watcher.wait(5.0)
+    assert not watcher.wait(0.0)
+    os.unlink(path)
+    assert watcher.wait(5.0)
+
+
+def test_burst_is_reported_once(watched_file):
+    path, watcher = watched_file
+    latencies = []
+    for i in range(5):
+        burst_end = []
+
+        def write_burst():
+            time.sleep(0.05)
+            for j in range(5):
+                _replace(path, f"{i} {j}")
+                time.sleep(0.01)
+            burst_end.append(time.time())
+
+        writer = threading.Thread(target=write_burst)
+        writer.start()
+        assert watcher.wait_settled(timeout=5.0)
+        settled = time.time()
+        writer.join()
+        # the whole burst is reported as one change
+        assert not watcher.wait(0.0)
+        latencies.append(settled - burst_end[0])
+    assert not watcher.wait_settled(timeout=0.2)
+    assert max(latencies) < 0.5, latencies
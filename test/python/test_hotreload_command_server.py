@@ -0,0 +1,50 @@
+import os
+import socket
+
+import pytest
+
+from hotreload_command_server import CompileCommandServer, query
+from hotreload_log_accumulator import LogAccumulator
+
+LINE = "swift-frontend -frontend -c -primary-file /src/A.swift -module-name App"
+
+
+@pytest.fixture
+def accumulator(tmp_path):
+    accumulator = LogAccumulator(tmp_path / "log_accumulator.json")
+    accumulator.set_log("/src/A.swift", LINE, 1)
+    return accumulator
+
+
+def test_queries(tmp_path, accumulator):
+    path = str(tmp_path / "commands.sock")
+    with CompileCommandServer(accumulator, path) as server:
+        response = query(path, {"method": "command", "file": "/src/A.swift"})
+        assert response["command"] == LINE
+        response = query(path, {"method": "changed_since", "seq": 0})
+        assert response["reset"] and response["files"] == ["/src/A.swift"]
+        response = query(
+            path,
+            {"method": "changed_since", "seq": response["seq"], "epoch": server.epoch},
+        )
+        assert not response["reset"] and response["files"] == []
+        assert "error" in query(path, {"method": "unknown"})
+    assert not os.path.exists(path)
+
+
+def test_running_server_is_not_replaced(tmp_path, accumulator):
+    path = str(tmp_path / "commands.sock")
+    with CompileCommandServer(accumulator, path):
+        with pytest.raises(OSError):
+            CompileCommandServer(accumulator, path).start()
+        assert query(path, {"method": "command", "file": "/src/A.swift"})["command"]
+
+
+def test_stale_socket_is_replaced(tmp_path, accumulator):
+    path = str(tmp_path / "commands.sock")
+    # socket file of a killed server
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    with CompileCommandServer(accumulator, path):
+        assert query(path, {"method": "command", "file": "/src/A.swift"})["command"]
@@ -0,0 +1,139 @@
+import gzip
+import os
+import time
+
+import hotreload_log_accumulator
+from hotreload_log_accumulator import (
+    LogAccumulator,
+    apply_delta,
+    diff_units,
+    extract_all_logs,
+)
+from slf_tokenizer import TokenType
+from slf_writer import encode_slf
+
+MAIN_PID = os.getpid()
+read_compile_lines = hotreload_log_accumulator.read_compile_lines
+
+
+def _line(module, files, flags=()):
+    return " ".join(
+        ["swift-frontend", "-frontend", "-c", "-module-name", module]
+        + [f"-D{flag}" for flag in flags]
+        + [f"/src/{f}.swift" for f in files]
+    )
+
+
+def test_diff_units_roundtrip():
+    base = "a b c d e f g h".split()
+    for units in (
+        "a b c d e f g h".split(),
+        "a x c d e f g h".split(),
+        "a b c d e f g h i".split(),
+        "b c d e f g".split(),
+    ):
+        delta = diff_units(base, units, 16)
+        assert delta is not None
+        assert apply_delta(base, delta) == units
+
+
+def test_identical_lines_are_stored_once(tmp_path):
+    accumulator = LogAccumulator(tmp_path / "log_accumulator.json")
+    flags = [f"FLAG{i}" for i in range(30)]
+    accumulator.set_log("/src/T.swift", _line("App", ["T"], flags), 1)
+    # stored as a delta of the table of the first line
+    line = _line("App", ["A"], flags + ["EXTRA"])
+    accumulator.set_log("/src/A.swift", line, 2)
+    # a very different line of the same module gets its own table, which the group then points to
+    other_flags = [f"OTHER{i}" for i in range(50)]
+    accumulator.set_log("/src/C.swift", _line("App", ["C"], other_flags), 3)
+    # the same line is encoded differently now, but it is the same line
+    accumulator.set_log("/src/B.swift", line, 4)
+
+    assert accumulator.data["files"]["/src/A.swift"] == (
+        accumulator.data["files"]["/src/B.swift"]
+    )
+    assert len(accumulator.data["hashes"]) == 3
+    assert accumulator.command("/src/B.swift") == line
+
+    dump = tmp_path / "dump.xcactivitylog"
+    accumulator.dump_xclog_file(dump)
+    with gzip.open(dump, "rb") as f:
+        assert f.read().count(line.encode("utf-8")) == 1
+
+
+def test_journal_is_replayed(tmp_path):
+    path = tmp_path / "log_accumulator.json"
+    accumulator = LogAccumulator(path)
+    accumulator.set_log("/src/A.swift", _line("App", ["A"]), 1)
+    accumulator.set_log("/src/B.swift", _line("App", ["B"]), 2)
+    accumulator.set_log("/src/A.swift", _line("App", ["A"], ["DEBUG"]), 3)
+    accumulator.save_log_accumulator()
+
+    replayed = LogAccumulator(path)
+    assert replayed.data["files"] == accumulator.data["files"]
+    assert replayed.command("/src/A.swift") == _line("App", ["A"], ["DEBUG"])
+    assert replayed.command("/src/B.swift") == _line("App", ["B"])
+
+
+def _compile_line(file, flags=()):
+    return _line("App", [file], flags) + f" -primary-file /src/{file}.swift"
+
+
+def _xclogs(tmp_path, count):
+    """
+    Logs written one after another, so st_ctime order is the order of the list.
+    Every log compiles A.swift with its own flag, only the first one compiles B.swift.
+    """
+    logs = []
+    for i in range(count):
+        lines = [_compile_line("A", [f"V{i}"])]
+        if i == 0:
+            lines.append(_compile_line("B"))
+        log = tmp_path / f"{i}.xcactivitylog"
+        with gzip.open(log, "wb") as f:
+            f.write(encode_slf([(TokenType.String, "\n".join(lines))]))
+        logs.append(log)
+        time.sleep(0.01)
+    return logs
+
+
+def _accumulate(tmp_path, logs):
+    accumulator = LogAccumulator(tmp_path / "log_accumulator.journal")
+    for line, st_ctime in extract_all_logs(logs):
+        for file in ("/src/A.swift", "/src/B.swift"):
+            if file in line:
+                accumulator.set_log(file, line, st_ctime)
+    return accumulator
+
+
+def test_parallel_logs_are_merged_in_ctime_order(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("HOT_RELOAD_LOG_WORKERS", "3")
+    monkeypatch.setenv("HOT_RELOAD_LOG_MAX_PENDING", "3")
+    logs = _xclogs(tmp_path, 8)
+
+    lines = [line for line, _ in extract_all_logs(logs)]
+    assert lines == [_compile_line("A", ["V0"]), _compile_line("B")] + [
+        _compile_line("A", [f"V{i}"]) for i in range(1, 8)
+    ]
+    accumulator = _accumulate(tmp_path, logs)
+    assert accumulator.command("/src/A.swift") == _compile_line("A", ["V7"])
+    assert accumulator.command("/src/B.swift") == _compile_line("B")
+
+
+def _die_in_worker(xclog_file):
+    if os.getpid() != MAIN_PID:
+        os._exit(1)  # like a worker killed for memory
+    return read_compile_lines(xclog_file)
+
+
+def test_logs_of_dead_worker_are_parsed_inline(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("HOT_RELOAD_LOG_WORKERS", "2")
+    monkeypatch.setattr(hotreload_log_accumulator, "read_compile_lines", _die_in_worker)
+    logs = _xclogs(tmp_path, 6)
+
+    accumulator = _accumulate(tmp_path, logs)
+    assert accumulator.command("/src/A.swift") == _compile_line("A", ["V5"])
+    assert accumulator.command("/src/B.swift") == _compile_line("B")
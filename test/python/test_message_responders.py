@@ -0,0 +1,173 @@
+import json
+
+from MessageReader import MessageReader
+from MessageResponders import (
+    MessageResponderChain,
+    ResponseCacheResponder,
+    SessionReuseResponder,
+    session_handle,
+)
+
+
+def make_frame(channel_id: int, code: bytes, config) -> MessageReader:
+    data = json.dumps(config).encode("utf-8")
+    if len(code) < 32:
+        body = bytes([0xA0 + len(code)]) + code
+    else:
+        body = b"\xd9" + bytes([len(code)]) + code
+    body += b"\xc5" + len(data).to_bytes(2, "big") + data
+    reader = MessageReader()
+    reader.feed(channel_id.to_bytes(8, "little") + len(body).to_bytes(4, "little"))
+    reader.feed(body)
+    return reader
+
+
+def channel_id(frame) -> int:
+    return int.from_bytes(frame[0:8], "little")
+
+
+def test_session_is_reused_by_next_clients():
+    # xcodebuild clients creating the same session one after another
+    responder = SessionReuseResponder()
+    create = {"name": "x", "environment": {"SWBBUILD_SERVICE_PROXY_BUILD_ID": "1"}}
+    pif = {"sessionHandle": "S0", "workspaceSignature": "W1"}
+
+    # first client, everything goes to the service
+    assert responder.respond(make_frame(1, b"CREATE_SESSION", create)) is None
+    responder.on_server_message(make_frame(1, b"STRING", {"sessionID": "S0"}))
+    assert (
+        responder.respond(make_frame(2, b"TRANSFER_SESSION_PIF_REQUEST", pif)) is None
+    )
+    responder.on_server_message(make_frame(2, b"TRANSFER_SESSION_PIF_RESPONSE", {}))
+    assert responder.respond(make_frame(3, b"DELETE_SESSION", pif)) is None
+    responder.on_server_message(make_frame(3, b"VOID", {}))
+    assert len(responder.sessions) == 0, "forwarded delete forgets the session"
+
+    # second client creates the session again, now delete is acknowledged by proxy
+    responder.on_client_changed()
+    create["environment"]["SWBBUILD_SERVICE_PROXY_BUILD_ID"] = "2"
+    assert responder.respond(make_frame(1, b"CREATE_SESSION", create)) is None
+    responder.on_server_message(make_frame(1, b"STRING", {"sessionID": "S0"}))
+    assert responder.respond(make_frame(4, b"DELETE_SESSION", pif)) is not None
+
+    # third client reuses the session and the workspace
+    responder.on_client_changed()
+    create["environment"]["SWBBUILD_SERVICE_PROXY_BUILD_ID"] = "3"
+    reply = responder.respond(make_frame(7, b"CREATE_SESSION", create))
+    assert reply is not None and channel_id(reply) == 7
+    assert (
+        responder.respond(make_frame(8, b"TRANSFER_SESSION_PIF_REQUEST", pif)) is None
+    )
+    responder.on_server_message(make_frame(8, b"TRANSFER_SESSION_PIF_RESPONSE", {}))
+    assert (
+        responder.respond(make_frame(9, b"TRANSFER_SESSION_PIF_REQUEST", pif))
+        is not None
+    )
+
+    # workspace changed
+    pif["workspaceSignature"] = "W2"
+    assert (
+        responder.respond(make_frame(10, b"TRANSFER_SESSION_PIF_REQUEST", pif)) is None
+    )
+
+    # sessions die with the service
+    responder.on_service_exited()
+    assert responder.respond(make_frame(11, b"CREATE_SESSION", create)) is None
+
+
+class FakeService:
+    """
+    Creates a session for every CREATE_SESSION which reaches it and deletes the session of DELETE_SESSION.
+    """
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.sessions = set()
+        self.created = 0
+
+    def send(self, frame: MessageReader):
+        reply = self.responder.respond(frame)
+        if reply is not None:
+            return reply
+        message = frame.getMessage()
+        if message.message_code == b"CREATE_SESSION":
+            handle = f"S{self.created}"
+            self.created += 1
+            self.sessions.add(handle)
+            response = make_frame(message.channel_id, b"STRING", {"sessionID": handle})
+        else:
+            if message.message_code == b"DELETE_SESSION":
+                self.sessions.remove(session_handle(message))
+            response = make_frame(message.channel_id, b"VOID", {})
+        self.responder.on_server_message(response)
+        return response.buffer
+
+
+def _build(service: FakeService, environment: dict) -> str:
+    service.responder.on_client_changed()
+    create = {"name": "x", "environment": environment}
+    reply = service.send(make_frame(1, b"CREATE_SESSION", create))
+    handle = json.loads(reply[reply.index(b"{") :])["sessionID"]
+    service.send(make_frame(2, b"DELETE_SESSION", {"sessionHandle": handle}))
+    return handle
+
+
+def test_kept_sessions_are_bounded_if_fingerprint_changes_every_build():
+    responder = SessionReuseResponder(max_kept_sessions=2)
+    service = FakeService(responder)
+    for build in range(30):
+        # environment value which is different for every build, but not known as volatile
+        _build(
+            service, {"SWBBUILD_SERVICE_PROXY_BUILD_ID": str(build), "T": str(build)}
+        )
+        assert len(service.sessions) <= 2, service.sessions
+    assert responder.hits == 0
+    assert service.created == 30
+
+
+def test_kept_session_is_reused_by_next_builds():
+    responder = SessionReuseResponder(max_kept_sessions=1)
+    service = FakeService(responder)
+    handles = [
+        _build(service, {"SWBBUILD_SERVICE_PROXY_BUILD_ID": str(build)})
+        for build in range(10)
+    ]
+    # the first delete is forwarded to learn the response, then the second session is kept
+    assert handles[0] == "S0" and set(handles[1:]) == {"S1"}
+    assert service.sessions == {"S1"}
+
+    # another workspace replaces the kept session, which is deleted in the service
+    assert _build(service, {"OTHER": "1"}) == "S2"
+    assert service.sessions == {"S2"}
+    assert _build(service, {"SWBBUILD_SERVICE_PROXY_BUILD_ID": "11"}) == "S3"
+    assert service.sessions == {"S3"}
+
+
+def test_responses_are_cached_while_service_is_alive():
+    cache = ResponseCacheResponder(service_generation=1)
+    request = {"sessionHandle": "S0"}
+    assert cache.respond(make_frame(1, b"GET_PLATFORMS", request)) is None
+    cache.on_server_message(make_frame(1, b"GET_PLATFORMS_RESPONSE", {}))
+    cache.on_client_changed()
+    reply = cache.respond(make_frame(5, b"GET_PLATFORMS", request))
+    assert reply is not None and channel_id(reply) == 5
+    assert cache.respond(make_frame(6, b"CREATE_BUILD", request)) is None
+    assert cache.stats()["hits"] == 1
+
+    # response of a request sent to the exited service is not cached
+    assert cache.respond(make_frame(7, b"GET_SDKS", request)) is None
+    cache.on_service_exited()
+    cache.on_server_message(make_frame(7, b"GET_SDKS_RESPONSE", {}))
+    assert cache.respond(make_frame(8, b"GET_PLATFORMS", request)) is None
+    assert cache.respond(make_frame(9, b"GET_SDKS", request)) is None
+
+
+def test_chain_notifies_all_responders():
+    cache = ResponseCacheResponder()
+    chain = MessageResponderChain([SessionReuseResponder(), cache])
+    request = {"sessionHandle": "S0"}
+    assert chain.respond(make_frame(1, b"GET_PLATFORMS", request)) is None
+    chain.on_server_message(make_frame(1, b"GET_PLATFORMS_RESPONSE", {}))
+    assert chain.respond(make_frame(2, b"GET_PLATFORMS", request)) is not None
+    chain.on_service_exited()
+    assert chain.respond(make_frame(3, b"GET_PLATFORMS", request)) is None
@@ -0,0 +1,93 @@
+import sys
+import time
+import threading
+import subprocess
+
+import helper
+
+
+class _CountingWatcher(helper.ProcessWatcher):
+    def __init__(self):
+        super().__init__()
+        self.polls = 0
+
+    def new_processes(self):
+        self.polls += 1
+        return []
+
+
+def test_polling_backs_off_while_nothing_starts(monkeypatch):
+    watcher = _CountingWatcher()
+    monkeypatch.setattr(helper, "create_process_watcher", lambda: watcher)
+    end = time.time() + 0.5
+    assert (
+        helper.wait_for_new_process(
+            "never-started", set(), should_stop=lambda: time.time() > end
+        )
+        is None
+    )
+    # 500 polls without backoff
+    assert watcher.polls < 30, watcher.polls
+
+
+class _CountingNetlinkWatcher(helper.NetlinkProcessWatcher):
+    def __init__(self):
+        helper.ProcessWatcher.__init__(self)
+        self.polls = 0
+
+    def close(self):
+        pass
+
+    def new_processes(self, timeout: float = 0.0):
+        # no exec events, select waits for the whole timeout
+        self.polls += 1
+        time.sleep(timeout)
+        return []
+
+
+def test_netlink_watcher_blocks_while_nothing_starts(monkeypatch):
+    watcher = _CountingNetlinkWatcher()
+    monkeypatch.setattr(helper, "create_process_watcher", lambda: watcher)
+    end = time.time() + 0.5
+    helper.wait_for_new_process(
+        "never-started", set(), should_stop=lambda: time.time() > end
+    )
+    assert watcher.polls < 30, watcher.polls
+
+
+def test_procargs_keep_empty_arguments():
+    data = (
+        (3).to_bytes(4, sys.byteorder)
+        + b"/usr/bin/xcodebuild\0\0\0\0"
+        + b"xcodebuild\0\0-scheme\0"
+        + b"PATH=/usr/bin\0HOME=/Users/me\0"
+    )
+    assert helper.LibprocProcessWatcher.procargs_command_line(data) == (
+        "xcodebuild  -scheme"
+    )
+
+
+def test_new_process_is_found():
+    existing = set(pid for pid, _ in helper.create_process_watcher().new_processes())
+    name = "sleep 3.1415"
+    process = None
+
+    def start():
+        nonlocal process
+        time.sleep(0.3)
+        process = subprocess.Popen(name.split())
+
+    starter = threading.Thread(target=start)
+    starter.start()
+    try:
+        end = time.time() + 5
+        pid = helper.wait_for_new_process(
+            name, existing, should_stop=lambda: time.time() > end
+        )
+        starter.join()
+        assert pid == str(process.pid)
+    finally:
+        starter.join()
+        if process is not None:
+            process.kill()
+            process.wait()
@@ -0,0 +1,99 @@
+# Measures how long it takes from exec of SWBBuildService.py proxy till the first message is forwarded back to
+# xcodebuild and which imports are the slowest (python -X importtime). Origin service is replaced by an echo service.
+import os
+import sys
+import stat
+import time
+import statistics
+import subprocess
+
+import pytest
+
+import MessageReader
+
+ECHO_SERVICE = """#!/usr/bin/env python3
+import sys
+
+# echo every message back to the proxy
+while True:
+    header = sys.stdin.buffer.read(12)
+    if len(header) < 12:
+        break
+    body = sys.stdin.buffer.read(int.from_bytes(header[8:12], "little"))
+    sys.stdout.buffer.write(header + body)
+    sys.stdout.buffer.flush()
+"""
+
+
+def make_message(channel_id: int, code: bytes) -> bytes:
+    body = bytes([0xA0 + len(code)]) + code + b"\xc4\x02{}"
+    return channel_id.to_bytes(8, "little") + len(body).to_bytes(4, "little") + body
+
+
+def parse_import_time(stderr: str):
+    # import time: self [us] | cumulative | imported package
+    result = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        columns = line[len("import time:") :].split("|")
+        if len(columns) != 3:
+            continue
+        result.append((int(columns[1]), columns[2].strip()))
+    result.sort(reverse=True)
+    return result
+
+
+def run_once(proxy_script: str, env) -> tuple:
+    message = make_message(1, b"PING")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-X", "importtime", proxy_script],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    proc.stdin.write(message)
+    proc.stdin.flush()
+    reply = proc.stdout.read(len(message))
+    elapsed = time.perf_counter() - start
+    proc.terminate()
+    _, stderr = proc.communicate()
+    assert reply == message, f"unexpected reply: {reply}"
+    return elapsed, parse_import_time(stderr.decode("utf-8", errors="replace"))
+
+
+@pytest.mark.skipif(
+    "PROXY_STARTUP_BENCHMARK" not in os.environ,
+    reason="benchmark, set PROXY_STARTUP_BENCHMARK to <runs>",
+)
+def test_benchmark(tmp_path):
+    runs = int(os.environ["PROXY_STARTUP_BENCHMARK"] or 10)
+    proxy_script = os.path.join(
+        os.path.dirname(MessageReader.__file__), "SWBBuildService.py"
+    )
+
+    echo_service = str(tmp_path / "SWBBuildService-origin")
+    with open(echo_service, "w", encoding="utf-8") as f:
+        f.write(ECHO_SERVICE)
+    os.chmod(echo_service, os.stat(echo_service).st_mode | stat.S_IEXEC)
+
+    env = os.environ.copy()
+    # simple proxy mode without daemon server
+    env.pop("SWBBUILD_SERVICE_PROXY_SESSION_ID", None)
+    env["SWBBUILD_SERVICE_PROXY_ORIGIN_SERVICE"] = echo_service
+
+    timings = []
+    imports = []
+    for _ in range(runs):
+        elapsed, imports = run_once(proxy_script, env)
+        timings.append(elapsed)
+
+    print(f"exec -> first forwarded message, {runs} runs:")
+    print(f"  median: {statistics.median(timings) * 1000:.1f} ms")
+    print(f"  min:    {min(timings) * 1000:.1f} ms")
+    print(f"  max:    {max(timings) * 1000:.1f} ms")
+    print("slowest imports of the last run (cumulative):")
+    for cumulative, package in imports[:15]:
+        print(f"  {cumulative / 1000:8.1f} ms  {package}")
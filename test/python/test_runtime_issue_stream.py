@@ -0,0 +1,79 @@
+import os
+import json
+import signal
+import subprocess
+from datetime import datetime
+
+from runtime_issue_stream import RuntimeIssueStreamReader, parse_record
+
+
+def _record(pid, ts, message):
+    return json.dumps(
+        {
+            "timestamp": ts,
+            "processID": pid,
+            "subsystem": "com.apple.runtime-issues",
+            "category": "SwiftUI",
+            "eventMessage": message,
+            "messageType": "Fault",
+        }
+    )
+
+
+def test_parse_record_skips_other_lines():
+    assert parse_record(b"Filtering the log data using ...") is None
+    assert parse_record(b'{"subsystem": "com.apple.UIKit", "processID": 10}') is None
+    record = parse_record(
+        _record(10, "2024-05-01 12:00:00.100000+0000", "first").encode()
+    )
+    assert record.pid == 10
+    assert record.message == "[com.apple.runtime-issues:SwiftUI] first"
+
+
+def test_records_are_matched_to_closest_backtraces(tmp_path):
+    lines = [
+        "Filtering the log data using \"subsystem CONTAINS 'com.apple.runtime-issues'\"",
+        _record(10, "2024-05-01 12:00:00.100000+0000", "first"),
+        _record(11, "2024-05-01 12:00:00.150000+0000", "other process"),
+        _record(10, "2024-05-01 12:00:00.300000+0000", "second"),
+        _record(10, "2024-05-01 12:00:30.000000+0000", "no backtrace"),
+        json.dumps({"subsystem": "com.apple.UIKit", "processID": 10}),
+    ]
+    base = datetime.strptime(
+        "2024-05-01 12:00:00.000000+0000", "%Y-%m-%d %H:%M:%S.%f%z"
+    ).timestamp()
+    stream_path = tmp_path / "stream.ndjson"
+    stream_path.write_text("\n".join(lines))
+
+    warnings = []
+    with open(stream_path, "rb") as f:
+        reader = RuntimeIssueStreamReader(f, lambda m, fr: warnings.append((m, fr)))
+        # burst of backtraces, added in a different order than their records
+        reader.add_backtrace(10, ("bt second",), base + 0.31)
+        reader.add_backtrace(11, ("bt other",), base + 0.16)
+        reader.add_backtrace(10, ("bt first",), base + 0.11)
+        reader.run()
+
+    assert {m.split("] ", 1)[1]: fr for m, fr in warnings} == {
+        "first": ("bt first",),
+        "other process": ("bt other",),
+        "second": ("bt second",),
+        "no backtrace": (),
+    }
+
+
+def test_reader_exits_once_stream_process_group_is_killed():
+    # the shell keeps a child like `log stream`, which keeps the pipe open
+    process = subprocess.Popen(
+        "sleep 30; true",
+        shell=True,
+        stdout=subprocess.PIPE,
+        start_new_session=True,
+    )
+    reader = RuntimeIssueStreamReader(process.stdout, lambda m, fr: None).start()
+    reader.add_backtrace(10, ("bt",))
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=5)
+    reader.join(timeout=5)
+    process.stdout.close()
+    assert not reader.thread.is_alive()
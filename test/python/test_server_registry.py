@@ -0,0 +1,71 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import BuildServiceUtils
+from BuildServiceUtils import (
+    REGISTRY_LOCK_FD_ENV,
+    get_server_pid_by_session_id,
+    lock_server_registry,
+    publish_server,
+)
+
+# registers like main_server and waits for stdin to be closed
+SERVER_SCRIPT = """
+import sys
+import BuildServiceUtils
+lock_fd = BuildServiceUtils.register_server(sys.argv[1], timeout=0.2)
+print("registered" if lock_fd is not None else "rejected", flush=True)
+sys.stdin.read()
+"""
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setenv("SWBBUILD_SERVICE_PROXY_CONFIG_PATH", str(tmp_path / "config"))
+    return tmp_path
+
+
+def _spawn_server(session_id, lock_fd=None):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(BuildServiceUtils.__file__)
+    if lock_fd is not None:
+        env[REGISTRY_LOCK_FD_ENV] = str(lock_fd)
+    return subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, session_id],
+        pass_fds=() if lock_fd is None else (lock_fd,),
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+
+def test_spawned_server_is_visible_before_it_starts(registry):
+    lock_fd = lock_server_registry()
+    assert lock_fd is not None
+    server = _spawn_server("session", lock_fd)
+    try:
+        publish_server(lock_fd, "session", server.pid)
+        # other clients see the server before its python has started
+        assert lock_server_registry() is None
+        assert get_server_pid_by_session_id("session") == server.pid
+        assert server.stdout.readline().strip() == "registered"
+        assert get_server_pid_by_session_id("session") == server.pid
+
+        # a second server is rejected while the first one is alive
+        second = _spawn_server("session")
+        second.stdin.close()
+        assert second.stdout.readline().strip() == "rejected"
+        second.wait()
+    finally:
+        server.stdin.close()
+        server.wait()
+
+    # the lock is released with the server
+    assert get_server_pid_by_session_id("session") is None
+    lock_fd = lock_server_registry()
+    assert lock_fd is not None
+    os.close(lock_fd)
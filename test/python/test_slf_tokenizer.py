@@ -0,0 +1,97 @@
+import os
+import gzip
+import time
+import random
+
+import pytest
+
+from slf_tokenizer import CHUNK_SIZE, TokenType, tokenize
+from slf_writer import encode_slf, random_tokens
+
+COMPILE_FILTER = (b"swift-frontend", b"clang")
+
+
+def _logs(tmp_path):
+    rng = random.Random(3)
+    for i in range(30):
+        tokens = random_tokens(rng, rng.randint(0, 300))
+        # big string spanning many chunks
+        tokens.append((TokenType.String, "clang -c /a.m\n" * 2000))
+        data = encode_slf(tokens)
+        path = tmp_path / f"{i}.xcactivitylog"
+        if i % 2:
+            # several gzip members in one file
+            middle = len(data) // 2
+            path.write_bytes(
+                gzip.compress(data[:middle]) + gzip.compress(data[middle:])
+            )
+        else:
+            path.write_bytes(gzip.compress(data))
+        yield path, tokens
+
+
+def test_tokens_are_decoded_with_any_chunk_size(tmp_path):
+    for path, tokens in _logs(tmp_path):
+        for chunk_size in (1, 7, 4096, CHUNK_SIZE):
+            assert list(tokenize(path, chunk_size=chunk_size)) == tokens, (
+                path,
+                chunk_size,
+            )
+
+
+def test_filtered_strings(tmp_path):
+    for path, tokens in _logs(tmp_path):
+        strings = [
+            t
+            for t in tokens
+            if t[0] == TokenType.String
+            and ("clang" in t[1] or "swift-frontend" in t[1])
+        ]
+        filtered = tokenize(
+            path,
+            token_types={TokenType.String},
+            string_filter=COMPILE_FILTER,
+            chunk_size=13,
+        )
+        assert list(filtered) == strings
+
+
+def test_max_string_size(tmp_path):
+    path = tmp_path / "plain.xcactivitylog"
+    path.write_bytes(encode_slf([(TokenType.String, "a" * 10), (TokenType.Int, 1)]))
+    assert list(tokenize(path, max_string_size=5)) == [
+        (TokenType.String, None),
+        (TokenType.Int, 1),
+    ]
+
+
+def test_plain_and_cut_logs(tmp_path):
+    tokens = random_tokens(random.Random(5), 300)
+    path = tmp_path / "plain.xcactivitylog"
+    path.write_bytes(encode_slf(tokens))
+    assert list(tokenize(path, chunk_size=5)) == tokens
+    path.write_bytes(encode_slf(tokens)[:-3])
+    with pytest.raises(ValueError):
+        list(tokenize(path))
+    path.write_bytes(b"not a log")
+    with pytest.raises(ValueError):
+        list(tokenize(path))
+
+
+@pytest.mark.skipif(
+    "XCACTIVITYLOG" not in os.environ,
+    reason="benchmark, set XCACTIVITYLOG to the path of a real log",
+)
+def test_benchmark():
+    path = os.environ["XCACTIVITYLOG"]
+    for name, kwargs in [
+        ("all tokens", {}),
+        ("strings", {"token_types": {TokenType.String}}),
+        (
+            "compile strings",
+            {"token_types": {TokenType.String}, "string_filter": COMPILE_FILTER},
+        ),
+    ]:
+        start = time.perf_counter()
+        count = sum(1 for _ in tokenize(path, **kwargs))
+        print(f"{name}: {count} tokens in {time.perf_counter() - start:.3f} s")
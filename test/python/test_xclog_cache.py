@@ -0,0 +1,62 @@
+import os
+import time
+
+from xclog_cache import XclogCache
+
+LINES = ["a", "", "é", ""]
+
+
+def _log(tmp_path, content="log"):
+    path = tmp_path / "build.xcactivitylog"
+    path.write_text(content)
+    return str(path)
+
+
+def test_log_is_parsed_once(tmp_path):
+    log = _log(tmp_path)
+    cache = XclogCache(str(tmp_path / "cache"))
+    parsed = []
+
+    def parse():
+        parsed.append(log)
+        return LINES
+
+    assert list(cache.lines(log, "lines", parse)) == LINES
+    assert list(cache.lines(log, "lines", parse)) == LINES
+    assert len(parsed) == 1
+    assert list(cache.lines(log, "empty", lambda: [])) == []
+    assert list(cache.lines(log, "empty", lambda: ["miss"])) == []
+
+    # changed log is parsed again
+    time.sleep(0.01)
+    _log(tmp_path, "log 2")
+    assert list(cache.lines(log, "lines", parse)) == LINES
+    assert len(parsed) == 2
+
+
+def test_partially_read_entry_is_not_stored(tmp_path):
+    log = _log(tmp_path)
+    cache = XclogCache(str(tmp_path / "cache"))
+    lines = cache.lines(log, "lines", lambda: LINES)
+    assert next(lines) == "a"
+    lines.close()
+    assert list(cache.lines(log, "lines", lambda: ["parsed again"])) == ["parsed again"]
+
+
+def test_missing_log_is_not_cached(tmp_path):
+    cache = XclogCache(str(tmp_path / "cache"))
+    log = str(tmp_path / "missing.xcactivitylog")
+    assert list(cache.lines(log, "lines", lambda: LINES)) == LINES
+    assert not os.path.exists(cache.folder)
+
+
+def test_cache_fits_budget(tmp_path):
+    log = _log(tmp_path)
+    cache = XclogCache(str(tmp_path / "cache"), max_size=10 * 1024)
+    for i in range(20):
+        list(cache.lines(log, f"big {i}", lambda: ["x" * 1000]))
+    size = sum(
+        os.path.getsize(os.path.join(cache.folder, name))
+        for name in os.listdir(cache.folder)
+    )
+    assert size <= cache.max_size
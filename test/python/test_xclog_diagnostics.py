@@ -0,0 +1,103 @@
+import os
+import re
+import gzip
+import time
+
+import pytest
+
+from xcode_build_helper import parse_xclogs
+from xclog_diagnostics import extract_diagnostics
+from slf_writer import synthetic_build_log
+
+# diagnostics printed in the text output of build steps, the baseline extraction
+TEXT_DIAGNOSTIC_REGEX = re.compile(
+    r"^(?P<file>.+?):(?P<line>\d+):(?P<column>\d+): (?P<severity>error|warning|note): (?P<message>.*)$"
+)
+
+
+def extract_text_diagnostics(xclog_file):
+    seen = set()
+    for line in parse_xclogs(xclog_file):
+        match = TEXT_DIAGNOSTIC_REGEX.match(line)
+        if match is None:
+            continue
+        key = match.group("severity", "file", "line", "column", "message")
+        if key in seen:
+            continue
+        seen.add(key)
+        yield {
+            "severity": match.group("severity"),
+            "file": match.group("file"),
+            "line": int(match.group("line")),
+            "column": int(match.group("column")),
+            "message": match.group("message"),
+            "target": None,
+        }
+
+
+def test_diagnostics_of_sections_are_deduplicated(tmp_path):
+    path = tmp_path / "build.xcactivitylog"
+    expected = synthetic_build_log(path, 20, output_lines=3)
+    assert list(extract_diagnostics(path)) == expected
+
+
+def test_messages_with_null_lists(tmp_path):
+    path = tmp_path / "build.xcactivitylog"
+    synthetic_build_log(path, 4, output_lines=1)
+    # messages of odd steps have empty lists written as null tokens
+    files = {d["file"] for d in extract_diagnostics(path)}
+    assert "/src/My Module/File1.swift" in files
+    assert "/src/My Module/File3.swift" in files
+
+
+def _key(diagnostic):
+    return tuple(
+        diagnostic[k] for k in ("severity", "file", "line", "column", "message")
+    )
+
+
+def test_same_diagnostics_as_text_output(tmp_path):
+    path = tmp_path / "build.xcactivitylog"
+    expected = synthetic_build_log(path, 20, output_lines=3)
+    # text output has the same diagnostics, but without targets and in another order
+    text = list(extract_text_diagnostics(path))
+    assert sorted(map(_key, text)) == sorted(map(_key, expected))
+
+
+def test_diagnostics_before_the_end_of_cut_log(tmp_path):
+    path = tmp_path / "build.xcactivitylog"
+    expected = synthetic_build_log(path, 3, output_lines=1)
+    data = gzip.decompress(path.read_bytes())
+    path.write_bytes(data[: len(data) * 2 // 3])
+    records = []
+    with pytest.raises(ValueError):
+        records.extend(extract_diagnostics(path))
+    assert records == expected[: len(records)] and len(records) > 0
+
+
+@pytest.mark.skipif(
+    "XCLOG_BENCHMARK" not in os.environ,
+    reason="benchmark, set XCLOG_BENCHMARK to 1 or to the path of a real log",
+)
+def test_benchmark(tmp_path):
+    path = os.environ["XCLOG_BENCHMARK"]
+    if path == "1":
+        path = tmp_path / "build.xcactivitylog"
+        synthetic_build_log(path, 2000)
+        print(f"synthetic log: {os.path.getsize(path) / 1024 / 1024:.1f} MB gzipped")
+    for name, extract in [
+        ("xcactivitylog structure", extract_diagnostics),
+        ("text lines", extract_text_diagnostics),
+    ]:
+        start = time.perf_counter()
+        first = None
+        count = 0
+        for _ in extract(path):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}: {count} diagnostics in {elapsed * 1000:.0f} ms, "
+            f"first after {(first or 0) * 1000:.0f} ms"
+        )